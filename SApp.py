@@ -1,10 +1,55 @@
+import time
+RERUN_STARTED = time.perf_counter()
+
+import os
 import streamlit as st
-import pandas as pd
 import numpy as np
-import plotly.express as px
-from io import BytesIO
 import datetime
-import math
+
+from catalog import NIGERIAN_APPLIANCES, get_catalog
+from ledger import LoadLedger
+from pipeline import (
+    load_key,
+    load_summary,
+    load_table,
+    load_charts,
+    demand_profile,
+    demand_chart,
+    battery_sizing,
+    solar_sizing,
+    inverter_selection,
+    controller_selection,
+    costing,
+    financials,
+    hourly_simulation,
+    uncertainty,
+    lifetime_cash_flow,
+    battery_comparison,
+    outage_dispatch,
+    battery_grid,
+    array_grid,
+    sensitivity_grid,
+    stage_stats,
+    price_design,
+    compare_designs,
+)
+from optimizer import cheapest_designs
+from uncertainty import OUTPUTS as UNCERTAIN_OUTPUTS, PERCENTILES
+from cashflow import DEFAULT_ASSUMPTIONS
+from degradation import END_OF_LIFE_FADE, replacement_years
+from dispatch import (SUPPLY_BANDS, DEFAULT_BAND, DEFAULT_OUTAGE_HOURS, GENERATORS, DEFAULT_GENERATOR, FUEL_PRICES,
+                      DEFAULT_SCENARIOS, OUTPUTS as DISPATCH_OUTPUTS, PERCENTILES as DISPATCH_PERCENTILES)
+from climate import LOCATIONS, get_climate, design_defaults
+from sensitivity import LABELS as SENSITIVITY_LABELS
+from metrics import Registry, REGISTRY, bind_session, record, timed, start_exporters
+from charts import bar_chart, line_chart, tornado_chart, add_marker
+from sizing_engine import layout_summary
+from result_cache import get_result_cache
+from report import COMPANY, MOTTO, ADDRESS, PHONE, EMAIL, quotation_filename
+from pdf_report import render_quotation_async
+from quote_store import save_quote, get_quote, search_quotes
+
+IMPORTS_DONE = time.perf_counter()
 
 # =============================================================================
 # CONFIGURATION AND BRANDING
@@ -16,60 +61,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Company branding
-COMPANY = "ANNUR TECH SOLAR SOLUTIONS"
-MOTTO = "Illuminating Nigeria's Future"
-ADDRESS = "No 6 Kolo Drive, Behind Zuma Barrack, Tafa LGA, Niger State, Nigeria"
-PHONE = "+234 905 169 3000"
-EMAIL = "albataskumyjr@gmail.com"
-WEBSITE = "www.annurtech.ng"
-
-# Nigerian-specific component database (updated with realistic values)
-NIGERIAN_SOLAR_PANELS = {
-    "Jinko Tiger 350W": {"price": 85000, "vmp": 35.5, "isc": 9.8, "voc": 42.5},
-    "Canadian Solar 400W": {"price": 105000, "vmp": 37.2, "isc": 10.9, "voc": 45.5},
-    "Trina Solar 450W": {"price": 125000, "vmp": 39.8, "isc": 11.3, "voc": 48.2},
-}
-
-NIGERIAN_BATTERIES = {
-    "Trojan T-105 (225Ah)": {"price": 65000, "capacity": 225, "voltage": 6, "type": "Lead Acid"},
-    "Pylontech US2000 (200Ah)": {"price": 280000, "capacity": 200, "voltage": 48, "type": "Li-ion"},
-    "Vision 6FM200D (200Ah)": {"price": 75000, "capacity": 200, "voltage": 6, "type": "Lead Acid"},
-}
-
-NIGERIAN_INVERTERS = {
-    "Growatt 3000W 24V": {"price": 185000, "power": 3000, "voltage": 24, "type": "Hybrid"},
-    "Victron 5000W 48V": {"price": 450000, "power": 5000, "voltage": 48, "type": "Hybrid"},
-    "SMA Sunny Boy 5000W": {"price": 520000, "power": 5000, "voltage": 48, "type": "Grid-Tie"},
-}
+# Component catalog (loaded once per process, shared by every session)
+catalog = get_catalog()
 
-NIGERIAN_CHARGE_CONTROLLERS = {
-    "EPever 40A MPPT": {"price": 45000, "current": 40, "voltage": 150, "type": "MPPT"},
-    "Victron 100/50 MPPT": {"price": 85000, "current": 50, "voltage": 100, "type": "MPPT"},
-    "EPever 60A MPPT": {"price": 65000, "current": 60, "voltage": 150, "type": "MPPT"},
-}
+# Project locations with bundled climate data, then a catch-all
+PROJECT_LOCATIONS = [*LOCATIONS, "Other"]
 
-# Common Nigerian appliances with typical wattages and usage patterns
-NIGERIAN_APPLIANCES = {
-    "Ceiling Fan": {"watt": 75, "hours": 8.0},
-    "Standing Fan": {"watt": 55, "hours": 6.0},
-    "TV (32-inch LED)": {"watt": 50, "hours": 5.0},
-    "TV (42-inch LED)": {"watt": 80, "hours": 5.0},
-    "Refrigerator (Medium)": {"watt": 150, "hours": 8.0},
-    "Deep Freezer": {"watt": 200, "hours": 10.0},
-    "Air Conditioner (1HP)": {"watt": 750, "hours": 6.0},
-    "Air Conditioner (1.5HP)": {"watt": 1100, "hours": 6.0},
-    "Water Pump (1HP)": {"watt": 750, "hours": 2.0},
-    "Lighting (LED Bulb)": {"watt": 10, "hours": 8.0},
-    "Computer Desktop": {"watt": 200, "hours": 4.0},
-    "Laptop": {"watt": 65, "hours": 5.0},
-    "Decoder": {"watt": 25, "hours": 6.0},
-    "Home Theatre": {"watt": 100, "hours": 3.0},
-    "Washing Machine": {"watt": 500, "hours": 2.0},
-    "Electric Iron": {"watt": 1000, "hours": 1.0},
-    "Microwave Oven": {"watt": 1000, "hours": 0.5},
-    "Electric Kettle": {"watt": 1500, "hours": 0.5},
-}
+# Only the open tab runs on each interaction; ANNUR_EAGER_TABS=1 renders all
+# four every time (tab switches then need no rerun)
+EAGER_TABS = os.environ.get("ANNUR_EAGER_TABS") == "1"
 
 # =============================================================================
 # CSS STYLING
@@ -154,11 +154,215 @@ st.markdown(f"""
 # =============================================================================
 # Initialize session state
 if "load_data" not in st.session_state:
-    st.session_state.load_data = []
+    st.session_state.load_data = LoadLedger()
 if "pdf_data" not in st.session_state:
     st.session_state.pdf_data = None
+if "pdf_job" not in st.session_state:
+    st.session_state.pdf_job = None
 if "calculations" not in st.session_state:
     st.session_state.calculations = {}
+if "saved_quote" not in st.session_state:
+    st.session_state.saved_quote = None
+if "load_import" not in st.session_state:
+    st.session_state.load_import = None
+if "compare_variants" not in st.session_state:
+    st.session_state.compare_variants = None
+if "comparison" not in st.session_state:
+    st.session_state.comparison = None
+if "cheapest_designs" not in st.session_state:
+    st.session_state.cheapest_designs = None
+if "metrics" not in st.session_state:
+    st.session_state.metrics = Registry()
+
+# Per-session timings alongside the process-wide ones
+bind_session(st.session_state.metrics)
+start_exporters()
+record("imports", IMPORTS_DONE - RERUN_STARTED)
+
+# Widget keys of the stored design parameters, for reopening saved quotes
+DESIGN_WIDGETS = {
+    "backup_time": "backup_time",
+    "battery_voltage": "battery_voltage",
+    "dod_limit": "dod_limit",
+    "temperature_factor": "temp_factor",
+    "battery_type": "battery_type",
+    "sun_hours": "sun_hours",
+    "system_efficiency": "system_eff",
+    "panel_type": "panel_type",
+    "elec_rate": "elec_rate",
+    "system_lifespan": "system_lifespan",
+}
+
+# Inputs read outside their own tab. Seeded here instead of through `value=`,
+# and written back every run so they keep their values while their tab is
+# not rendered. Sun hours and temperature derating start from the first
+# location's climate.
+site_defaults = design_defaults(PROJECT_LOCATIONS[0])
+PERSISTED_WIDGETS = {
+    "backup_time": 5,
+    "battery_voltage": 24,
+    "dod_limit": 80,
+    "temp_factor": site_defaults.get("temperature_factor", 90),
+    "battery_type": next(iter(catalog.batteries)),
+    "sun_hours": site_defaults.get("sun_hours", 5.0),
+    "system_eff": 75,
+    "panel_type": next(iter(catalog.panels)),
+    "use_schedules": True,
+    "sensitivity_mode": False,
+    "sweep_parameter": next(iter(SENSITIVITY_LABELS)),
+    "run_simulation": False,
+    "elec_rate": 50,
+    "system_lifespan": 10,
+    "discount_rate": DEFAULT_ASSUMPTIONS["discount_rate"],
+    "tariff_escalation": DEFAULT_ASSUMPTIONS["tariff_escalation"],
+    "maintenance_rate": DEFAULT_ASSUMPTIONS["maintenance_rate"],
+    "run_monte_carlo": False,
+    "mc_seed": 42,
+    "mc_output": next(iter(UNCERTAIN_OUTPUTS)),
+    "run_dispatch": False,
+    "supply_band": DEFAULT_BAND,
+    "outage_hours": DEFAULT_OUTAGE_HOURS,
+    "generator": DEFAULT_GENERATOR,
+    "fuel_price": FUEL_PRICES[GENERATORS[DEFAULT_GENERATOR]["fuel"]],
+    "dispatch_scenarios": DEFAULT_SCENARIOS,
+}
+for key, default in PERSISTED_WIDGETS.items():
+    st.session_state[key] = st.session_state.get(key, default)
+
+
+def apply_load_edits():
+    # Apply the load table's edits to the ledger: edits and deletes refer to
+    # the rows shown before this change, so edit first, then delete, then add
+    changes = st.session_state.load_editor
+    ledger = st.session_state.load_data
+    for index, edits in changes["edited_rows"].items():
+        ledger.update(int(index), **{field: value for field, value in edits.items()
+                                     if field in ("appliance", "watt", "quantity", "hours")})
+    if changes["deleted_rows"]:
+        ledger.delete(changes["deleted_rows"])
+    added = [row for row in changes["added_rows"] if row.get("appliance") and row.get("watt")]
+    if added:
+        ledger.extend([row["appliance"] for row in added], [row["watt"] for row in added],
+                      [row.get("quantity") or 1 for row in added], [row.get("hours") or 0 for row in added])
+
+
+def apply_location_defaults():
+    # A new site brings its own design-month sun hours and hot-season derating
+    site = design_defaults(st.session_state.project_location)
+    if site:
+        st.session_state.sun_hours = site["sun_hours"]
+        st.session_state.temp_factor = site["temperature_factor"]
+
+
+def apply_generator_defaults():
+    # Petrol and diesel sets burn differently priced fuel
+    st.session_state.fuel_price = FUEL_PRICES[GENERATORS[st.session_state.generator]["fuel"]]
+
+
+def read_upload(upload):
+    # Parse and validate an uploaded load schedule once per file, not on every
+    # rerun; a string result is why the file could not be read
+    cached = st.session_state.load_import
+    if cached is None or cached[0] != upload.file_id:
+        from load_import import read_load_file
+        try:
+            result = read_load_file(upload, upload.name)
+        except (ImportError, ValueError, UnicodeDecodeError) as error:
+            result = str(error)
+        cached = st.session_state.load_import = (upload.file_id, result)
+    return cached[1]
+
+
+def bulk_import():
+    # CSV/XLSX load schedules: validated in chunks, appended in one step
+    from load_import import template_csv
+    upload = st.file_uploader("Load schedule (CSV or Excel)", type=["csv", "xlsx"], key="load_upload",
+                              help="Columns: appliance, watt, quantity, hours, and optionally start/end hours of use. Blank watt or hours take the catalog appliance's values.")
+    st.download_button("⬇️ Download template", template_csv(), "load_schedule_template.csv", "text/csv",
+                       key="load_template_btn")
+    if upload is None:
+        return
+    result = read_upload(upload)
+    if isinstance(result, str):
+        st.error(f"Could not read {upload.name}: {result}")
+        return
+    st.markdown(f"**{result.rows:,}** rows: **{result.valid:,}** valid ({result.custom:,} custom appliances), "
+                f"**{result.error_count:,}** rejected")
+    if result.error_count:
+        shown = "" if result.error_count == len(result.errors) else f" (first {len(result.errors):,} shown)"
+        st.caption(f"Rejected rows{shown}; fix them in the file and upload it again to include them.")
+        st.dataframe(result.error_table(), use_container_width=True, hide_index=True, height=200)
+    for name, match in result.suggestions().items():
+        st.caption(f"'{name}' is not in the catalog and is imported as a custom appliance; did you mean '{match}'?")
+    if result.valid and st.button(f"➕ Add {result.valid:,} Appliances to Load List", use_container_width=True,
+                                  key="import_load_btn"):
+        with timed("load_import.append"):
+            result.append_to(st.session_state.load_data)
+        st.success(f"Imported {result.valid:,} appliances from {upload.name}")
+
+
+def usage_window(key):
+    # Optional window of use for a new line item; None keeps the appliance's default
+    if not st.checkbox("Set usage window", key=f"{key}_on",
+                       help="When in the day this appliance runs. Without one, catalog appliances use their typical hours and custom ones an evening-peaked household pattern."):
+        return None
+    start, end = st.slider("Usage window (hour of day)", 0.0, 24.0, (18.0, 23.0), step=0.25, key=key)
+    return [(start, end)] if end > start else None
+
+
+def current_client():
+    return {field: st.session_state[key] for field, key in (
+        ("name", "client_name"), ("address", "client_address"), ("phone", "client_phone"), ("email", "client_email"),
+        ("location", "project_location"))}
+
+
+def current_design():
+    return {field: st.session_state[key] for field, key in DESIGN_WIDGETS.items()}
+
+
+def quote_signature(client, design):
+    # Identifies the quote being shown, so an unchanged quote is saved only once
+    return (load_key(st.session_state.load_data).fingerprint, tuple(client.items()), tuple(design.items()),
+            st.session_state.use_schedules)
+
+
+def stored_choice_ok(key, value):
+    # Whether a saved quote's input is still an option of its widget (a
+    # removed SKU or blank location would break the selectbox)
+    choices = {"project_location": PROJECT_LOCATIONS, "battery_voltage": (12, 24, 48),
+               "battery_type": catalog.batteries, "panel_type": catalog.panels}
+    return key not in choices or value in choices[key]
+
+
+def open_saved_quote():
+    # Rehydrate the session from the store: inputs, load list and the stored
+    # results as they were issued. While the inputs stay unchanged, the
+    # Report tab quotes from those results instead of re-pricing them.
+    quote = get_quote(st.session_state.saved_quote_select)
+    if quote is None:
+        return
+    replaced = []
+    stored = {"project_location": quote["client"]["location"],
+              **{key: quote["design"][field] for field, key in DESIGN_WIDGETS.items() if field in quote["design"]}}
+    for key, value in stored.items():
+        if stored_choice_ok(key, value):
+            st.session_state[key] = value
+        else:
+            st.session_state[key] = PERSISTED_WIDGETS.get(key, PROJECT_LOCATIONS[0])
+            replaced.append(f"{key.replace('_', ' ')}: {value or 'blank'}")
+    for field, key in (("name", "client_name"), ("address", "client_address"), ("phone", "client_phone"),
+                       ("email", "client_email")):
+        st.session_state[key] = quote["client"][field] or ""
+    st.session_state.load_data = LoadLedger.from_items(quote["load_data"])
+    st.session_state.calculations = dict(quote["calc"])
+    st.session_state.pdf_data = None
+    st.session_state.pdf_job = None
+    # Replaced inputs make it a new quote, priced and saved afresh
+    st.session_state.saved_quote = None if replaced else (
+        quote_signature(current_client(), current_design()), quote["reference"], quote["issued"], quote["calc"])
+    st.session_state.reopen_warning = (
+        f"{quote['reference']} uses inputs no longer available ({'; '.join(replaced)}); defaults were put in "
+        f"their place and the quote is re-priced." if replaced else None)
 
 # =============================================================================
 # HEADER SECTION
@@ -178,8 +382,27 @@ with st.sidebar:
         client_phone = st.text_input("**Phone Number**", placeholder="e.g., 08012345678", key="client_phone")
         client_email = st.text_input("**Email Address**", placeholder="client@example.com", key="client_email")
         project_location = st.selectbox("**Project Location**", 
-                                       ["Abuja", "Lagos", "Kano", "Port Harcourt", "Kaduna", "Other"], 
-                                       key="project_location")
+                                       PROJECT_LOCATIONS, 
+                                       key="project_location",
+                                       on_change=apply_location_defaults,
+                                       help="Sets sun hours and battery temperature derating from the location's climate")
+    
+    with st.expander("📂 Saved Quotes", expanded=False):
+        quote_search = st.text_input("Search by client name or phone", key="quote_search")
+        if quote_search.strip():
+            by_phone = quote_search.strip().lstrip("+").replace(" ", "").isdigit()
+            found = search_quotes(phone=quote_search) if by_phone else search_quotes(name=quote_search)
+        else:
+            found = search_quotes(limit=10)
+        if found:
+            labels = {q["reference"]: f"{q['reference']} · {q['client_name']} · ₦{q['total_cost'] or 0:,.0f}" for q in found}
+            st.selectbox("Quote", list(labels), format_func=labels.get, key="saved_quote_select")
+            st.button("Open Quote", use_container_width=True, key="open_quote_btn", on_click=open_saved_quote)
+            reopen_warning = st.session_state.pop("reopen_warning", None)
+            if reopen_warning:
+                st.warning(reopen_warning)
+        else:
+            st.caption("No saved quotes found.")
         
     st.markdown("---")
     st.markdown(f"""
@@ -190,552 +413,803 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
 
+# =============================================================================
+# DESIGN CALCULATIONS
+# =============================================================================
+# Each tab computes what it shows from the inputs in session state, so the
+# open tab never relies on another tab having run first. The steps are
+# memoized pipeline stages: repeating one in a second tab is a cache lookup.
+design = current_design()
+
+
+def size_load():
+    # Daily energy and total power of the load list
+    total_wh, total_watt = load_summary(load_key(st.session_state.load_data))
+    st.session_state.calculations.update(total_wh=total_wh, total_watt=total_watt)
+    return total_wh, total_watt
+
+
+def size_demand():
+    # Load the system is sized on: with usage schedules, the coincident peak
+    # and a profile whose worst backup window sizes the bank; otherwise the
+    # nameplate total, as if everything ran at once
+    total_wh, total_watt = size_load()
+    if not st.session_state.use_schedules:
+        for key in ("coincident_peak", "diversity_factor", "design_watt"):
+            st.session_state.calculations.pop(key, None)
+        return total_wh, total_watt, None
+    profile = demand_profile(load_key(st.session_state.load_data))
+    st.session_state.calculations.update(coincident_peak=profile.coincident_peak,
+                                         diversity_factor=profile.diversity_factor,
+                                         design_watt=profile.design_watt)
+    return total_wh, profile.design_watt, profile
+
+
+def size_system():
+    # Battery bank, PV array and inverter; grid lookups in sensitivity mode
+    total_wh, design_watt, profile = size_demand()
+    if st.session_state.sensitivity_mode:
+        battery = battery_grid(total_wh, design["battery_voltage"], design["battery_type"], profile).at(
+            design["backup_time"], design["dod_limit"], design["temperature_factor"])
+        solar = array_grid(total_wh, design["battery_voltage"], design["panel_type"], project_location).at(
+            design["sun_hours"], design["system_efficiency"])
+    else:
+        battery = battery_sizing(total_wh, design["backup_time"], design["battery_voltage"], design["dod_limit"],
+                                 design["temperature_factor"], design["battery_type"], profile)
+        solar = solar_sizing(total_wh, design["sun_hours"], design["system_efficiency"], design["battery_voltage"],
+                             design["panel_type"])
+    # 30% safety margin, minimum 1000W; smallest suitable inverter at the system voltage
+    inverter = inverter_selection(design_watt, design["battery_voltage"])
+    st.session_state.calculations.update(
+        battery_capacity_ah=battery["battery_capacity_ah"], num_batteries=battery["num_batteries"],
+        battery_info=battery["battery_info"], required_solar=solar["required_solar"], num_panels=solar["num_panels"],
+        panel_info=solar["panel_info"], controller_current=solar["controller_current"],
+        inverter_size=inverter["inverter_size"], selected_inverter=inverter["selected_inverter"],
+        inverter_info=inverter["inverter_info"])
+    return battery, solar, inverter
+
+
+def price_system():
+    # Costs (installation 20% / 150k min, wiring 10% / 50k min) and financials
+    battery, solar, inverter = size_system()
+    costs = costing(battery["num_batteries"], design["battery_type"], solar["num_panels"], design["panel_type"],
+                    solar["controller_current"], inverter["inverter_info"].get("price", 0),
+                    design["battery_voltage"], project_location)
+    finance = financials(st.session_state.calculations["total_wh"], costs["total_cost"], design["elec_rate"],
+                         design["system_lifespan"])
+    st.session_state.calculations.update(costs)
+    st.session_state.calculations.update(finance)
+    return costs, finance
+
+
+def quote_results():
+    # The whole design from the shared result cache: a design already quoted
+    # in any session (or before a restart) comes back without re-sizing
+    calc = st.session_state.calculations
+    if not st.session_state.use_schedules:
+        for key in ("coincident_peak", "diversity_factor", "design_watt"):
+            calc.pop(key, None)
+    calc.update(price_design(load_key(st.session_state.load_data), design, st.session_state.use_schedules,
+                             project_location))
+
 # =============================================================================
 # MAIN CONTENT - TABBED INTERFACE
 # =============================================================================
-tab1, tab2, tab3, tab4 = st.tabs(["🔋 Load Audit", "⚡ System Sizing", "💰 Financials", "📋 Report"])
+tab1, tab2, tab3, tab4 = st.tabs(["🔋 Load Audit", "⚡ System Sizing", "💰 Financials", "📋 Report"],
+                                 key="active_tab", on_change="ignore" if EAGER_TABS else "rerun")
 
 # =============================================================================
 # TAB 1: LOAD AUDIT
 # =============================================================================
-with tab1:
-    st.markdown(f'<div class="green-header"><h3>🔋 Load Audit & Energy Assessment</h3></div>', unsafe_allow_html=True)
+if tab1.open is not False:
+    with tab1, timed("tab.load_audit"):
+        st.markdown(f'<div class="green-header"><h3>🔋 Load Audit & Energy Assessment</h3></div>', unsafe_allow_html=True)
     
-    with st.expander("💡 Quick Add Common Appliances", expanded=True):
-        col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
+        with st.expander("💡 Quick Add Common Appliances", expanded=True):
+            col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
         
-        with col1:
-            selected_appliance = st.selectbox("Select Appliance", list(NIGERIAN_APPLIANCES.keys()), key="appliance_select")
-            appliance_info = NIGERIAN_APPLIANCES[selected_appliance]
+            with col1:
+                selected_appliance = st.selectbox("Select Appliance", list(NIGERIAN_APPLIANCES.keys()), key="appliance_select")
+                appliance_info = NIGERIAN_APPLIANCES[selected_appliance]
             
-        with col2:
-            appliance_wattage = st.number_input("Wattage (W)", 
-                                              value=appliance_info["watt"],
-                                              min_value=1, 
-                                              max_value=5000, 
-                                              key="appliance_wattage")
+            with col2:
+                appliance_wattage = st.number_input("Wattage (W)", 
+                                                  value=appliance_info["watt"],
+                                                  min_value=1, 
+                                                  max_value=5000, 
+                                                  key="appliance_wattage")
             
-        with col3:
-            appliance_quantity = st.number_input("Quantity", 
-                                               value=1,
-                                               min_value=1, 
-                                               max_value=100, 
-                                               key="appliance_quantity")
+            with col3:
+                appliance_quantity = st.number_input("Quantity", 
+                                                   value=1,
+                                                   min_value=1, 
+                                                   max_value=100, 
+                                                   key="appliance_quantity")
             
-        with col4:
-            appliance_hours = st.number_input("Hours/Day", 
-                                            value=float(appliance_info["hours"]),  # Fixed: Convert to float
-                                            min_value=0.0, 
-                                            max_value=24.0, 
-                                            step=0.5,
-                                            key="appliance_hours")
+            with col4:
+                appliance_hours = st.number_input("Hours/Day", 
+                                                value=float(appliance_info["hours"]),  # Fixed: Convert to float
+                                                min_value=0.0, 
+                                                max_value=24.0, 
+                                                step=0.5,
+                                                key="appliance_hours")
             
-        add_appliance = st.button("➕ Add to Load List", use_container_width=True, key="add_appliance_btn")
+            appliance_schedule = usage_window("appliance_window")
+            add_appliance = st.button("➕ Add to Load List", use_container_width=True, key="add_appliance_btn")
 
-    with st.expander("⚙️ Custom Appliance Entry", expanded=False):
-        col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
+        with st.expander("⚙️ Custom Appliance Entry", expanded=False):
+            col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
         
-        with col1:
-            custom_appliance = st.text_input("Appliance Name", placeholder="e.g., Water Dispenser", key="custom_name")
-            
-        with col2:
-            custom_watt = st.number_input("Wattage (W)", 
-                                        value=100,
-                                        min_value=1, 
-                                        max_value=5000, 
-                                        key="custom_watt_input")
+            with col1:
+                custom_appliance = st.text_input("Appliance Name", placeholder="e.g., Water Dispenser", key="custom_name")
             
-        with col3:
-            custom_quantity = st.number_input("Quantity", 
-                                            value=1,
+            with col2:
+                custom_watt = st.number_input("Wattage (W)", 
+                                            value=100,
                                             min_value=1, 
-                                            max_value=100, 
-                                            key="custom_quantity_input")
+                                            max_value=5000, 
+                                            key="custom_watt_input")
             
-        with col4:
-            custom_hours = st.number_input("Hours/Day", 
-                                         value=5.0,
-                                         min_value=0.0, 
-                                         max_value=24.0, 
-                                         step=0.5,
-                                         key="custom_hours_input")
+            with col3:
+                custom_quantity = st.number_input("Quantity", 
+                                                value=1,
+                                                min_value=1, 
+                                                max_value=100, 
+                                                key="custom_quantity_input")
             
-        add_custom = st.button("➕ Add Custom Appliance", use_container_width=True, key="add_custom_btn")
-
-    # Add appliances to load list
-    if add_appliance and selected_appliance:
-        total_watt = appliance_wattage * appliance_quantity
-        daily_wh = total_watt * appliance_hours
-        st.session_state.load_data.append({
-            "appliance": selected_appliance,
-            "watt": appliance_wattage,
-            "quantity": appliance_quantity,
-            "total_watt": total_watt,
-            "hours": appliance_hours,
-            "wh": daily_wh
-        })
-        st.success(f"Added {appliance_quantity} × {selected_appliance}")
-
-    if add_custom and custom_appliance:
-        total_watt = custom_watt * custom_quantity
-        daily_wh = total_watt * custom_hours
-        st.session_state.load_data.append({
-            "appliance": custom_appliance,
-            "watt": custom_watt,
-            "quantity": custom_quantity,
-            "total_watt": total_watt,
-            "hours": custom_hours,
-            "wh": daily_wh
-        })
-        st.success(f"Added {custom_quantity} × {custom_appliance}")
-
-    # Display load summary
-    if st.session_state.load_data:
-        st.markdown("---")
-        st.subheader("📊 Load Summary")
-        
-        total_wh = sum(item["wh"] for item in st.session_state.load_data)
-        total_watt = sum(item["total_watt"] for item in st.session_state.load_data)
-        
-        # Store for use in other tabs
-        st.session_state.calculations["total_wh"] = total_wh
-        st.session_state.calculations["total_watt"] = total_watt
-        
-        df = pd.DataFrame(st.session_state.load_data)
-        
-        # Energy consumption charts
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            fig_pie = px.pie(df, values='wh', names='appliance', 
-                            title='Energy Consumption by Appliance',
-                            color_discrete_sequence=px.colors.sequential.Greens)
-            st.plotly_chart(fig_pie, use_container_width=True)
-        
-        with col2:
-            fig_bar = px.bar(df, x='appliance', y='wh', 
-                            title='Daily Energy Consumption (Wh)',
-                            color_discrete_sequence=['#006400'])
-            fig_bar.update_layout(xaxis_tickangle=-45)
-            st.plotly_chart(fig_bar, use_container_width=True)
-        
-        # Display data table
-        st.dataframe(df, use_container_width=True, hide_index=True)
-        
-        # Key metrics
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown(f'<div class="metric-card"><h4>Total Power Demand</h4><h3>{total_watt} W</h3></div>', unsafe_allow_html=True)
-        with col2:
-            st.markdown(f'<div class="metric-card"><h4>Daily Energy Consumption</h4><h3>{total_wh} Wh</h3></div>', unsafe_allow_html=True)
-        
-        # Clear button
-        if st.button("🗑️ Clear All Items", use_container_width=True, key="clear_items_btn"):
-            st.session_state.load_data = []
-            st.session_state.pdf_data = None
-            st.session_state.calculations = {}
-            st.rerun()
-    else:
-        st.info("👆 Add appliances to your load list to see the summary here.")
+            with col4:
+                custom_hours = st.number_input("Hours/Day", 
+                                             value=5.0,
+                                             min_value=0.0, 
+                                             max_value=24.0, 
+                                             step=0.5,
+                                             key="custom_hours_input")
+            
+            custom_schedule = usage_window("custom_window")
+            add_custom = st.button("➕ Add Custom Appliance", use_container_width=True, key="add_custom_btn")
+
+        with st.expander("📂 Bulk Import from CSV / Excel", expanded=False):
+            bulk_import()
+
+        # Add appliances to load list
+        if add_appliance and selected_appliance:
+            st.session_state.load_data.append(selected_appliance, appliance_wattage, appliance_quantity, appliance_hours,
+                                              appliance_schedule)
+            st.success(f"Added {appliance_quantity} × {selected_appliance}")
+
+        if add_custom and custom_appliance:
+            st.session_state.load_data.append(custom_appliance, custom_watt, custom_quantity, custom_hours,
+                                              custom_schedule)
+            st.success(f"Added {custom_quantity} × {custom_appliance}")
+
+        # Display load summary
+        if st.session_state.load_data:
+            st.markdown("---")
+            st.subheader("📊 Load Summary")
+        
+            # Cached on the load list itself, so other widgets don't rebuild these
+            current_load = load_key(st.session_state.load_data)
+            total_wh, total_watt = size_load()
+        
+            df = load_table(current_load)
+            fig_pie, fig_bar = load_charts(current_load)
+        
+            # Energy consumption charts
+            col1, col2 = st.columns(2)
+        
+            with col1:
+                st.plotly_chart(fig_pie, use_container_width=True)
+        
+            with col2:
+                st.plotly_chart(fig_bar, use_container_width=True)
+        
+            # Editable data table (edit cells, add or delete rows)
+            st.data_editor(df, use_container_width=True, hide_index=True, num_rows="dynamic",
+                           key="load_editor", on_change=apply_load_edits,
+                           disabled=["total_watt", "wh"],
+                           column_config={
+                               "watt": st.column_config.NumberColumn("watt", min_value=1, max_value=5000),
+                               "quantity": st.column_config.NumberColumn("quantity", min_value=1, max_value=100, step=1),
+                               "hours": st.column_config.NumberColumn("hours", min_value=0.0, max_value=24.0, step=0.5),
+                           })
+        
+            # Key metrics
+            profile = demand_profile(current_load)
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.markdown(f'<div class="metric-card"><h4>Total Power Demand</h4><h3>{total_watt:,.0f} W</h3></div>', unsafe_allow_html=True)
+            with col2:
+                st.markdown(f'<div class="metric-card"><h4>Daily Energy Consumption</h4><h3>{total_wh:,.0f} Wh</h3></div>', unsafe_allow_html=True)
+            with col3:
+                st.markdown(f'<div class="metric-card"><h4>Coincident Peak</h4><h3>{profile.coincident_peak:,.0f} W</h3><p>at {profile.peak_time}</p></div>', unsafe_allow_html=True)
+            with col4:
+                st.markdown(f'<div class="metric-card"><h4>Diversity Factor</h4><h3>{profile.diversity_factor:.2f}</h3></div>', unsafe_allow_html=True)
+        
+            # Demand over the day from the usage schedules
+            st.plotly_chart(demand_chart(profile), use_container_width=True)
+        
+            # Clear button
+            if st.button("🗑️ Clear All Items", use_container_width=True, key="clear_items_btn"):
+                st.session_state.load_data = LoadLedger()
+                st.session_state.pdf_data = None
+                st.session_state.pdf_job = None
+                st.session_state.saved_quote = None
+                st.session_state.calculations = {}
+                st.rerun()
+        else:
+            st.info("👆 Add appliances to your load list to see the summary here.")
 
 # =============================================================================
 # TAB 2: SYSTEM SIZING
 # =============================================================================
-with tab2:
-    st.markdown(f'<div class="green-header"><h3>⚡ System Sizing & Component Selection</h3></div>', unsafe_allow_html=True)
+if tab2.open is not False:
+    with tab2, timed("tab.system_sizing"):
+        st.markdown(f'<div class="green-header"><h3>⚡ System Sizing & Component Selection</h3></div>', unsafe_allow_html=True)
     
-    if not st.session_state.load_data:
-        st.warning("Please add appliances in the Load Audit tab first.")
-    else:
-        total_wh = st.session_state.calculations.get("total_wh", 0)
-        total_watt = st.session_state.calculations.get("total_watt", 0)
+        if not st.session_state.load_data:
+            st.warning("Please add appliances in the Load Audit tab first.")
+        else:
+            total_wh, design_watt, profile = size_demand()
+            battery, solar, inverter = size_system()
         
-        with st.expander("🔋 Battery Bank Sizing", expanded=True):
-            col1, col2 = st.columns(2)
+            st.checkbox("🕒 Size from usage schedules (coincident demand)", key="use_schedules",
+                        help="Sizes the inverter on the load's coincident peak and the battery on the hardest stretch of the demand curve for the backup time, instead of assuming every appliance runs at once for the whole backup")
+            sensitivity_mode = st.checkbox("⚡ Sensitivity mode: precompute every slider position for this load",
+                                           key="sensitivity_mode",
+                                           help="Sizes the system for every backup time, depth of discharge, derating, sun hours and efficiency setting at once, so slider moves become lookups and the tornado and sweep charts below are available")
+        
+            with st.expander("🔋 Battery Bank Sizing", expanded=True):
+                col1, col2 = st.columns(2)
             
-            with col1:
-                backup_time = st.slider("Backup Time Required (hours)", 
-                                       min_value=1, 
-                                       max_value=24, 
-                                       value=5, 
-                                       key="backup_time",
-                                       help="How many hours of backup power you need during outages")
+                with col1:
+                    backup_time = st.slider("Backup Time Required (hours)", 
+                                           min_value=1, 
+                                           max_value=24, 
+                                           key="backup_time",
+                                           help="How many hours of backup power you need during outages")
                 
-                battery_voltage = st.selectbox("System Voltage", 
-                                              [12, 24, 48], 
-                                              index=1, 
-                                              key="battery_voltage",
-                                              help="Standard system voltage for your installation")
+                    battery_voltage = st.selectbox("System Voltage", 
+                                                  [12, 24, 48], 
+                                                  key="battery_voltage",
+                                                  help="Standard system voltage for your installation")
                 
-                dod_limit = st.slider("Depth of Discharge (%)", 
-                                     min_value=50, 
-                                     max_value=100, 
-                                     value=80, 
-                                     key="dod_limit",
-                                     help="How much of the battery capacity you can use (lower is better for battery life)")
+                    dod_limit = st.slider("Depth of Discharge (%)", 
+                                         min_value=50, 
+                                         max_value=100, 
+                                         key="dod_limit",
+                                         help="How much of the battery capacity you can use (lower is better for battery life)")
                 
-            with col2:
-                temperature_factor = st.slider("Temperature Derating Factor (%)", 
-                                             min_value=80, 
-                                             max_value=100, 
-                                             value=90, 
-                                             key="temp_factor",
-                                             help="Reduction in battery capacity due to high temperatures")
+                with col2:
+                    temperature_factor = st.slider("Temperature Derating Factor (%)", 
+                                                 min_value=80, 
+                                                 max_value=100, 
+                                                 key="temp_factor",
+                                                 help="Reduction in battery capacity due to high temperatures")
                 
-                battery_type = st.selectbox("Battery Technology", 
-                                          list(NIGERIAN_BATTERIES.keys()), 
-                                          key="battery_type",
-                                          help="Choose the type of battery for your system")
+                    battery_type = st.selectbox("Battery Technology", 
+                                              list(catalog.batteries), 
+                                              key="battery_type",
+                                              help="Choose the type of battery for your system")
                 
-                battery_info = NIGERIAN_BATTERIES[battery_type]
+                    battery_info = catalog.batteries[battery_type]
                 
-            # Battery calculation
-            battery_capacity_ah = (total_wh * backup_time) / (battery_voltage * (dod_limit/100) * (temperature_factor/100))
-            num_batteries = battery_capacity_ah / battery_info["capacity"]
-            
-            # Store for use in other tabs
-            st.session_state.calculations["battery_capacity_ah"] = battery_capacity_ah
-            st.session_state.calculations["num_batteries"] = num_batteries
-            st.session_state.calculations["battery_info"] = battery_info
+                battery_capacity_ah = battery["battery_capacity_ah"]
+                num_batteries = battery["num_batteries"]
             
-            # Display results
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown(f'<div class="metric-card"><h4>Required Battery Capacity</h4><h3>{battery_capacity_ah:.0f} Ah</h3></div>', unsafe_allow_html=True)
-            with col2:
-                st.markdown(f'<div class="metric-card"><h4>Number of Batteries Needed</h4><h3>{num_batteries:.1f}</h3></div>', unsafe_allow_html=True)
+                # Display results
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown(f'<div class="metric-card"><h4>Required Battery Capacity</h4><h3>{battery_capacity_ah:.0f} Ah</h3></div>', unsafe_allow_html=True)
+                with col2:
+                    st.markdown(f'<div class="metric-card"><h4>Number of Batteries Needed</h4><h3>{num_batteries:.1f}</h3></div>', unsafe_allow_html=True)
         
-        with st.expander("☀️ Solar Panel Sizing", expanded=True):
-            col1, col2 = st.columns(2)
+            with st.expander("☀️ Solar Panel Sizing", expanded=True):
+                col1, col2 = st.columns(2)
             
-            with col1:
-                sun_hours = st.slider("Sun Hours Per Day (Nigeria average)", 
-                                     min_value=3.0, 
-                                     max_value=8.0, 
-                                     value=5.0, 
-                                     step=0.5,
-                                     key="sun_hours",
-                                     help="Average daily peak sun hours at your location")
+                with col1:
+                    sun_hours = st.slider("Sun Hours Per Day", 
+                                         min_value=3.0, 
+                                         max_value=8.0, 
+                                         step=0.5,
+                                         key="sun_hours",
+                                         help="Average daily peak sun hours at your location")
                 
-                system_efficiency = st.slider("System Efficiency (%)", 
-                                            min_value=50, 
-                                            max_value=95, 
-                                            value=75, 
-                                            key="system_eff",
-                                            help="Overall efficiency of the solar system")
+                    system_efficiency = st.slider("System Efficiency (%)", 
+                                                min_value=50, 
+                                                max_value=95, 
+                                                key="system_eff",
+                                                help="Overall efficiency of the solar system")
                 
-            with col2:
-                panel_type = st.selectbox("Solar Panel Type", 
-                                        list(NIGERIAN_SOLAR_PANELS.keys()), 
-                                        key="panel_type",
-                                        help="Choose the type of solar panel for your system")
+                with col2:
+                    panel_type = st.selectbox("Solar Panel Type", 
+                                            list(catalog.panels), 
+                                            key="panel_type",
+                                            help="Choose the type of solar panel for your system")
                 
-                panel_info = NIGERIAN_SOLAR_PANELS[panel_type]
+                    panel_info = catalog.panels[panel_type]
             
-            # Solar calculation
-            required_solar = (total_wh * 1.2) / (sun_hours * (system_efficiency/100))  # 20% margin for losses
-            num_panels = required_solar / panel_info["vmp"] * (battery_voltage/panel_info["vmp"])
+                site = get_climate(project_location)
+                if site is not None:
+                    st.caption(f"{project_location}: worst month {site.design_sun_hours:.1f} sun hours "
+                               f"(annual mean {site.daily_sun_hours().mean():.1f}); hot-season ambient "
+                               f"{site.hot_season_temperature:.0f} °C → {site.temperature_factor}% battery derating. "
+                               f"Changing the location resets these sliders.")
             
-            # Charge controller calculation
-            controller_current = (required_solar * 1.25) / battery_voltage  # 25% safety margin
+                required_solar = solar["required_solar"]
+                num_panels = solar["num_panels"]
+                controller_current = solar["controller_current"]
             
-            # Store for use in other tabs
-            st.session_state.calculations["required_solar"] = required_solar
-            st.session_state.calculations["num_panels"] = num_panels
-            st.session_state.calculations["panel_info"] = panel_info
-            st.session_state.calculations["controller_current"] = controller_current
+                # Display results
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.markdown(f'<div class="metric-card"><h4>Required Solar Capacity</h4><h3>{required_solar:.0f} W</h3></div>', unsafe_allow_html=True)
+                with col2:
+                    st.markdown(f'<div class="metric-card"><h4>Number of Panels Needed</h4><h3>{num_panels:.1f}</h3></div>', unsafe_allow_html=True)
+                with col3:
+                    st.markdown(f'<div class="metric-card"><h4>Charge Controller Size</h4><h3>{controller_current:.0f} A</h3></div>', unsafe_allow_html=True)
+                controller = controller_selection(controller_current, num_panels, battery_voltage, panel_type, project_location)
+                st.caption(f"String layout with {controller['selected_controller']}: "
+                           f"{layout_summary(controller['controller_info'])}.")
+        
+            with st.expander("🔌 Inverter Selection", expanded=True):
+                inverter_size = inverter["inverter_size"]
+                selected_inverter = inverter["selected_inverter"]
+                inverter_info = inverter["inverter_info"]
             
-            # Display results
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.markdown(f'<div class="metric-card"><h4>Required Solar Capacity</h4><h3>{required_solar:.0f} W</h3></div>', unsafe_allow_html=True)
-            with col2:
-                st.markdown(f'<div class="metric-card"><h4>Number of Panels Needed</h4><h3>{num_panels:.1f}</h3></div>', unsafe_allow_html=True)
-            with col3:
-                st.markdown(f'<div class="metric-card"><h4>Charge Controller Size</h4><h3>{controller_current:.0f} A</h3></div>', unsafe_allow_html=True)
+                # Display results
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown(f'<div class="metric-card"><h4>Recommended Inverter Size</h4><h3>{inverter_size:.0f} W</h3></div>', unsafe_allow_html=True)
+                with col2:
+                    st.markdown(f'<div class="metric-card"><h4>Selected Inverter</h4><h3>{selected_inverter}</h3></div>', unsafe_allow_html=True)
+                if profile is not None:
+                    st.caption(f"Sized on {design_watt:,.0f} W of coincident demand (diversity factor {profile.diversity_factor:.2f}) "
+                               f"rather than the {profile.connected_watt:,.0f} W connected load.")
         
-        with st.expander("🔌 Inverter Selection", expanded=True):
-            # Inverter selection
-            inverter_size = max(total_watt * 1.3, 1000)  # 30% safety margin, minimum 1000W
+            if sensitivity_mode:
+                with st.expander("🌪️ Sensitivity Analysis", expanded=True):
+                    grid = sensitivity_grid(total_wh, design_watt, battery_voltage, battery_type, panel_type, profile,
+                                            project_location)
+                    current = {"backup_time": backup_time, "dod_limit": dod_limit, "temperature_factor": temperature_factor,
+                               "sun_hours": sun_hours, "system_efficiency": system_efficiency}
+                    tornado = grid.tornado(**current)
+                    fig_tornado = tornado_chart(tornado["label"],
+                                                {"Slider at minimum": tornado["cost_at_low"] - tornado["base_cost"],
+                                                 "Slider at maximum": tornado["cost_at_high"] - tornado["base_cost"]},
+                                                f"What Moves Total Cost Most (from ₦{tornado['base_cost'][0]:,.0f})",
+                                                x_title="Change in Total Cost (₦)")
+                    st.plotly_chart(fig_tornado, use_container_width=True)
+                
+                    swept = st.selectbox("Sweep", list(SENSITIVITY_LABELS), format_func=SENSITIVITY_LABELS.get, key="sweep_parameter")
+                    sweep = grid.sweep(swept, **current)
+                    fig_sweep = line_chart(sweep[swept], {"Total Cost (₦)": sweep["total_cost"]},
+                                           f"Total Cost vs {SENSITIVITY_LABELS[swept]}",
+                                           x_title=SENSITIVITY_LABELS[swept], y_title="Total Cost (₦)", markers=True)
+                    add_marker(fig_sweep, current[swept])
+                    st.plotly_chart(fig_sweep, use_container_width=True)
+        
+            with st.expander("📈 Hourly Energy Simulation (8760 h)", expanded=False):
+                run_simulation = st.checkbox("Simulate a full year hour by hour", 
+                                             key="run_simulation",
+                                             help="Steps hourly solar output against the load's usage schedules (or an evening-peaked profile) and tracks battery state of charge within the depth of discharge limit")
             
-            # Find appropriate inverter
-            suitable_inverters = {k: v for k, v in NIGERIAN_INVERTERS.items() 
-                                 if v['power'] >= inverter_size and v['voltage'] == battery_voltage}
+                if run_simulation:
+                    # Installed bank energy, derated for temperature
+                    bank_wh = np.ceil(num_batteries) * battery_info["capacity"] * battery_voltage * (temperature_factor/100)
+                    # Includes the smallest bank that still meets 99% of the yearly load
+                    sim, target_wh = hourly_simulation(total_wh, required_solar, sun_hours, system_efficiency,
+                                                       bank_wh, dod_limit, profile, project_location)
+                    simulated_ah = target_wh / (battery_voltage * (temperature_factor/100)) if target_wh else None
+                
+                    st.session_state.calculations["simulation"] = {
+                        "unmet_wh": float(sim["unmet_wh"][0]),
+                        "curtailed_wh": float(sim["curtailed_wh"][0]),
+                        "loss_of_load_hours": int(sim["loss_of_load_hours"][0]),
+                        "days_of_autonomy": float(sim["days_of_autonomy"][0]),
+                        "simulated_battery_ah": simulated_ah,
+                    }
+                
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.markdown(f'<div class="metric-card"><h4>Unmet Energy</h4><h3>{sim["unmet_wh"][0]/1000:,.1f} kWh/yr</h3><p>{sim["loss_of_load_fraction"][0]*100:.2f}% of load, {sim["loss_of_load_hours"][0]} h</p></div>', unsafe_allow_html=True)
+                    with col2:
+                        st.markdown(f'<div class="metric-card"><h4>Curtailed Solar</h4><h3>{sim["curtailed_wh"][0]/1000:,.1f} kWh/yr</h3></div>', unsafe_allow_html=True)
+                    with col3:
+                        st.markdown(f'<div class="metric-card"><h4>Days of Autonomy</h4><h3>{sim["days_of_autonomy"][0]:.1f}</h3></div>', unsafe_allow_html=True)
+                    with col4:
+                        simulated_text = f"{simulated_ah:,.0f} Ah" if simulated_ah else "Bank too small"
+                        st.markdown(f'<div class="metric-card"><h4>Simulated Battery Need</h4><h3>{simulated_text}</h3><p>vs {battery_capacity_ah:,.0f} Ah daily method</p></div>', unsafe_allow_html=True)
+                
+                    daily_soc = sim["soc"][0].reshape(-1, 24) * 100
+                    fig_soc = line_chart(np.arange(1, len(daily_soc) + 1),
+                                         {"Lowest SoC (%)": daily_soc.min(axis=1),
+                                          "Highest SoC (%)": daily_soc.max(axis=1)},
+                                         "Daily Battery State of Charge", x_title="Day", y_title="value")
+                    st.plotly_chart(fig_soc, use_container_width=True)
+                    if site is not None:
+                        st.caption(f"Solar output follows {project_location}'s typical-year hourly irradiance; the sun hours slider is not used here.")
+        
+            with st.expander("🏆 Least-Cost Design Search", expanded=False):
+                st.caption("Searches every panel, battery, inverter and charge controller at 12/24/48 V for the cheapest designs that meet this load with the sizing settings above.")
+                # Kept with the inputs it was searched for, and shown only while they hold
+                search_inputs = (load_key(st.session_state.load_data).fingerprint, st.session_state.use_schedules,
+                                 backup_time, dod_limit, temperature_factor, sun_hours, system_efficiency,
+                                 project_location)
+                if st.button("🔍 Find Cheapest Designs", use_container_width=True, key="optimize_btn"):
+                    st.session_state.cheapest_designs = (search_inputs, cheapest_designs(
+                        total_wh, design_watt, top_n=10,
+                        backup_wh=None if profile is None else profile.backup_wh(backup_time),
+                        backup_time=backup_time, dod_limit=dod_limit, temperature_factor=temperature_factor,
+                        sun_hours=sun_hours, system_efficiency=system_efficiency, location=project_location))
             
-            if suitable_inverters:
-                selected_inverter = list(suitable_inverters.keys())[0]
-                inverter_info = suitable_inverters[selected_inverter]
-            else:
-                # Fallback to smallest compatible inverter
-                compatible_inverters = {k: v for k, v in NIGERIAN_INVERTERS.items() 
-                                       if v['voltage'] == battery_voltage}
-                if compatible_inverters:
-                    selected_inverter = list(compatible_inverters.keys())[0]
-                    inverter_info = compatible_inverters[selected_inverter]
-                else:
-                    selected_inverter = "No suitable inverter found"
-                    inverter_info = {"price": 0, "power": 0}
+                searched = st.session_state.cheapest_designs
+                ranked = searched[1] if searched is not None and searched[0] == search_inputs else None
+                if searched is not None and ranked is None:
+                    st.caption("The load or sizing settings changed since the last search; search again to update it.")
+                if ranked is not None:
+                    if ranked.empty:
+                        st.warning("No feasible design found in the component catalog for this load.")
+                    else:
+                        st.dataframe(ranked[["battery_voltage", "panel_type", "num_panels", "battery_type", "num_batteries",
+                                             "inverter", "controller", "controller_count", "panels_in_series", "parallel_strings",
+                                             "total_cost"]],
+                                     use_container_width=True, hide_index=True,
+                                     column_config={"total_cost": st.column_config.NumberColumn("Total Cost (₦)", format="%.0f")})
+        
+            with st.expander("⚖️ Compare Designs Side by Side", expanded=False):
+                st.caption("Add candidate designs (system voltage, battery, panel, backup time, depth of discharge); all of them are sized, costed and simulated over a year at once. Everything else follows the settings above.")
+                import pandas as pd
+                if st.session_state.compare_variants is None:
+                    # Start from the design on screen
+                    st.session_state.compare_variants = pd.DataFrame([{
+                        "label": "Current design", "battery_voltage": battery_voltage, "battery_type": battery_type,
+                        "panel_type": panel_type, "backup_time": backup_time, "dod_limit": dod_limit}])
+                variants = st.data_editor(
+                    st.session_state.compare_variants, key="compare_editor", num_rows="dynamic",
+                    use_container_width=True, hide_index=True,
+                    column_config={
+                        "label": st.column_config.TextColumn("Design"),
+                        "battery_voltage": st.column_config.SelectboxColumn("Voltage (V)", options=[12, 24, 48], required=True),
+                        "battery_type": st.column_config.SelectboxColumn("Battery", options=list(catalog.batteries), required=True),
+                        "panel_type": st.column_config.SelectboxColumn("Panel", options=list(catalog.panels), required=True),
+                        "backup_time": st.column_config.NumberColumn("Backup (h)", min_value=1, max_value=24, step=1, required=True),
+                        "dod_limit": st.column_config.NumberColumn("DoD (%)", min_value=50, max_value=100, step=1, required=True),
+                    })
             
-            # Store for use in other tabs
-            st.session_state.calculations["inverter_size"] = inverter_size
-            st.session_state.calculations["selected_inverter"] = selected_inverter
-            st.session_state.calculations["inverter_info"] = inverter_info
+                if st.button("⚖️ Compare Designs", use_container_width=True, key="compare_btn"):
+                    rows = variants.dropna(subset=["battery_voltage", "battery_type", "panel_type", "backup_time", "dod_limit"])
+                    candidates = [dict(design, battery_voltage=int(row.battery_voltage), battery_type=row.battery_type,
+                                       panel_type=row.panel_type, backup_time=float(row.backup_time),
+                                       dod_limit=float(row.dod_limit)) for row in rows.itertuples()]
+                    if candidates:
+                        calcs, compared = compare_designs(
+                            load_key(st.session_state.load_data), candidates, st.session_state.use_schedules,
+                            project_location, discount_rate=st.session_state.discount_rate,
+                            tariff_escalation=st.session_state.tariff_escalation,
+                            maintenance_rate=st.session_state.maintenance_rate)
+                        labels = [row.label if isinstance(row.label, str) and row.label.strip()
+                                  else f"{int(row.battery_voltage)} V {row.battery_type} + {row.panel_type}"
+                                  for row in rows.itertuples()]
+                        st.session_state.comparison = pd.DataFrame({
+                            "Design": labels,
+                            "Batteries": [f"{calc['num_batteries']:.1f} × {candidate['battery_type']}" for calc, candidate in zip(calcs, candidates)],
+                            "Panels": [f"{calc['num_panels']:.1f} × {candidate['panel_type']}" for calc, candidate in zip(calcs, candidates)],
+                            "Inverter": [calc["selected_inverter"] for calc in calcs],
+                            "Controller": [calc["selected_controller"] for calc in calcs],
+                            "Total Cost (₦)": [calc["total_cost"] for calc in calcs],
+                            "Payback (yrs)": [calc["payback_period"] for calc in calcs],
+                            "NPV (₦)": compared["npv"],
+                            "LCOE (₦/kWh)": compared["lcoe"],
+                            "Unmet Load (%)": compared["loss_of_load_fraction"] * 100,
+                            "Autonomy (days)": compared["days_of_autonomy"],
+                            "Battery Life (yrs)": compared["life_years"],
+                        })
+                    else:
+                        st.session_state.comparison = None
             
-            # Display results
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown(f'<div class="metric-card"><h4>Recommended Inverter Size</h4><h3>{inverter_size:.0f} W</h3></div>', unsafe_allow_html=True)
-            with col2:
-                st.markdown(f'<div class="metric-card"><h4>Selected Inverter</h4><h3>{selected_inverter}</h3></div>', unsafe_allow_html=True)
+                comparison = st.session_state.comparison
+                if comparison is not None:
+                    st.dataframe(comparison, use_container_width=True, hide_index=True,
+                                 column_config={name: st.column_config.NumberColumn(format="%.0f" if "₦" in name and "LCOE" not in name else "%.1f")
+                                                for name in comparison.columns[5:]})
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.plotly_chart(bar_chart(comparison["Design"], comparison["Total Cost (₦)"], "Total Cost",
+                                                  y_title="₦"), use_container_width=True)
+                    with col2:
+                        st.plotly_chart(bar_chart(comparison["Design"], comparison["NPV (₦)"], "Lifetime NPV",
+                                                  y_title="₦"), use_container_width=True)
 
 # =============================================================================
 # TAB 3: FINANCIAL ANALYSIS
 # =============================================================================
-with tab3:
-    st.markdown(f'<div class="green-header"><h3>💰 Financial Analysis & Cost Estimation</h3></div>', unsafe_allow_html=True)
+if tab3.open is not False:
+    with tab3, timed("tab.financials"):
+        st.markdown(f'<div class="green-header"><h3>💰 Financial Analysis & Cost Estimation</h3></div>', unsafe_allow_html=True)
     
-    if not st.session_state.load_data:
-        st.warning("Please add appliances in the Load Audit tab first.")
-    else:
-        # Get calculated values
-        total_wh = st.session_state.calculations.get("total_wh", 0)
-        battery_info = st.session_state.calculations.get("battery_info", {})
-        num_batteries = st.session_state.calculations.get("num_batteries", 0)
-        panel_info = st.session_state.calculations.get("panel_info", {})
-        num_panels = st.session_state.calculations.get("num_panels", 0)
-        inverter_info = st.session_state.calculations.get("inverter_info", {})
-        controller_current = st.session_state.calculations.get("controller_current", 0)
-        
-        # Calculate costs
-        battery_cost = math.ceil(num_batteries) * battery_info.get("price", 0)
-        solar_cost = math.ceil(num_panels) * panel_info.get("price", 0)
-        inverter_cost = inverter_info.get("price", 0)
-        
-        # Find suitable charge controller
-        suitable_controllers = {k: v for k, v in NIGERIAN_CHARGE_CONTROLLERS.items() 
-                              if v['current'] >= controller_current and v['voltage'] >= panel_info.get("voc", 0) * math.ceil(num_panels)}
-        
-        if suitable_controllers:
-            selected_controller = list(suitable_controllers.keys())[0]
-            controller_info = suitable_controllers[selected_controller]
-            controller_cost = controller_info.get("price", 0)
+        if not st.session_state.load_data:
+            st.warning("Please add appliances in the Load Audit tab first.")
         else:
-            selected_controller = "No suitable controller found"
-            controller_cost = 0
-        
-        # Other costs
-        installation_cost = max(150000, (battery_cost + solar_cost + inverter_cost + controller_cost) * 0.2)  # 20% of equipment cost or 150k min
-        wiring_cost = max(50000, (battery_cost + solar_cost + inverter_cost + controller_cost) * 0.1)  # 10% of equipment cost or 50k min
-        
-        total_cost = battery_cost + solar_cost + inverter_cost + controller_cost + installation_cost + wiring_cost
-        
-        # Store for use in PDF
-        st.session_state.calculations["battery_cost"] = battery_cost
-        st.session_state.calculations["solar_cost"] = solar_cost
-        st.session_state.calculations["inverter_cost"] = inverter_cost
-        st.session_state.calculations["controller_cost"] = controller_cost
-        st.session_state.calculations["installation_cost"] = installation_cost
-        st.session_state.calculations["wiring_cost"] = wiring_cost
-        st.session_state.calculations["total_cost"] = total_cost
-        st.session_state.calculations["selected_controller"] = selected_controller
-        
-        # Display cost breakdown
-        st.subheader("💰 Cost Breakdown")
-        
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.markdown(f'<div class="metric-card"><h4>Battery Cost</h4><h3>₦{battery_cost:,.0f}</h3></div>', unsafe_allow_html=True)
-        with col2:
-            st.markdown(f'<div class="metric-card"><h4>Solar Panel Cost</h4><h3>₦{solar_cost:,.0f}</h3></div>', unsafe_allow_html=True)
-        with col3:
-            st.markdown(f'<div class="metric-card"><h4>Inverter Cost</h4><h3>₦{inverter_cost:,.0f}</h3></div>', unsafe_allow_html=True)
-        with col4:
-            st.markdown(f'<div class="metric-card"><h4>Controller Cost</h4><h3>₦{controller_cost:,.0f}</h3></div>', unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown(f'<div class="metric-card"><h4>Installation Cost</h4><h3>₦{installation_cost:,.0f}</h3></div>', unsafe_allow_html=True)
-        with col2:
-            st.markdown(f'<div class="metric-card"><h4>Wiring & Accessories</h4><h3>₦{wiring_cost:,.0f}</h3></div>', unsafe_allow_html=True)
-        
-        st.markdown(f'<div class="metric-card"><h4>Total System Cost</h4><h2>₦{total_cost:,.0f}</h2></div>', unsafe_allow_html=True)
-        
-        # Financial Analysis
-        st.subheader("💵 Financial Analysis")
-        
-        current_electricity_rate = st.number_input("Current Electricity Cost (₦/kWh)", 
-                                                  min_value=25, 
-                                                  max_value=100, 
-                                                  value=50, 
-                                                  key="elec_rate",
-                                                  help="Your current cost per kWh from the grid")
-        
-        monthly_energy_kwh = total_wh / 1000
-        monthly_savings = monthly_energy_kwh * 30 * current_electricity_rate
-        annual_savings = monthly_savings * 12
-        
-        system_lifespan = st.slider("System Lifespan (years)", 
-                                   min_value=5, 
-                                   max_value=25, 
-                                   value=10, 
-                                   key="system_lifespan")
-        
-        lifetime_savings = annual_savings * system_lifespan
-        payback_period = total_cost / annual_savings if annual_savings > 0 else 0
-        roi = ((lifetime_savings - total_cost) / total_cost) * 100 if total_cost > 0 else 0
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown(f'<div class="metric-card"><h4>Monthly Energy Consumption</h4><h3>{monthly_energy_kwh:.1f} kWh</h3></div>', unsafe_allow_html=True)
-            st.markdown(f'<div class="metric-card"><h4>Monthly Savings</h4><h3>₦{monthly_savings:,.0f}</h3></div>', unsafe_allow_html=True)
-        with col2:
-            st.markdown(f'<div class="metric-card"><h4>Annual Savings</h4><h3>₦{annual_savings:,.0f}</h3></div>', unsafe_allow_html=True)
-            st.markdown(f'<div class="metric-card"><h4>Payback Period</h4><h3>{payback_period:.1f} years</h3></div>', unsafe_allow_html=True)
-
-# =============================================================================
-# TAB 4: REPORT GENERATION
-# =============================================================================
-with tab4:
-    st.markdown(f'<div class="green-header"><h3>📋 Professional Report</h3></div>', unsafe_allow_html=True)
-    
-    if not client_name or not st.session_state.load_data:
-        st.warning("Please fill in client information and add at least one appliance first.")
-    else:
-        # PDF Generation Function
-        def create_professional_pdf():
-            buffer = BytesIO()
-            
-            # Get all calculated values
-            total_wh = st.session_state.calculations.get("total_wh", 0)
-            total_watt = st.session_state.calculations.get("total_watt", 0)
-            battery_capacity_ah = st.session_state.calculations.get("battery_capacity_ah", 0)
-            num_batteries = st.session_state.calculations.get("num_batteries", 0)
-            battery_info = st.session_state.calculations.get("battery_info", {})
-            required_solar = st.session_state.calculations.get("required_solar", 0)
-            num_panels = st.session_state.calculations.get("num_panels", 0)
-            panel_info = st.session_state.calculations.get("panel_info", {})
-            controller_current = st.session_state.calculations.get("controller_current", 0)
-            selected_controller = st.session_state.calculations.get("selected_controller", "")
-            inverter_size = st.session_state.calculations.get("inverter_size", 0)
-            selected_inverter = st.session_state.calculations.get("selected_inverter", "")
-            inverter_info = st.session_state.calculations.get("inverter_info", {})
-            
-            battery_cost = st.session_state.calculations.get("battery_cost", 0)
-            solar_cost = st.session_state.calculations.get("solar_cost", 0)
-            inverter_cost = st.session_state.calculations.get("inverter_cost", 0)
-            controller_cost = st.session_state.calculations.get("controller_cost", 0)
-            installation_cost = st.session_state.calculations.get("installation_cost", 0)
-            wiring_cost = st.session_state.calculations.get("wiring_cost", 0)
-            total_cost = st.session_state.calculations.get("total_cost", 0)
-            
-            # Create a simple text-based PDF
-            pdf_content = f"""
-            {'='*70}
-            {COMPANY.upper()}
-            {'='*70}
-            {MOTTO}
-            
-            CLIENT INFORMATION
-            {'='*70}
-            Name: {client_name}
-            Address: {client_address}
-            Phone: {client_phone}
-            Email: {client_email if client_email else "Not provided"}
-            Location: {project_location}
-            Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}
-            Quote Reference: ANNUR-{datetime.datetime.now().strftime('%Y%m%d')}-001
-            
-            LOAD AUDIT SUMMARY
-            {'='*70}
-            """
-            
-            for item in st.session_state.load_data:
-                pdf_content += f"""
-            {item['appliance']} - {item['watt']}W × {item['quantity']} × {item['hours']}h = {item['wh']} Wh/day"""
-            
-            pdf_content += f"""
-            
-            Total Energy Demand: {total_wh} Wh/day
-            Total Power Demand: {total_watt} W
-            
-            SYSTEM SIZING
-            {'='*70}
-            Backup Time: {backup_time} hours
-            Battery Voltage: {battery_voltage}V
-            Depth of Discharge: {dod_limit}%
-            Temperature Derating: {temperature_factor}%
-            
-            Battery Capacity: {battery_capacity_ah:.0f} Ah
-            Battery Type: {battery_type}
-            Number of Batteries: {num_batteries:.1f}
-            
-            Required Solar Capacity: {required_solar:.0f} W
-            Solar Panel Type: {panel_type}
-            Number of Panels: {num_panels:.1f}
-            Sun Hours: {sun_hours} hours/day
-            System Efficiency: {system_efficiency}%
-            
-            Charge Controller Size: {controller_current:.0f} A
-            Recommended Controller: {selected_controller}
+            total_wh, design_watt, profile = size_demand()
+            costs, finance = price_system()
+            selected_controller = costs["selected_controller"]
+            battery_cost = costs["battery_cost"]
+            solar_cost = costs["solar_cost"]
+            inverter_cost = costs["inverter_cost"]
+            controller_cost = costs["controller_cost"]
+            installation_cost = costs["installation_cost"]
+            wiring_cost = costs["wiring_cost"]
+            total_cost = costs["total_cost"]
+        
+            # Display cost breakdown
+            st.subheader("💰 Cost Breakdown")
+        
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.markdown(f'<div class="metric-card"><h4>Battery Cost</h4><h3>₦{battery_cost:,.0f}</h3></div>', unsafe_allow_html=True)
+            with col2:
+                st.markdown(f'<div class="metric-card"><h4>Solar Panel Cost</h4><h3>₦{solar_cost:,.0f}</h3></div>', unsafe_allow_html=True)
+            with col3:
+                st.markdown(f'<div class="metric-card"><h4>Inverter Cost</h4><h3>₦{inverter_cost:,.0f}</h3></div>', unsafe_allow_html=True)
+            with col4:
+                st.markdown(f'<div class="metric-card"><h4>Controller Cost</h4><h3>₦{controller_cost:,.0f}</h3></div>', unsafe_allow_html=True)
+        
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown(f'<div class="metric-card"><h4>Installation Cost</h4><h3>₦{installation_cost:,.0f}</h3></div>', unsafe_allow_html=True)
+            with col2:
+                st.markdown(f'<div class="metric-card"><h4>Wiring & Accessories</h4><h3>₦{wiring_cost:,.0f}</h3></div>', unsafe_allow_html=True)
+        
+            st.markdown(f'<div class="metric-card"><h4>Total System Cost</h4><h2>₦{total_cost:,.0f}</h2></div>', unsafe_allow_html=True)
+        
+            # Financial Analysis
+            st.subheader("💵 Financial Analysis")
+        
+            current_electricity_rate = st.number_input("Current Electricity Cost (₦/kWh)", 
+                                                      min_value=25, 
+                                                      max_value=100, 
+                                                      key="elec_rate",
+                                                      help="Your current cost per kWh from the grid")
+        
+            system_lifespan = st.slider("System Lifespan (years)", 
+                                       min_value=5, 
+                                       max_value=25, 
+                                       key="system_lifespan")
+        
+            monthly_energy_kwh = finance["monthly_energy_kwh"]
+            monthly_savings = finance["monthly_savings"]
+            annual_savings = finance["annual_savings"]
+            payback_period = finance["payback_period"]
+            roi = finance["roi"]
+        
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown(f'<div class="metric-card"><h4>Monthly Energy Consumption</h4><h3>{monthly_energy_kwh:.1f} kWh</h3></div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="metric-card"><h4>Monthly Savings</h4><h3>₦{monthly_savings:,.0f}</h3></div>', unsafe_allow_html=True)
+            with col2:
+                st.markdown(f'<div class="metric-card"><h4>Annual Savings</h4><h3>₦{annual_savings:,.0f}</h3></div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="metric-card"><h4>Payback Period</h4><h3>{payback_period:.1f} years</h3></div>', unsafe_allow_html=True)
+        
+            with st.expander("📊 Lifetime Cash Flow (NPV / IRR / LCOE)", expanded=False):
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    discount_rate = st.number_input("Discount Rate (%/yr)", min_value=0.0, max_value=50.0,
+                                                    step=0.5, key="discount_rate")
+                with col2:
+                    tariff_escalation = st.number_input("Tariff Escalation (%/yr)", min_value=0.0, max_value=50.0,
+                                                        step=0.5, key="tariff_escalation")
+                with col3:
+                    maintenance_rate = st.number_input("Maintenance (% of cost/yr)", min_value=0.0, max_value=10.0,
+                                                       step=0.5, key="maintenance_rate")
             
-            Inverter Size: {inverter_size:.0f} W
-            Recommended Inverter: {selected_inverter}
+                # Battery wear from the simulated year, for every battery in the catalog
+                options = battery_comparison(total_wh, st.session_state.calculations["required_solar"],
+                                             design["sun_hours"], design["system_efficiency"],
+                                             design["battery_voltage"], design["backup_time"], design["dod_limit"],
+                                             design["temperature_factor"], solar_cost + inverter_cost + controller_cost,
+                                             current_electricity_rate, system_lifespan, discount_rate,
+                                             tariff_escalation, maintenance_rate, profile, project_location)
+                selected = list(options["battery_type"]).index(design["battery_type"])
+                life_years = float(options["life_years"][selected])
+                st.session_state.calculations["battery_wear"] = {
+                    name: float(options[name][selected]) for name in ("cycles", "cycle_fade", "calendar_fade", "life_years")}
             
-            FINANCIAL ANALYSIS
-            {'='*70}
-            Battery Cost: ₦{battery_cost:,.0f}
-            Solar Panel Cost: ₦{solar_cost:,.0f}
-            Inverter Cost: ₦{inverter_cost:,.0f}
-            Charge Controller Cost: ₦{controller_cost:,.0f}
-            Installation Cost: ₦{installation_cost:,.0f}
-            Wiring & Accessories: ₦{wiring_cost:,.0f}
-            {'-'*70}
-            TOTAL SYSTEM COST: ₦{total_cost:,.0f}
+                flow = lifetime_cash_flow(total_wh, total_cost, battery_cost, current_electricity_rate, system_lifespan,
+                                          design["battery_type"], discount_rate, tariff_escalation, maintenance_rate,
+                                          life_years)
+                st.session_state.calculations["cash_flow"] = {name: float(value) for name, value in flow.items() if name != "flows"}
             
-            FINANCIAL ANALYSIS
-            {'='*70}
-            Monthly Energy Consumption: {monthly_energy_kwh:.1f} kWh
-            Monthly Savings: ₦{monthly_savings:,.0f}
-            Annual Savings: ₦{annual_savings:,.0f}
-            Payback Period: {payback_period:.1f} years
-            ROI over {system_lifespan} years: {roi:.0f}%
+                irr_text = f"{flow['irr']:.1f}%" if np.isfinite(flow["irr"]) else "n/a"
+                payback_text = f"{flow['discounted_payback']:.1f} years" if np.isfinite(flow["discounted_payback"]) else "Not within lifespan"
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.markdown(f'<div class="metric-card"><h4>Net Present Value</h4><h3>₦{flow["npv"]:,.0f}</h3></div>', unsafe_allow_html=True)
+                with col2:
+                    st.markdown(f'<div class="metric-card"><h4>IRR</h4><h3>{irr_text}</h3></div>', unsafe_allow_html=True)
+                with col3:
+                    st.markdown(f'<div class="metric-card"><h4>LCOE</h4><h3>₦{flow["lcoe"]:,.1f}/kWh</h3><p>vs ₦{current_electricity_rate}/kWh grid</p></div>', unsafe_allow_html=True)
+                with col4:
+                    st.markdown(f'<div class="metric-card"><h4>Discounted Payback</h4><h3>{payback_text}</h3><p>₦{flow["replacement_cost"]:,.0f} battery replacements</p></div>', unsafe_allow_html=True)
             
-            TERMS & CONDITIONS
-            {'='*70}
-            Quote Validity: 30 days from date of issue
-            Warranty: Equipment as per manufacturer warranty + 1 year workmanship
-            Payment Terms: 50% advance, 50% upon completion
-            Installation Timeline: 5-7 working days after material availability
-            Service: 6 months free maintenance included
+                years = np.arange(len(flow["flows"]))
+                fig_flow = bar_chart(years, flow["flows"], "Year-by-Year Cash Flow",
+                                     x_title="Year", y_title="Net Cash Flow (₦)")
+                fig_flow.add_scatter(x=years, y=np.cumsum(flow["flows"]), name="Cumulative",
+                                     line=dict(color="#ff8c00"))
+                st.plotly_chart(fig_flow, use_container_width=True)
             
-            {COMPANY} | {PHONE} | {EMAIL} | {WEBSITE}
-            {ADDRESS}
+                replaced = replacement_years(life_years, system_lifespan)
+                st.caption(f"Battery wear: {options['cycles'][selected]:.0f} equivalent full cycles/yr, "
+                           f"{options['cycle_fade'][selected] + options['calendar_fade'][selected]:.1f}% capacity fade/yr "
+                           f"→ {life_years:.1f} years to {END_OF_LIFE_FADE:.0f}% fade; replaced in year "
+                           f"{', '.join(map(str, replaced)) if replaced else '— (outlasts the system)'}.")
+                import pandas as pd
+                comparison = pd.DataFrame({
+                    "Battery": options["battery_type"], "Fits System Voltage": options["fits"],
+                    "Units": options["num_batteries"], "Cycles/yr": options["cycles"],
+                    "Life (yrs)": options["life_years"], "Replacements": options["replacements"],
+                    "Total Cost (₦)": options["total_cost"], "Replacement Cost (₦)": options["replacement_cost"],
+                    "NPV (₦)": options["npv"], "LCOE (₦/kWh)": options["lcoe"]})
+                st.dataframe(comparison.sort_values("NPV (₦)", ascending=False), use_container_width=True, hide_index=True,
+                             column_config={"Cycles/yr": st.column_config.NumberColumn(format="%.0f"),
+                                            "Life (yrs)": st.column_config.NumberColumn(format="%.1f"),
+                                            "Total Cost (₦)": st.column_config.NumberColumn(format="%.0f"),
+                                            "Replacement Cost (₦)": st.column_config.NumberColumn(format="%.0f"),
+                                            "NPV (₦)": st.column_config.NumberColumn(format="%.0f"),
+                                            "LCOE (₦/kWh)": st.column_config.NumberColumn(format="%.1f")})
+        
+            with st.expander("⛽ Grid Outages & Generator (True Savings)", expanded=False):
+                st.caption("The savings above price all consumption at the grid tariff. This replays the year against "
+                           "unreliable grid supply and a backup generator, before and after the solar system, over many "
+                           "random outage years.")
+                run_dispatch = st.checkbox("Simulate grid outages and generator use", key="run_dispatch")
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    supply_band = st.selectbox("Grid Supply Band", list(SUPPLY_BANDS), key="supply_band",
+                                               format_func=lambda band: f"{band} ({SUPPLY_BANDS[band]} h/day)")
+                    outage_hours = st.number_input("Average Outage (hours)", min_value=1.0, max_value=72.0,
+                                                   step=1.0, key="outage_hours")
+                with col2:
+                    generator = st.selectbox("Backup Generator", list(GENERATORS), key="generator",
+                                             on_change=apply_generator_defaults)
+                    fuel_price = st.number_input(f"{GENERATORS[generator]['fuel']} Price (₦/L)", min_value=0.0,
+                                                 step=50.0, key="fuel_price")
+                with col3:
+                    dispatch_scenarios = st.slider("Outage Scenarios", min_value=50, max_value=1000, step=50,
+                                                   key="dispatch_scenarios")
             
-            Thank you for choosing Annur Tech - Powering Nigeria's Future!
-            """
+                if run_dispatch:
+                    calc = st.session_state.calculations
+                    bank_wh = (np.ceil(calc["num_batteries"]) * calc["battery_info"]["capacity"] * design["battery_voltage"]
+                               * (design["temperature_factor"]/100))
+                    outages = outage_dispatch(total_wh, calc["required_solar"], design["sun_hours"],
+                                              design["system_efficiency"], bank_wh, design["dod_limit"], supply_band,
+                                              outage_hours, generator, fuel_price, current_electricity_rate,
+                                              dispatch_scenarios, 0, profile, project_location)
+                    true_savings = outages["percentiles"]["savings"]
+                    st.session_state.calculations["dispatch"] = {name: float(values[50])
+                                                                 for name, values in outages["percentiles"].items()}
+                
+                    true_payback = total_cost / true_savings[50] if true_savings[50] > 0 else np.inf
+                    payback_text = f"{true_payback:.1f} years" if np.isfinite(true_payback) else "Never"
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.markdown(f'<div class="metric-card"><h4>True Savings (P50)</h4><h3>₦{true_savings[50]:,.0f}/yr</h3><p>vs ₦{annual_savings:,.0f} at the grid tariff</p></div>', unsafe_allow_html=True)
+                    with col2:
+                        st.markdown(f'<div class="metric-card"><h4>True Payback</h4><h3>{payback_text}</h3><p>P10–P90 savings ₦{true_savings[10]:,.0f}–₦{true_savings[90]:,.0f}</p></div>', unsafe_allow_html=True)
+                    with col3:
+                        st.markdown(f'<div class="metric-card"><h4>Generator Runtime</h4><h3>{outages["percentiles"]["generator_hours_after"][50]:,.0f} h/yr</h3><p>down from {outages["percentiles"]["generator_hours_before"][50]:,.0f} h/yr</p></div>', unsafe_allow_html=True)
+                    with col4:
+                        st.markdown(f'<div class="metric-card"><h4>Fuel Saved</h4><h3>{outages["percentiles"]["fuel_saved"][50]:,.0f} L/yr</h3><p>{outages["supply_hours"].mean():.1f} h/day grid supply simulated</p></div>', unsafe_allow_html=True)
+                
+                    import pandas as pd
+                    st.dataframe(pd.DataFrame({label: [outages["percentiles"][name][p] for p in DISPATCH_PERCENTILES]
+                                               for name, label in DISPATCH_OUTPUTS.items()},
+                                              index=[f"P{p}" for p in DISPATCH_PERCENTILES]).T,
+                                 use_container_width=True,
+                                 column_config={f"P{p}": st.column_config.NumberColumn(format="%.0f") for p in DISPATCH_PERCENTILES})
+        
+            with st.expander("🎲 Uncertainty Analysis (Monte Carlo)", expanded=False):
+                st.caption("Samples sun hours (±15%), appliance usage (±20%), temperature derating (-10/+5 points) and the electricity tariff (±20%) around the values above, one million times.")
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    run_monte_carlo = st.checkbox("Run probabilistic sizing and payback", key="run_monte_carlo")
+                with col2:
+                    mc_seed = st.number_input("Random seed", min_value=0, step=1, key="mc_seed")
             
-            buffer.write(pdf_content.encode('utf-8'))
-            buffer.seek(0)
-            return buffer
-
-        # Generate PDF button
-        if st.button("📄 Generate Professional Quotation PDF", use_container_width=True, key="generate_pdf_btn"):
-            with st.spinner("Generating professional quotation..."):
-                st.session_state.pdf_data = create_professional_pdf()
-                st.success("Professional quotation generated successfully!")
-        
-        # Download button (always visible if PDF data exists)
-        if st.session_state.pdf_data is not None:
-            st.download_button(
-                "📥 Download Professional Quotation", 
-                data=st.session_state.pdf_data, 
-                file_name=f"AnnurTech_Quotation_{client_name.replace(' ', '_')}_{datetime.datetime.now().strftime('%Y%m%d')}.pdf", 
-                mime="application/pdf",
-                use_container_width=True,
-                key="download_pdf_btn"
-            )
+                if run_monte_carlo:
+                    mc = uncertainty(total_wh, design_watt, design["backup_time"], design["battery_voltage"],
+                                     design["dod_limit"], design["temperature_factor"], design["battery_type"],
+                                     design["sun_hours"], design["system_efficiency"], design["panel_type"],
+                                     current_electricity_rate, system_lifespan, 1_000_000, int(mc_seed), profile,
+                                     project_location)
+                    st.session_state.calculations["monte_carlo"] = mc["percentiles"]
+                
+                    import pandas as pd
+                    st.dataframe(pd.DataFrame({label: [mc["percentiles"][name][p] for p in PERCENTILES]
+                                               for name, label in UNCERTAIN_OUTPUTS.items()},
+                                              index=[f"P{p}" for p in PERCENTILES]).T,
+                                 use_container_width=True,
+                                 column_config={f"P{p}": st.column_config.NumberColumn(format="%.1f") for p in PERCENTILES})
+                
+                    output = st.selectbox("Histogram", list(UNCERTAIN_OUTPUTS), format_func=UNCERTAIN_OUTPUTS.get, key="mc_output")
+                    counts, edges = mc["histograms"][output]
+                    fig_mc = bar_chart((edges[:-1] + edges[1:]) / 2, counts / mc["samples"] * 100,
+                                       f"{UNCERTAIN_OUTPUTS[output]} across {mc['samples']:,} samples",
+                                       x_title=UNCERTAIN_OUTPUTS[output], y_title="Share of samples (%)")
+                    fig_mc.update_traces(width=float(edges[1] - edges[0]))
+                    for p in PERCENTILES:
+                        add_marker(fig_mc, mc["percentiles"][output][p], f"P{p}")
+                    st.plotly_chart(fig_mc, use_container_width=True)
+
+# =============================================================================
+# TAB 4: REPORT GENERATION
+# =============================================================================
+if tab4.open is not False:
+    with tab4, timed("tab.report"):
+        st.markdown(f'<div class="green-header"><h3>📋 Professional Report</h3></div>', unsafe_allow_html=True)
+    
+        if not client_name or not st.session_state.load_data:
+            st.warning("Please fill in client information and add at least one appliance first.")
         else:
-            st.info("Click the 'Generate Professional Quotation PDF' button above to create your report.")
+            # The quotation covers the whole design, whichever tabs were visited.
+            # A saved quote whose inputs are unchanged keeps its results as
+            # issued, whatever the catalog and prices are now.
+            client = current_client()
+            signature = quote_signature(client, design)
+            saved = st.session_state.saved_quote
+            if saved is not None and saved[0] == signature:
+                st.session_state.calculations = dict(saved[3])
+                st.caption(f"Quotation {saved[1]} as issued on {saved[2]:%d %B %Y}; change any input to re-price it.")
+            else:
+                quote_results()
+        
+            # PDF Generation Function: renders on a background thread from a copy
+            # of the inputs, so the page stays responsive while it builds
+            def create_professional_pdf():
+                load_data = list(st.session_state.load_data)
+                calc = dict(st.session_state.calculations)
+                # Save once per distinct quote: regenerating an unchanged quote
+                # keeps its reference instead of allocating a new one
+                saved = st.session_state.saved_quote
+                if saved is None or saved[0] != signature:
+                    issued = datetime.datetime.now()
+                    saved = (signature, save_quote(client, load_data, design, calc, issued=issued), issued, calc)
+                    st.session_state.saved_quote = saved
+                return render_quotation_async(client, load_data, design, calc, reference=saved[1], issued=saved[2])
+
+            # Generate PDF button
+            if st.button("📄 Generate Professional Quotation PDF", use_container_width=True, key="generate_pdf_btn"):
+                st.session_state.pdf_data = None
+                st.session_state.pdf_job = create_professional_pdf()
+
+            # Poll the render job without re-running the whole page
+            @st.fragment(run_every=0.5 if st.session_state.pdf_job is not None else None)
+            def pdf_status():
+                job = st.session_state.pdf_job
+                if job is not None:
+                    if not job.done():
+                        st.info("⏳ Generating professional quotation...")
+                        return
+                    st.session_state.pdf_job = None
+                    st.session_state.pdf_data = job.result()
+                    st.rerun()
+
+                # Download button (always visible if PDF data exists)
+                if st.session_state.pdf_data is not None:
+                    st.success(f"Professional quotation {st.session_state.saved_quote[1]} generated and saved!")
+                    st.download_button(
+                        "📥 Download Professional Quotation", 
+                        data=st.session_state.pdf_data, 
+                        file_name=quotation_filename(client_name), 
+                        mime="application/pdf",
+                        use_container_width=True,
+                        key="download_pdf_btn"
+                    )
+                else:
+                    st.info("Click the 'Generate Professional Quotation PDF' button above to create your report.")
+
+            pdf_status()
 
 # =============================================================================
 # FOOTER
@@ -748,3 +1222,25 @@ st.markdown(f"""
     © {datetime.datetime.now().year} Annur Tech Solar Solutions - Powering Nigeria's Future
 </div>
 """, unsafe_allow_html=True)
+
+# =============================================================================
+# DIAGNOSTICS (open the app with ?diagnostics=1)
+# =============================================================================
+record("rerun", time.perf_counter() - RERUN_STARTED)
+
+if st.query_params.get("diagnostics") == "1":
+    with st.expander("🩺 Diagnostics", expanded=True):
+        import pandas as pd
+        timing_columns = {name: st.column_config.NumberColumn(format="%.2f") for name in ("mean_ms", "p50_ms", "p95_ms", "max_ms")}
+        st.markdown("**This session**")
+        st.dataframe(pd.DataFrame(st.session_state.metrics.summary()), use_container_width=True, hide_index=True,
+                     column_config=timing_columns)
+        st.markdown("**All sessions (this process)**")
+        st.dataframe(pd.DataFrame(REGISTRY.summary()), use_container_width=True, hide_index=True,
+                     column_config=timing_columns)
+        st.markdown("**Stage caches**")
+        st.dataframe(pd.DataFrame(stage_stats()).T, use_container_width=True)
+        st.markdown("**Result cache (all sessions, on disk across restarts)**")
+        st.dataframe(pd.DataFrame([get_result_cache().stats()]), use_container_width=True, hide_index=True)
+        st.download_button("Prometheus metrics", REGISTRY.prometheus(), file_name="metrics.prom",
+                           mime="text/plain", key="metrics_download_btn")
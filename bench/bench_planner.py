@@ -0,0 +1,389 @@
+"""Benchmark and load test for the Streamlit planner.
+
+Drives SApp.py headlessly through Streamlit's AppTest with synthetic load
+audits and writes a machine-readable JSON report:
+
+    python bench/bench_planner.py                          # 10, 1k, 10k items
+    python bench/bench_planner.py --sizes 10 1000 --sessions 32 -o bench_report.json
+
+It measures cold start (first render in a fresh interpreter) and, per audit
+size, rerun latency for a scripted session that walks through the tabs (wall
+clock per interaction, plus each tab's own timer from the app's metrics
+registry), PDF generation time from click to bytes, and memory retained per
+session (tracemalloc). A concurrency pass starts a real headless `streamlit
+run` server and drives dozens of sessions against it at once over
+Streamlit's websocket protocol, each typing its audit in through the UI.
+Every figure is checked against bench/thresholds.json; the exit status is 1
+when any check fails (see --no-fail).
+
+Quotes generated by the benchmark go to a temporary quote store.
+"""
+
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("ANNUR_QUOTES_DB", os.path.join(tempfile.mkdtemp(prefix="annur-bench-"), "quotes.db"))
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from streamlit.testing.v1 import AppTest
+
+from catalog import NIGERIAN_APPLIANCES
+from ledger import LoadLedger
+
+APP_PATH = os.path.join(ROOT, "SApp.py")
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+DEFAULT_SIZES = (10, 1000, 10000)
+DEFAULT_SESSIONS = 24
+APP_TIMEOUT = 300
+# SApp's tab labels; with lazy tabs only the open one renders
+LOAD_TAB, SIZING_TAB, FINANCIALS_TAB, REPORT_TAB = "🔋 Load Audit", "⚡ System Sizing", "💰 Financials", "📋 Report"
+
+
+# =============================================================================
+# SYNTHETIC AUDITS AND SESSIONS
+# =============================================================================
+def synthetic_audit(items, seed=0):
+    """A ledger of `items` catalog appliances spread over rooms, with jittered usage."""
+    rng = np.random.default_rng(seed)
+    names = list(NIGERIAN_APPLIANCES)
+    picks = rng.integers(0, len(names), items)
+    ledger = LoadLedger()
+    ledger.extend([f"{names[p]} (Room {i // 8 + 1})" for i, p in enumerate(picks)],
+                  [NIGERIAN_APPLIANCES[names[p]]["watt"] for p in picks],
+                  rng.integers(1, 4, items),
+                  np.clip(np.round([NIGERIAN_APPLIANCES[names[p]]["hours"] for p in picks]
+                                   * rng.uniform(0.5, 1.5, items) * 2) / 2, 0.5, 24))
+    return ledger
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+    return {"p50": pick(50), "p95": pick(95), "max": ordered[-1], "mean": statistics.fmean(ordered),
+            "count": len(ordered)}
+
+
+def _timed_run(at, latencies, action=None, tab=LOAD_TAB):
+    # AppTest does not carry the open tab over to the next run, so every run names it
+    started = time.perf_counter()
+    if action is not None:
+        action()
+    at.session_state["active_tab"] = tab
+    at.run()
+    latencies.append((time.perf_counter() - started) * 1000)
+    if at.exception:
+        raise RuntimeError(f"app raised: {at.exception[0].value}")
+
+
+def run_session(items, seed=0, with_pdf=True):
+    """One scripted planner session; returns (AppTest, latencies ms, pdf ms or None)."""
+    at = AppTest.from_file(APP_PATH, default_timeout=APP_TIMEOUT)
+    at.session_state["load_data"] = synthetic_audit(items, seed)
+    latencies = []
+    _timed_run(at, latencies)                                                   # first render
+    _timed_run(at, latencies, lambda: at.sidebar.text_input(key="client_name").input(f"Bench Client {seed}"))
+    _timed_run(at, latencies, tab=SIZING_TAB)
+    _timed_run(at, latencies, lambda: at.slider(key="backup_time").set_value(8), tab=SIZING_TAB)
+    _timed_run(at, latencies, lambda: at.slider(key="sun_hours").set_value(5.5), tab=SIZING_TAB)
+    _timed_run(at, latencies, tab=FINANCIALS_TAB)
+    _timed_run(at, latencies, lambda: at.number_input(key="elec_rate").set_value(80), tab=FINANCIALS_TAB)
+    _timed_run(at, latencies, tab=REPORT_TAB)
+
+    pdf_ms = None
+    if with_pdf:
+        started = time.perf_counter()
+        at.button(key="generate_pdf_btn").click()
+        at.session_state["active_tab"] = REPORT_TAB
+        at.run()
+        at.session_state["pdf_job"].result(timeout=APP_TIMEOUT)
+        pdf_ms = (time.perf_counter() - started) * 1000
+        at.session_state["active_tab"] = REPORT_TAB
+        at.run()
+    return at, latencies, pdf_ms
+
+
+def _tab_timings(at):
+    return {row["timer"]: {"p50": row["p50_ms"], "p95": row["p95_ms"], "max": row["max_ms"]}
+            for row in at.session_state["metrics"].summary()
+            if row["timer"].startswith("tab.") or row["timer"] == "rerun"}
+
+
+# =============================================================================
+# MEASUREMENTS
+# =============================================================================
+_COLD_START = """
+import sys, time
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+AppTest.from_file({app!r}, default_timeout={timeout}).run()
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def measure_cold_start(repeats):
+    """First render of an empty session in a fresh interpreter, app imports included."""
+    script = _COLD_START.format(root=ROOT, app=APP_PATH, timeout=APP_TIMEOUT)
+    samples = []
+    for _ in range(repeats):
+        done = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+        samples.append(float(done.stdout.split()[-1]))
+    return _percentiles(samples)
+
+
+def measure_size(items, repeats):
+    """Latency, PDF time and per-session memory for one audit size."""
+    latencies, pdf_times, tabs = [], [], {}
+    for repeat in range(repeats):
+        at, session_latencies, pdf_ms = run_session(items, seed=repeat)
+        latencies += session_latencies
+        pdf_times.append(pdf_ms)
+        tabs = _tab_timings(at)
+
+    # Memory retained by a warm session (stage caches already populated)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    at, _, _ = run_session(items, seed=repeats, with_pdf=False)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del at
+
+    return {
+        "items": items,
+        "rerun_ms": _percentiles(latencies),
+        "tabs_ms": tabs,
+        "pdf_ms": _percentiles(pdf_times),
+        "memory_per_session_mb": retained / 2**20,
+    }
+
+
+class _ServerSession:
+    """One browser tab against a running server, speaking Streamlit's websocket protocol."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.states = {}       # widget key -> WidgetState, resent on every rerun like the frontend does
+        self.ids = {}          # widget key -> current element id
+        self.kinds = {}        # widget key -> element type
+
+    async def rerun(self, **changes):
+        """Apply widget changes by key (True clicks a button), rerun and wait; returns ms."""
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        triggers = []
+        for key, value in changes.items():
+            state = WidgetState(id=self.ids[key])
+            if value is True:
+                state.trigger_value = True
+                triggers.append(state)
+                continue
+            if isinstance(value, str):
+                state.string_value = value
+            elif self.kinds[key] == "slider":
+                state.double_array_value.data.append(float(value))
+            elif isinstance(value, float):
+                state.double_value = value
+            else:
+                state.int_value = value
+            self.states[key] = state
+        message.rerun_script.widget_states.widgets.extend([*self.states.values(), *triggers])
+
+        started = time.perf_counter()
+        await self.connection.send(message.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.connection.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "add_block":
+                tabs = forward.delta.add_block.tab_container
+                if tabs.id.startswith("$$ID-"):
+                    key = tabs.id.rsplit("-", 1)[-1]
+                    self.ids[key] = tabs.id
+                    self.kinds[key] = "tab_container"
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                if element.WhichOneof("type") == "exception":
+                    raise RuntimeError(f"app raised: {element.exception.message}")
+                widget = getattr(element, element.WhichOneof("type"))
+                widget_id = getattr(widget, "id", "")
+                if widget_id.startswith("$$ID-"):
+                    key = widget_id.rsplit("-", 1)[-1]
+                    self.ids[key] = widget_id
+                    self.kinds[key] = element.WhichOneof("type")
+            elif kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("app failed to compile")
+                return (time.perf_counter() - started) * 1000
+
+
+async def _server_session(url, items, seed):
+    # Same script as run_session, but the audit is typed in through the UI
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as connection:
+        session = _ServerSession(connection)
+        latencies = [await session.rerun()]
+        for i in range(items):
+            latencies.append(await session.rerun(appliance_quantity=1 + (seed + i) % 3, add_appliance_btn=True))
+        latencies.append(await session.rerun(client_name=f"Bench Client {seed}"))
+        latencies.append(await session.rerun(active_tab=SIZING_TAB))
+        latencies.append(await session.rerun(backup_time=8))
+        latencies.append(await session.rerun(sun_hours=5.5))
+        latencies.append(await session.rerun(active_tab=FINANCIALS_TAB))
+        latencies.append(await session.rerun(elec_rate=80))
+        latencies.append(await session.rerun(active_tab=REPORT_TAB))
+        return latencies
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _rss_mb(pid):
+    with open(f"/proc/{pid}/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def measure_concurrency(sessions, items):
+    """`sessions` scripted sessions at once against one headless `streamlit run` server."""
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + APP_TIMEOUT
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                    break
+            except OSError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("streamlit server did not start")
+                time.sleep(0.2)
+
+        url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        asyncio.run(_server_session(url, 1, seed=-1))      # warm the server's imports and caches
+        rss_before = _rss_mb(server.pid) if sys.platform.startswith("linux") else None
+
+        async def all_sessions():
+            return await asyncio.gather(*(asyncio.wait_for(_server_session(url, items, seed), APP_TIMEOUT)
+                                          for seed in range(sessions)), return_exceptions=True)
+
+        started = time.perf_counter()
+        outcomes = asyncio.run(all_sessions())
+        elapsed = time.perf_counter() - started
+        rss_after = _rss_mb(server.pid) if rss_before is not None else None
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    latencies = [ms for outcome in outcomes if not isinstance(outcome, BaseException) for ms in outcome]
+    failures = [repr(outcome) for outcome in outcomes if isinstance(outcome, BaseException)]
+    return {
+        "sessions": sessions,
+        "items": items,
+        "rerun_ms": _percentiles(latencies) if latencies else None,
+        "reruns_per_second": len(latencies) / elapsed,
+        "wall_seconds": elapsed,
+        "server_rss_per_session_mb": (rss_after - rss_before) / sessions if rss_after is not None else None,
+        "failures": failures,
+    }
+
+
+# =============================================================================
+# THRESHOLDS AND REPORT
+# =============================================================================
+def check(report, thresholds):
+    """Compare the report against thresholds; returns a list of check rows."""
+    checks = []
+
+    def add(metric, value, limit):
+        if limit is not None and value is not None:
+            checks.append({"metric": metric, "value": round(value, 3), "threshold": limit, "passed": value <= limit})
+
+    add("cold_start_ms.p95", report["cold_start_ms"]["p95"], thresholds.get("cold_start_p95_ms"))
+    for size, result in report["sizes"].items():
+        add(f"sizes.{size}.rerun_ms.p95", result["rerun_ms"]["p95"], thresholds.get("rerun_p95_ms", {}).get(size))
+        add(f"sizes.{size}.pdf_ms.p95", result["pdf_ms"]["p95"], thresholds.get("pdf_p95_ms", {}).get(size))
+        add(f"sizes.{size}.memory_per_session_mb", result["memory_per_session_mb"],
+            thresholds.get("memory_per_session_mb", {}).get(size))
+    concurrency = report.get("concurrency")
+    if concurrency:
+        add("concurrency.rerun_ms.p95", concurrency["rerun_ms"]["p95"] if concurrency["rerun_ms"] else None,
+            thresholds.get("concurrent_rerun_p95_ms"))
+        add("concurrency.server_rss_per_session_mb", concurrency["server_rss_per_session_mb"],
+            thresholds.get("server_rss_per_session_mb"))
+        checks.append({"metric": "concurrency.failures", "value": len(concurrency["failures"]), "threshold": 0,
+                       "passed": not concurrency["failures"]})
+    return checks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark and load-test the planner headlessly.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="appliances per audit")
+    parser.add_argument("--repeats", type=int, default=3, help="scripted sessions per size")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS, help="concurrent sessions (0 to skip)")
+    parser.add_argument("--concurrent-items", type=int, default=10, help="audit size for the concurrency pass")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    parser.add_argument("-o", "--output", default="bench_report.json")
+    parser.add_argument("--no-fail", action="store_true", help="exit 0 even when a threshold is exceeded")
+    args = parser.parse_args(argv)
+
+    with open(args.thresholds) as fh:
+        thresholds = json.load(fh)
+
+    report = {
+        "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "sizes": {},
+    }
+    print("measuring cold start...", file=sys.stderr, flush=True)
+    report["cold_start_ms"] = measure_cold_start(args.repeats)
+    for items in args.sizes:
+        print(f"measuring {items:,} appliances...", file=sys.stderr, flush=True)
+        report["sizes"][str(items)] = measure_size(items, args.repeats)
+    if args.sessions:
+        print(f"measuring {args.sessions} concurrent sessions...", file=sys.stderr, flush=True)
+        report["concurrency"] = measure_concurrency(args.sessions, args.concurrent_items)
+
+    report["checks"] = check(report, thresholds)
+    report["passed"] = all(row["passed"] for row in report["checks"])
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+
+    for row in report["checks"]:
+        print(f"{'PASS' if row['passed'] else 'FAIL'}  {row['metric']:<40} {row['value']:>12,.1f}  (<= {row['threshold']:,})",
+              file=sys.stderr)
+    print(f"report written to {args.output}", file=sys.stderr)
+    return 0 if report["passed"] or args.no_fail else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""Bulk quoting of client load audits from the command line.
+
+Reads a CSV or Parquet file of load-list rows (the same fields the Load Audit
+tab keeps in `st.session_state.load_data`) and runs Load Audit -> System
+Sizing -> Financials -> Report for every client:
+
+    python bulk_quote.py audits.csv -o quotes_out --battery-voltage 48
+    python bulk_quote.py audits.csv --documents zip    # one quotations.zip
+
+Required columns: client, appliance, watt, quantity, hours. Optional client
+columns (address, phone, email, location) go on the quotation, and any
+design column (backup_time, battery_voltage, dod_limit, temperature_factor,
+battery_type, sun_hours, system_efficiency, panel_type, elec_rate,
+system_lifespan) overrides the command-line design for that client.
+
+Rows of one client must be contiguous (e.g. sorted by client). The file is
+streamed in chunks and chunks are quoted on a process pool, so memory stays
+bounded however many clients the file holds.
+"""
+
+import argparse
+import collections
+import datetime
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from sizing_engine import DEFAULT_DESIGN, make_load_item, size_batch
+from report import quotation_reference, quotation_text
+from pdf_report import render_quotation, write_quotation_zip
+from quote_store import reserve_sequences
+
+LOAD_COLUMNS = ["appliance", "watt", "quantity", "hours"]
+CLIENT_COLUMNS = ["address", "phone", "email", "location"]
+DEFAULT_CHUNKSIZE = 50000
+DOCUMENT_FORMATS = ("pdf", "txt", "zip", "none")
+
+
+# =============================================================================
+# INPUT
+# =============================================================================
+def iter_audit_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield the audit file as DataFrames of at most `chunksize` rows."""
+    if str(path).lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Reading Parquet files requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def iter_client_blocks(chunks):
+    """Re-cut chunks so no client is split across two blocks.
+
+    The trailing client of each chunk is held back and prepended to the next
+    one, since its remaining rows may follow.
+    """
+    pending = None
+    for chunk in chunks:
+        missing = {"client", *LOAD_COLUMNS} - set(chunk.columns)
+        if missing:
+            raise SystemExit(f"Input is missing required columns: {', '.join(sorted(missing))}")
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        trailing = chunk["client"].to_numpy() == chunk["client"].iloc[-1]
+        pending = chunk[trailing]
+        if not trailing.all():
+            yield chunk[~trailing]
+    if pending is not None and not pending.empty:
+        yield pending
+
+
+# =============================================================================
+# QUOTING (runs in worker processes)
+# =============================================================================
+def quote_block(block, design, quotes_dir=None, issued=None, first_sequence=1, documents="pdf"):
+    """Size, cost and quote every client in `block`.
+
+    `documents` is "pdf" or "txt" (one file per client in `quotes_dir`),
+    "zip" (PDFs returned for the caller to archive) or "none". Returns
+    (results, [(filename, pdf_bytes)]) with one result row per client, in
+    order of first appearance; the list is empty unless `documents` is "zip".
+    """
+    issued = issued or datetime.datetime.now()
+    block = block.copy()
+    block["quantity"] = block["quantity"].fillna(1)
+    for column in CLIENT_COLUMNS:
+        if column in block:
+            block[column] = block[column].fillna("")
+    block["total_watt"] = block["watt"] * block["quantity"]
+    block["wh"] = block["total_watt"] * block["hours"]
+
+    groups = block.groupby("client", sort=False)
+    sites = groups[["wh", "total_watt"]].sum().rename(columns={"wh": "total_wh"})
+    per_client = [column for column in [*CLIENT_COLUMNS, *DEFAULT_DESIGN] if column in block]
+    if per_client:
+        sites = sites.join(groups[per_client].first())
+        # Blank per-client design cells fall back to the run's design
+        sites = sites.fillna({column: design[column] for column in DEFAULT_DESIGN if column in sites})
+
+    results = size_batch(sites.reset_index(), **design)
+    results.insert(0, "reference", [quotation_reference(issued, first_sequence + i) for i in range(len(results))])
+
+    archived = []
+    if documents != "none":
+        loads = {client: rows for client, rows in groups[LOAD_COLUMNS]}
+        for row in results.to_dict("records"):
+            load_data = [make_load_item(*item) for item in loads[row["client"]].itertuples(index=False)]
+            client = {"name": row["client"], **{c: row.get(c, "") for c in CLIENT_COLUMNS}}
+            if documents == "txt":
+                text = quotation_text(client, load_data, row, row, reference=row["reference"], issued=issued)
+                with open(os.path.join(quotes_dir, f"{row['reference']}.txt"), "w", encoding="utf-8") as fh:
+                    fh.write(text)
+                continue
+            pdf = render_quotation(client, load_data, row, row, reference=row["reference"], issued=issued)
+            if documents == "zip":
+                archived.append((f"{row['reference']}.pdf", pdf))
+            else:
+                with open(os.path.join(quotes_dir, f"{row['reference']}.pdf"), "wb") as fh:
+                    fh.write(pdf)
+    return results, archived
+
+
+# =============================================================================
+# DRIVER
+# =============================================================================
+def run(path, output_dir, design=None, chunksize=DEFAULT_CHUNKSIZE, workers=None,
+        documents="pdf", progress=sys.stderr):
+    """Quote every client in `path`; returns (clients, rows, seconds).
+
+    `documents` picks the quotation output: "pdf" or "txt" files under
+    quotations/, "zip" for a single quotations.zip, or "none". References
+    are reserved block by block from the quote store's daily counter.
+    """
+    design = {**DEFAULT_DESIGN, **(design or {})}
+    workers = workers or os.cpu_count() or 1
+    issued = datetime.datetime.now()
+    os.makedirs(output_dir, exist_ok=True)
+    quotes_dir = os.path.join(output_dir, "quotations") if documents in ("pdf", "txt") else None
+    if quotes_dir:
+        os.makedirs(quotes_dir, exist_ok=True)
+    results_path = os.path.join(output_dir, "results.csv")
+    # Rendered PDFs flow from the workers into one archive as blocks drain
+    archive = collections.deque()
+
+    started = time.perf_counter()
+    clients = rows = 0
+    header = True
+    # Futures are drained oldest-first, so results.csv keeps input order and
+    # at most `2 * workers` blocks are in memory at once.
+    in_flight = collections.deque()
+
+    def drain_one():
+        nonlocal clients, rows, header
+        future, block_rows = in_flight.popleft()
+        results, archived = future.result()
+        archive.extend(archived)
+        results.to_csv(results_path, mode="w" if header else "a", header=header, index=False)
+        header = False
+        clients += len(results)
+        rows += block_rows
+        if progress:
+            elapsed = time.perf_counter() - started
+            print(f"{clients:,} clients | {rows:,} rows | {elapsed:.1f}s | {clients / elapsed:,.0f} clients/s",
+                  file=progress, flush=True)
+
+    def quoted():
+        # Yields the archived PDFs of each drained block, in input order
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for block in iter_client_blocks(iter_audit_chunks(path, chunksize)):
+                if len(in_flight) >= 2 * workers:
+                    drain_one()
+                    yield from _pop_all(archive)
+                sequence = reserve_sequences(block["client"].nunique(), issued)
+                future = pool.submit(quote_block, block, design, quotes_dir, issued, sequence, documents)
+                in_flight.append((future, len(block)))
+            while in_flight:
+                drain_one()
+                yield from _pop_all(archive)
+
+    if documents == "zip":
+        write_quotation_zip(os.path.join(output_dir, "quotations.zip"), quoted())
+    else:
+        collections.deque(quoted(), maxlen=0)
+
+    elapsed = time.perf_counter() - started
+    if progress:
+        print(f"Done: {clients:,} clients from {rows:,} rows in {elapsed:.1f}s "
+              f"({clients / max(elapsed, 1e-9):,.0f} clients/s) -> {output_dir}", file=progress)
+    return clients, rows, elapsed
+
+
+def _pop_all(queue):
+    while queue:
+        yield queue.popleft()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk solar quotations from a CSV/Parquet load audit file.")
+    parser.add_argument("input", help="CSV or Parquet file with client, appliance, watt, quantity, hours columns")
+    parser.add_argument("-o", "--output-dir", default="quotes_out", help="where results.csv and quotations/ go")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows read per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPU cores)")
+    parser.add_argument("--documents", choices=DOCUMENT_FORMATS, default="pdf",
+                        help="quotation output: PDF or text files, one ZIP of PDFs, or none (default: pdf)")
+    parser.add_argument("--no-documents", action="store_true", help="only write results.csv (same as --documents none)")
+    parser.add_argument("--quiet", action="store_true", help="no progress report")
+
+    design = parser.add_argument_group("design (defaults match the app's sliders)")
+    for name, default in DEFAULT_DESIGN.items():
+        design.add_argument(f"--{name.replace('_', '-')}", dest=name, type=type(default), default=default)
+    args = parser.parse_args(argv)
+
+    run(args.input, args.output_dir,
+        design={name: getattr(args, name) for name in DEFAULT_DESIGN},
+        chunksize=args.chunksize, workers=args.workers,
+        documents="none" if args.no_documents else args.documents,
+        progress=None if args.quiet else sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
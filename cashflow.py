@@ -0,0 +1,198 @@
+# =============================================================================
+# LIFETIME CASH FLOW
+# =============================================================================
+# Year-by-year cash flows over the system lifespan: grid savings grow with
+# tariff escalation and shrink with PV degradation, while maintenance and
+# battery replacements are paid out. From these come NPV, IRR, LCOE and the
+# discounted payback. Kept free of any Streamlit import.
+#
+# Every function works on arrays of N designs at once, laid out as (N, years)
+# matrices, so re-pricing a whole portfolio under a new tariff assumption is
+# a handful of NumPy operations:
+#
+#     python cashflow.py quotes_out/results.csv --tariff-escalation 15 -o repriced.csv
+
+import argparse
+
+import numpy as np
+
+from catalog import get_catalog
+
+# Same yearly energy as sizing_engine.financial_summary (30-day months)
+DAYS_PER_YEAR = 30 * 12
+
+DEFAULT_ASSUMPTIONS = {
+    "discount_rate": 15.0,       # % per year
+    "tariff_escalation": 10.0,   # % per year
+    "maintenance_rate": 1.0,     # % of system cost per year
+    "pv_degradation": 0.5,       # % output lost per year
+}
+
+# Replacement interval of each battery technology (years)
+BATTERY_LIFE_YEARS = {"Lead Acid": 4, "AGM": 5, "Gel": 5, "Li-ion": 10, "LiFePO4": 12}
+DEFAULT_BATTERY_LIFE = 5
+
+IRR_BOUNDS = (-0.99, 10.0)
+IRR_ITERATIONS = 64
+
+
+def battery_life(battery_type):
+    """Replacement interval (years) per catalog battery name, scalar or array."""
+    batteries = get_catalog().batteries
+    lives = {name: BATTERY_LIFE_YEARS.get(spec.get("type"), DEFAULT_BATTERY_LIFE) for name, spec in batteries.items()}
+    lookup = np.vectorize(lambda name: lives.get(name, DEFAULT_BATTERY_LIFE), otypes=[float])
+    return lookup(battery_type)[()]
+
+
+def _npv(flows, rate):
+    # flows (N, Y+1) from year 0; rate (N,) as a fraction
+    years = np.arange(flows.shape[1])
+    return (flows / (1 + rate[:, None]) ** years).sum(axis=1)
+
+
+def irr(flows):
+    """Internal rate of return per row of `flows` (fractions); NaN when there is none.
+
+    Vectorized bisection: NPV falls as the rate rises for a conventional
+    investment (outlay first, returns later), so each row keeps halving its
+    bracket until it converges.
+    """
+    flows = np.atleast_2d(flows)
+    low = np.full(len(flows), IRR_BOUNDS[0])
+    high = np.full(len(flows), IRR_BOUNDS[1])
+    npv_low = _npv(flows, low)
+    bracketed = np.sign(npv_low) != np.sign(_npv(flows, high))
+    for _ in range(IRR_ITERATIONS):
+        mid = (low + high) / 2
+        npv_mid = _npv(flows, mid)
+        same = np.sign(npv_mid) == np.sign(npv_low)
+        low = np.where(same, mid, low)
+        npv_low = np.where(same, npv_mid, npv_low)
+        high = np.where(same, high, mid)
+    return np.where(bracketed, (low + high) / 2, np.nan)
+
+
+def cash_flows(total_wh, total_cost, battery_cost, elec_rate, system_lifespan, battery_life_years,
+               discount_rate=DEFAULT_ASSUMPTIONS["discount_rate"],
+               tariff_escalation=DEFAULT_ASSUMPTIONS["tariff_escalation"],
+               maintenance_rate=DEFAULT_ASSUMPTIONS["maintenance_rate"],
+               pv_degradation=DEFAULT_ASSUMPTIONS["pv_degradation"]):
+    """Lifetime cash flows and their summary figures for one or many designs.
+
+    All arguments are scalars or equal-length arrays; rates are in %. A bank
+    reaching the end of its life (`battery_life_years`, which may be
+    fractional) before the end of the lifespan is bought again at today's
+    battery cost.
+
+    Returns a dict of arrays: `flows` (N, years + 1) with the system cost at
+    year 0, `npv`, `irr` (%), `lcoe` (₦/kWh), `discounted_payback` and
+    `simple_payback` (years, inf if never), `lifetime_savings` and
+    `replacement_cost` (undiscounted).
+    """
+    total_wh, total_cost, battery_cost, elec_rate, lifespan, life, rate, escalation, maintenance, degradation = (
+        np.atleast_1d(np.asarray(value, dtype=float)) for value in np.broadcast_arrays(
+            total_wh, total_cost, battery_cost, elec_rate, system_lifespan, battery_life_years,
+            discount_rate, tariff_escalation, maintenance_rate, pv_degradation))
+    horizon = int(lifespan.max()) if lifespan.size else 0
+    years = np.arange(1, horizon + 1)[None, :]
+    active = years <= lifespan[:, None]
+
+    energy_kwh = (total_wh * DAYS_PER_YEAR / 1000)[:, None] * (1 - degradation[:, None] / 100) ** (years - 1) * active
+    savings = energy_kwh * elec_rate[:, None] * (1 + escalation[:, None] / 100) ** (years - 1)
+    upkeep = (total_cost * maintenance / 100)[:, None] * active
+    # A bank lasting `life` years (fractional, e.g. from degradation.py) is
+    # replaced in each year in which another whole life runs out
+    life = np.maximum(life, 1)[:, None]
+    replaced = (np.floor(years / life) > np.floor((years - 1) / life)) & (years < lifespan[:, None])
+    replacements = battery_cost[:, None] * replaced
+
+    flows = np.concatenate([-total_cost[:, None], savings - upkeep - replacements], axis=1)
+    discount = (1 + rate[:, None] / 100) ** -np.arange(horizon + 1)[None, :]
+    discounted = flows * discount
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        costs_pv = total_cost + ((upkeep + replacements) * discount[:, 1:]).sum(axis=1)
+        lcoe = np.where(energy_kwh.sum(axis=1) > 0, costs_pv / (energy_kwh * discount[:, 1:]).sum(axis=1), np.nan)
+
+    return {
+        "flows": flows,
+        "npv": discounted.sum(axis=1),
+        "irr": irr(flows) * 100,
+        "lcoe": lcoe,
+        "discounted_payback": _payback(discounted),
+        "simple_payback": _payback(flows),
+        "lifetime_savings": (savings - upkeep - replacements).sum(axis=1),
+        "replacement_cost": replacements.sum(axis=1),
+    }
+
+
+def _payback(flows):
+    # Years (interpolated within the year) until the cumulative flow turns
+    # non-negative for good; inf if it never does
+    cumulative = np.cumsum(flows, axis=1)
+    negative = cumulative < 0
+    last_negative = np.where(negative.any(axis=1), negative.shape[1] - 1 - np.argmax(negative[:, ::-1], axis=1), -1)
+    recovered = last_negative < flows.shape[1] - 1
+    year = np.minimum(last_negative + 1, flows.shape[1] - 1)
+    rows = np.arange(len(flows))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.where(flows[rows, year] > 0, -cumulative[rows, np.maximum(last_negative, 0)] / flows[rows, year], 0)
+    return np.where(recovered, np.where(last_negative < 0, 0.0, last_negative + np.clip(fraction, 0, 1)), np.inf)
+
+
+def evaluate_portfolio(designs, **assumptions):
+    """Cash-flow figures for every row of a `sizing_engine.size_batch` result.
+
+    `designs` needs total_wh, total_cost, battery_cost, system_lifespan
+    and battery_type columns. `elec_rate` and every `DEFAULT_ASSUMPTIONS`
+    key may be a column (per row) or a keyword (all rows); a column takes
+    precedence over the keyword, which takes precedence over the default.
+    `elec_rate` has no default. Returns the frame with npv, irr, lcoe,
+    discounted_payback, simple_payback, cash_flow_savings and
+    replacement_cost columns added.
+    """
+    import pandas as pd
+    frame = pd.DataFrame(designs).reset_index(drop=True)
+    params = {}
+    for name, default in {"elec_rate": None, **DEFAULT_ASSUMPTIONS}.items():
+        if name in frame:
+            params[name] = frame[name].to_numpy(dtype=float)
+        elif name in assumptions or default is not None:
+            params[name] = assumptions.get(name, default)
+        else:
+            raise KeyError(f"{name} must be a column of the designs or a keyword")
+    result = cash_flows(frame["total_wh"].to_numpy(dtype=float), frame["total_cost"].to_numpy(dtype=float),
+                        frame["battery_cost"].to_numpy(dtype=float), params.pop("elec_rate"),
+                        frame["system_lifespan"].to_numpy(dtype=float), battery_life(frame["battery_type"].to_numpy()),
+                        **params)
+    return frame.assign(npv=result["npv"], irr=result["irr"], lcoe=result["lcoe"],
+                        discounted_payback=result["discounted_payback"], simple_payback=result["simple_payback"],
+                        cash_flow_savings=result["lifetime_savings"], replacement_cost=result["replacement_cost"])
+
+
+def main(argv=None):
+    import pandas as pd
+    parser = argparse.ArgumentParser(description="Re-evaluate quoted designs (bulk_quote results.csv) over their lifetime.")
+    parser.add_argument("results", help="results.csv from bulk_quote.py (or any size_batch output)")
+    parser.add_argument("-o", "--output", default=None, help="write the re-evaluated table here (CSV)")
+    parser.add_argument("--elec-rate", type=float, default=None, help="override every design's tariff (₦/kWh)")
+    for name, default in DEFAULT_ASSUMPTIONS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=float, default=default)
+    args = parser.parse_args(argv)
+
+    assumptions = {name: getattr(args, name) for name in DEFAULT_ASSUMPTIONS}
+    designs = pd.read_csv(args.results)
+    if args.elec_rate is not None:
+        # An override replaces the quoted tariff column
+        designs["elec_rate"] = args.elec_rate
+    table = evaluate_portfolio(designs, **assumptions)
+    if args.output:
+        table.to_csv(args.output, index=False)
+    positive = (table["npv"] > 0).mean() * 100
+    print(f"{len(table):,} designs | median NPV ₦{table['npv'].median():,.0f} | "
+          f"median IRR {table['irr'].median():.1f}% | median LCOE ₦{table['lcoe'].median():,.1f}/kWh | "
+          f"{positive:.1f}% with positive NPV")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+# =============================================================================
+# COMPONENT CATALOG
+# =============================================================================
+# Nigerian-specific component database shared by the Streamlit app and the
+# headless sizing engine. Kept free of any Streamlit import.
+#
+# The dicts below are the built-in price list. Distributor price lists live in
+# a local SQLite file (see `python catalog.py --help`) and are loaded once per
+# process by `get_catalog()`, which every session and worker shares. Each
+# table keeps NumPy columns and sorted indexes, so "smallest inverter >= X W
+# at V volts" is a binary search rather than a scan.
+
+import argparse
+import csv
+import functools
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+
+# Nigerian-specific component database (updated with realistic values)
+NIGERIAN_SOLAR_PANELS = {
+    "Jinko Tiger 350W": {"price": 85000, "vmp": 35.5, "isc": 9.8, "voc": 42.5},
+    "Canadian Solar 400W": {"price": 105000, "vmp": 37.2, "isc": 10.9, "voc": 45.5},
+    "Trina Solar 450W": {"price": 125000, "vmp": 39.8, "isc": 11.3, "voc": 48.2},
+}
+
+NIGERIAN_BATTERIES = {
+    "Trojan T-105 (225Ah)": {"price": 65000, "capacity": 225, "voltage": 6, "type": "Lead Acid"},
+    "Pylontech US2000 (200Ah)": {"price": 280000, "capacity": 200, "voltage": 48, "type": "Li-ion"},
+    "Vision 6FM200D (200Ah)": {"price": 75000, "capacity": 200, "voltage": 6, "type": "Lead Acid"},
+}
+
+NIGERIAN_INVERTERS = {
+    "Growatt 3000W 24V": {"price": 185000, "power": 3000, "voltage": 24, "type": "Hybrid"},
+    "Victron 5000W 48V": {"price": 450000, "power": 5000, "voltage": 48, "type": "Hybrid"},
+    "SMA Sunny Boy 5000W": {"price": 520000, "power": 5000, "voltage": 48, "type": "Grid-Tie"},
+}
+
+NIGERIAN_CHARGE_CONTROLLERS = {
+    "EPever 40A MPPT": {"price": 45000, "current": 40, "voltage": 150, "type": "MPPT"},
+    "Victron 100/50 MPPT": {"price": 85000, "current": 50, "voltage": 100, "type": "MPPT"},
+    "EPever 60A MPPT": {"price": 65000, "current": 60, "voltage": 150, "type": "MPPT"},
+}
+
+# Common Nigerian appliances with typical wattages and usage patterns. `schedule`
+# is the usual window of use as (start, end) hours, wrapping past midnight when
+# end < start; its length matches the default hours (see schedules.py).
+NIGERIAN_APPLIANCES = {
+    "Ceiling Fan": {"watt": 75, "hours": 8.0, "category": "Cooling", "schedule": ((22, 6),)},
+    "Standing Fan": {"watt": 55, "hours": 6.0, "category": "Cooling", "schedule": ((13, 16), (20, 23))},
+    "TV (32-inch LED)": {"watt": 50, "hours": 5.0, "category": "Entertainment", "schedule": ((18, 23),)},
+    "TV (42-inch LED)": {"watt": 80, "hours": 5.0, "category": "Entertainment", "schedule": ((18, 23),)},
+    "Refrigerator (Medium)": {"watt": 150, "hours": 8.0, "category": "Refrigeration", "schedule": ((0, 24),)},
+    "Deep Freezer": {"watt": 200, "hours": 10.0, "category": "Refrigeration", "schedule": ((0, 24),)},
+    "Air Conditioner (1HP)": {"watt": 750, "hours": 6.0, "category": "Cooling", "schedule": ((21, 3),)},
+    "Air Conditioner (1.5HP)": {"watt": 1100, "hours": 6.0, "category": "Cooling", "schedule": ((21, 3),)},
+    "Water Pump (1HP)": {"watt": 750, "hours": 2.0, "category": "Pumping", "schedule": ((6, 7), (17, 18))},
+    "Lighting (LED Bulb)": {"watt": 10, "hours": 8.0, "category": "Lighting", "schedule": ((18, 24), (5, 7))},
+    "Computer Desktop": {"watt": 200, "hours": 4.0, "category": "Computing", "schedule": ((9, 13),)},
+    "Laptop": {"watt": 65, "hours": 5.0, "category": "Computing", "schedule": ((9, 12), (19, 21))},
+    "Decoder": {"watt": 25, "hours": 6.0, "category": "Entertainment", "schedule": ((17, 23),)},
+    "Home Theatre": {"watt": 100, "hours": 3.0, "category": "Entertainment", "schedule": ((19, 22),)},
+    "Washing Machine": {"watt": 500, "hours": 2.0, "category": "Laundry", "schedule": ((10, 12),)},
+    "Electric Iron": {"watt": 1000, "hours": 1.0, "category": "Laundry", "schedule": ((6, 7),)},
+    "Microwave Oven": {"watt": 1000, "hours": 0.5, "category": "Kitchen", "schedule": ((19, 19.5),)},
+    "Electric Kettle": {"watt": 1500, "hours": 0.5, "category": "Kitchen", "schedule": ((6.5, 7),)},
+}
+
+
+CUSTOM_CATEGORY = "Custom"
+# Catalog names, longest first, so a qualified name matches its full catalog name
+_APPLIANCE_PREFIX = re.compile("|".join(re.escape(name) for name in sorted(NIGERIAN_APPLIANCES, key=len, reverse=True)))
+
+
+@functools.lru_cache(maxsize=4096)
+def appliance_spec(name):
+    """Catalog entry of a load-audit line item, matching names the audit has
+    qualified (e.g. "Deep Freezer (Kitchen)") by their longest catalog
+    prefix; an empty dict for custom appliances."""
+    match = _APPLIANCE_PREFIX.match(name)
+    return NIGERIAN_APPLIANCES[match.group()] if match else {}
+
+
+def appliance_category(name):
+    """Chart category of a line item; CUSTOM_CATEGORY for custom appliances."""
+    return appliance_spec(name).get("category", CUSTOM_CATEGORY)
+
+
+# =============================================================================
+# INDEXED TABLES
+# =============================================================================
+# Columns stored per component kind (name is the primary key; order = rowid)
+SCHEMA = {
+    "panels": {"price": "REAL", "vmp": "REAL", "isc": "REAL", "voc": "REAL"},
+    "batteries": {"price": "REAL", "capacity": "REAL", "voltage": "REAL", "type": "TEXT"},
+    "inverters": {"price": "REAL", "power": "REAL", "voltage": "REAL", "type": "TEXT"},
+    "controllers": {"price": "REAL", "current": "REAL", "voltage": "REAL", "type": "TEXT"},
+}
+
+BUILTIN_TABLES = {
+    "panels": NIGERIAN_SOLAR_PANELS,
+    "batteries": NIGERIAN_BATTERIES,
+    "inverters": NIGERIAN_INVERTERS,
+    "controllers": NIGERIAN_CHARGE_CONTROLLERS,
+}
+
+CATALOG_PATH = os.environ.get("ANNUR_CATALOG_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.db"))
+
+
+class ComponentTable(Mapping):
+    """Read-only name -> spec mapping with NumPy columns and sorted indexes.
+
+    Behaves like the plain catalog dicts (iteration keeps catalog order), and
+    adds `column(field)` and binary-search lookups over numeric fields.
+    """
+
+    def __init__(self, records):
+        self._records = dict(records)
+        self._names = list(self._records)
+        self._name_array = np.array(self._names, dtype=object)
+        self._position = {name: i for i, name in enumerate(self._names)}
+        self._columns = {}
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        return self._records[name]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    @property
+    def names(self):
+        return self._name_array
+
+    def positions(self, names):
+        """Catalog positions of `names`, -1 for unknown names."""
+        return np.fromiter((self._position.get(name, -1) for name in names), dtype=int, count=len(names))
+
+    def column(self, field):
+        values = self._columns.get(field)
+        if values is None:
+            values = np.array([item.get(field, 0) for item in self._records.values()], dtype=float)
+            values.setflags(write=False)
+            self._columns[field] = values
+        return values
+
+    def sorted_index(self, field, group_by=None):
+        """(catalog positions, sorted values) for `field`, ties in catalog order.
+
+        With `group_by`, a dict of those pairs per distinct `group_by` value.
+        """
+        key = (field, group_by)
+        index = self._indexes.get(key)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(key)
+                if index is None:
+                    index = self._build_index(field, group_by)
+                    self._indexes[key] = index
+        return index
+
+    def _build_index(self, field, group_by):
+        values = self.column(field)
+        if group_by is None:
+            order = np.argsort(values, kind="stable")
+            return order, values[order]
+        groups = self.column(group_by)
+        return {group: self._subindex(np.flatnonzero(groups == group), values) for group in np.unique(groups)}
+
+    @staticmethod
+    def _subindex(positions, values):
+        order = positions[np.argsort(values[positions], kind="stable")]
+        return order, values[order]
+
+    def smallest_at_least(self, field, minimum, group_by=None, group=None):
+        """Catalog positions of the smallest `field` >= `minimum` (scalar or array), -1 if none.
+
+        With `group_by`, only entries whose `group_by` equals `group` (scalar
+        or array aligned with `minimum`) are considered.
+        """
+        minimum = np.atleast_1d(np.asarray(minimum, dtype=float))
+        result = np.full(minimum.shape, -1, dtype=int)
+        if group_by is None:
+            parts = [(np.ones(minimum.shape, dtype=bool), self.sorted_index(field))]
+        else:
+            group = np.broadcast_to(np.asarray(group, dtype=float), minimum.shape)
+            parts = [(group == value, index) for value, index in self.sorted_index(field, group_by).items()]
+        for rows, (order, values) in parts:
+            if not rows.any():
+                continue
+            hit = np.searchsorted(values, minimum[rows], side="left")
+            found = hit < len(values)
+            result[np.flatnonzero(rows)[found]] = order[hit[found]]
+        return result
+
+    def largest(self, field, group_by=None, group=None):
+        """Catalog positions of the largest `field` (first in catalog order on ties), -1 if none."""
+        if group_by is None:
+            parts = {None: self.sorted_index(field)}
+            group = np.atleast_1d(np.asarray(np.nan if group is None else group, dtype=float))
+        else:
+            parts = self.sorted_index(field, group_by)
+            group = np.atleast_1d(np.asarray(group, dtype=float))
+        result = np.full(group.shape, -1, dtype=int)
+        for value, (order, values) in parts.items():
+            if not len(values):
+                continue
+            rows = np.ones(group.shape, dtype=bool) if value is None else group == value
+            result[rows] = order[np.searchsorted(values, values[-1], side="left")]
+        return result
+
+
+def as_table(catalog):
+    return catalog if isinstance(catalog, ComponentTable) else ComponentTable(catalog)
+
+
+class Catalog:
+    """The four component tables of one price list."""
+
+    def __init__(self, panels, batteries, inverters, controllers, source="built-in"):
+        self.panels = as_table(panels)
+        self.batteries = as_table(batteries)
+        self.inverters = as_table(inverters)
+        self.controllers = as_table(controllers)
+        self.source = source
+
+    @functools.cached_property
+    def fingerprint(self):
+        """Content hash of every table, so results priced from it can be cached."""
+        tables = {kind: {name: dict(spec) for name, spec in getattr(self, kind).items()} for kind in SCHEMA}
+        return hashlib.sha256(json.dumps(tables, sort_keys=True, default=str).encode()).hexdigest()
+
+    def __repr__(self):
+        return (f"Catalog({self.source}: {len(self.panels)} panels, {len(self.batteries)} batteries, "
+                f"{len(self.inverters)} inverters, {len(self.controllers)} controllers)")
+
+
+# =============================================================================
+# ON-DISK STORE (SQLite)
+# =============================================================================
+def _connect(path):
+    conn = sqlite3.connect(path)
+    for kind, fields in SCHEMA.items():
+        columns = ", ".join(f"{field} {sql_type}" for field, sql_type in fields.items())
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {kind} (name TEXT PRIMARY KEY, {columns})")
+        for field, sql_type in fields.items():
+            if sql_type == "REAL":
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {kind}_{field} ON {kind} ({field})")
+    return conn
+
+
+def save_items(path, kind, items):
+    """Insert or replace `items` ({name: spec}) in the `kind` table of the store at `path`."""
+    fields = list(SCHEMA[kind])
+    rows = ((name, *(spec.get(field) for field in fields)) for name, spec in items.items())
+    placeholders = ", ".join("?" * (len(fields) + 1))
+    with _connect(path) as conn:
+        conn.executemany(f"INSERT OR REPLACE INTO {kind} (name, {', '.join(fields)}) VALUES ({placeholders})", rows)
+    conn.close()
+
+
+def load_items(path, kind):
+    fields = list(SCHEMA[kind])
+    conn = _connect(path)
+    try:
+        rows = conn.execute(f"SELECT name, {', '.join(fields)} FROM {kind} ORDER BY rowid").fetchall()
+    finally:
+        conn.close()
+    return {name: {field: value for field, value in zip(fields, values) if value is not None}
+            for name, *values in rows}
+
+
+def load_catalog(path):
+    """Catalog from the SQLite store at `path`; empty tables fall back to the built-in list."""
+    tables = {kind: load_items(path, kind) or BUILTIN_TABLES[kind] for kind in SCHEMA}
+    return Catalog(**tables, source=path)
+
+
+_catalog_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_catalog(path):
+    if path and os.path.exists(path):
+        return load_catalog(path)
+    return Catalog(**BUILTIN_TABLES)
+
+
+def get_catalog(path=None):
+    """The process-wide catalog, loaded on first use and shared by every caller."""
+    with _catalog_lock:
+        return _cached_catalog(path or CATALOG_PATH)
+
+
+def import_price_list(path, kind, csv_path):
+    """Load a distributor CSV (a `name` column plus the `kind` fields) into the store."""
+    fields = SCHEMA[kind]
+    items = {}
+    with open(csv_path, newline="", encoding="utf-8-sig") as fh:
+        for row in csv.DictReader(fh):
+            spec = {}
+            for field, sql_type in fields.items():
+                value = row.get(field)
+                if value not in (None, ""):
+                    spec[field] = float(value) if sql_type == "REAL" else value
+            items[row["name"].strip()] = spec
+    save_items(path, kind, items)
+    _cached_catalog.cache_clear()
+    return len(items)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the on-disk component catalog.")
+    parser.add_argument("--db", default=CATALOG_PATH, help="SQLite catalog file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("init", help="create the store and seed it with the built-in price list")
+    importer = commands.add_parser("import", help="import a distributor CSV price list")
+    importer.add_argument("kind", choices=list(SCHEMA))
+    importer.add_argument("csv_path")
+    commands.add_parser("info", help="show what the store holds")
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        for kind, items in BUILTIN_TABLES.items():
+            save_items(args.db, kind, items)
+    elif args.command == "import":
+        print(f"Imported {import_price_list(args.db, args.kind, args.csv_path):,} {args.kind}")
+    print(load_catalog(args.db))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# =============================================================================
+# CHARTS
+# =============================================================================
+# Plotly figures for the planner, built directly from graph_objects on one
+# shared "annur" template. plotly.express is avoided: importing it pulls in
+# pandas, and it re-resolves and validates its template for every figure
+# (~30-40 ms a chart), while a go.Figure takes the registered default template
+# as is (~2 ms). Plotly itself is imported on the first chart, not at startup.
+#
+# Charts over a load audit stay readable and small at any audit size: line
+# items are summed per label and only the largest TOP_N labels are drawn, the
+# rest going to one "Other" slice or bar. Line series longer than
+# WEBGL_POINTS are drawn as WebGL traces.
+
+import functools
+
+import numpy as np
+
+BRAND_GREEN = "#006400"
+LIGHT_GREEN = "#90ee90"
+ACCENT = "#ff8c00"
+# plotly's sequential Greens, lightest first
+GREENS = ["rgb(247,252,245)", "rgb(229,245,224)", "rgb(199,233,192)", "rgb(161,217,155)", "rgb(116,196,118)",
+          "rgb(65,171,93)", "rgb(35,139,69)", "rgb(0,109,44)", "rgb(0,68,27)"]
+TEMPLATE = "annur"
+TOP_N = 12
+OTHER = "Other"
+WEBGL_POINTS = 1000
+
+
+@functools.lru_cache(maxsize=None)
+def _plotly():
+    # Import plotly and register the app template once per process
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    template = go.layout.Template(pio.templates["plotly"])
+    template.layout.colorway = [BRAND_GREEN, LIGHT_GREEN, ACCENT]
+    template.layout.piecolorway = GREENS
+    template.layout.legend.title.text = ""
+    pio.templates[TEMPLATE] = template
+    pio.templates.default = TEMPLATE
+    return go
+
+
+def top_n(labels, values, n=TOP_N, other=OTHER):
+    """`values` summed per label, largest first, the labels past the first `n`
+    folded into one trailing `other` entry. Returns (labels, totals)."""
+    names, inverse = np.unique(np.asarray(labels, dtype=object).astype(str), return_inverse=True)
+    totals = np.bincount(inverse, weights=np.asarray(values, dtype=float), minlength=len(names))
+    order = np.argsort(-totals, kind="stable")
+    if len(order) <= n:
+        return names[order].tolist(), totals[order]
+    keep, rest = order[:n - 1], order[n - 1:]
+    return names[keep].tolist() + [f"{other} ({len(rest)})"], np.append(totals[keep], totals[rest].sum())
+
+
+def _figure(traces, title, x_title=None, y_title=None, **layout):
+    go = _plotly()
+    fig = go.Figure(traces)
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title, **layout)
+    return fig
+
+
+def pie_chart(labels, values, title):
+    go = _plotly()
+    return _figure([go.Pie(labels=labels, values=values)], title)
+
+
+def bar_chart(x, y, title, x_title=None, y_title=None, color=BRAND_GREEN, **layout):
+    go = _plotly()
+    return _figure([go.Bar(x=x, y=y, marker_color=color)], title, x_title, y_title,
+                   barmode="relative", **layout)
+
+
+def line_chart(x, series, title, x_title=None, y_title=None, markers=False):
+    """One line per (name, values) item of `series`, in the template's colours;
+    WebGL traces past WEBGL_POINTS points."""
+    go = _plotly()
+    mode = "lines+markers" if markers else "lines"
+    trace = go.Scattergl if len(x) > WEBGL_POINTS else go.Scatter
+    return _figure([trace(x=x, y=y, name=name, mode=mode) for name, y in series.items()],
+                   title, x_title, y_title, showlegend=len(series) > 1)
+
+
+def tornado_chart(labels, series, title, x_title=None, colors=(LIGHT_GREEN, BRAND_GREEN)):
+    """Horizontal overlaid bars per (name, values) item, first label on top."""
+    go = _plotly()
+    return _figure([go.Bar(y=labels, x=x, name=name, orientation="h", marker_color=color)
+                    for (name, x), color in zip(series.items(), colors)],
+                   title, x_title, barmode="overlay",
+                   yaxis={"categoryorder": "array", "categoryarray": list(labels)[::-1]})
+
+
+def add_marker(fig, x, text=None):
+    """Dashed vertical line at `x` (current setting, percentile, ...)."""
+    fig.add_vline(x=x, line_dash="dash", line_color=ACCENT, annotation_text=text)
+    return fig
@@ -0,0 +1,249 @@
+# =============================================================================
+# LOCATION CLIMATE DATA
+# =============================================================================
+# Hourly global horizontal irradiance (W/m²) and ambient temperature (°C) for
+# a typical year at each project location, bundled with the planner so sizing
+# needs no network access. Kept free of any Streamlit import.
+#
+# The data is one float32 array of shape (locations, fields, 8760) in
+# data/climate.npy, described by data/climate.json. `get_climate()` memory-maps
+# it read-only once per process and hands out views into the mapping, so every
+# session shares one copy, and worker processes share the OS page cache
+# instead of each loading their own.
+#
+# The typical years are synthesised from each city's monthly climatology
+# (mean daily irradiation and temperature, diurnal temperature range) with a
+# fixed seed, so they are reproducible:
+#
+#     python climate.py build      # regenerate data/climate.npy
+#     python climate.py info       # design values per location
+
+import argparse
+import functools
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+HOURS_PER_YEAR = 8760
+DAYS_PER_YEAR = 365
+FIELDS = ("ghi", "temperature")
+SEED = 2024
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CLIMATE_PATH = os.environ.get("ANNUR_CLIMATE_PATH", os.path.join(DATA_DIR, "climate.npy"))
+
+# Monthly means, January first: daily irradiation (kWh/m²/day = peak sun
+# hours) and air temperature (°C), plus the mean daily temperature swing
+LOCATIONS = {
+    "Abuja": {"latitude": 9.06,
+              "ghi": (5.6, 6.0, 6.1, 5.9, 5.5, 5.0, 4.4, 4.2, 4.6, 5.1, 5.7, 5.6),
+              "temperature": (26.0, 28.0, 29.5, 29.0, 27.0, 25.5, 24.5, 24.0, 25.0, 26.0, 26.5, 26.0),
+              "temperature_range": 11.0},
+    "Lagos": {"latitude": 6.52,
+              "ghi": (4.9, 5.2, 5.3, 5.1, 4.7, 3.9, 3.9, 4.0, 4.2, 4.6, 4.9, 4.8),
+              "temperature": (27.0, 28.0, 28.5, 28.0, 27.0, 26.0, 25.0, 25.0, 25.5, 26.5, 27.5, 27.5),
+              "temperature_range": 7.0},
+    "Kano": {"latitude": 12.00,
+             "ghi": (5.8, 6.3, 6.6, 6.6, 6.4, 6.0, 5.4, 5.0, 5.6, 6.0, 6.0, 5.7),
+             "temperature": (21.5, 24.5, 28.5, 31.5, 31.0, 28.5, 26.0, 25.0, 26.5, 27.0, 24.5, 22.0),
+             "temperature_range": 14.0},
+    "Port Harcourt": {"latitude": 4.82,
+                      "ghi": (4.7, 4.8, 4.7, 4.6, 4.3, 3.7, 3.5, 3.5, 3.6, 4.0, 4.4, 4.6),
+                      "temperature": (26.5, 27.5, 27.5, 27.5, 27.0, 26.0, 25.0, 25.0, 25.5, 26.0, 26.5, 26.5),
+                      "temperature_range": 8.0},
+    "Kaduna": {"latitude": 10.52,
+               "ghi": (5.8, 6.2, 6.4, 6.3, 5.9, 5.4, 4.7, 4.4, 5.0, 5.6, 5.9, 5.8),
+               "temperature": (23.0, 26.0, 29.0, 30.0, 28.0, 25.5, 24.0, 23.5, 24.5, 25.5, 25.0, 23.0),
+               "temperature_range": 13.0},
+}
+
+# Battery derating: capacity-equivalent loss per °C of hot-season ambient above 25 °C
+REFERENCE_TEMPERATURE = 25.0
+DERATING_PER_DEGREE = 1.0     # % per °C
+HOT_SEASON_PERCENTILE = 95
+# Slider limits the defaults are snapped to
+SUN_HOURS_RANGE = (3.0, 8.0, 0.5)
+TEMPERATURE_FACTOR_RANGE = (80, 100)
+
+_MONTH_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+_MONTH_OF_DAY = np.repeat(np.arange(12), _MONTH_DAYS)
+
+
+# =============================================================================
+# TYPICAL YEAR SYNTHESIS
+# =============================================================================
+def _daily(monthly, rng, spread, correlation=0.6):
+    # Smooth the monthly means over the year, add day-to-day AR(1) weather,
+    # then rescale so every month keeps its climatological mean
+    middles = np.cumsum(_MONTH_DAYS) - _MONTH_DAYS / 2
+    days = np.arange(DAYS_PER_YEAR) + 0.5
+    smooth = np.interp(days, np.concatenate([middles - DAYS_PER_YEAR, middles, middles + DAYS_PER_YEAR]),
+                       np.tile(monthly, 3))
+    noise = np.empty(DAYS_PER_YEAR)
+    noise[0] = rng.normal(0, spread)
+    for day in range(1, DAYS_PER_YEAR):
+        noise[day] = correlation * noise[day - 1] + rng.normal(0, spread * np.sqrt(1 - correlation ** 2))
+    return smooth, noise
+
+
+def _solar_weights(latitude):
+    # Hourly share of each day's irradiation: a half-sine between sunrise and
+    # sunset (solar time), with day length from latitude and declination
+    day_of_year = np.arange(1, DAYS_PER_YEAR + 1)
+    declination = np.radians(23.45) * np.sin(2 * np.pi * (284 + day_of_year) / DAYS_PER_YEAR)
+    sunset_angle = np.arccos(np.clip(-np.tan(np.radians(latitude)) * np.tan(declination), -1, 1))
+    half_day = np.degrees(sunset_angle) / 15
+    hours = np.arange(24) + 0.5
+    phase = (hours[None, :] - (12 - half_day[:, None])) / (2 * half_day[:, None])
+    weights = np.where((phase > 0) & (phase < 1), np.sin(np.pi * phase), 0.0)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def typical_year(spec, rng):
+    """(ghi W/m², temperature °C), each 8760 hourly float32 values, for one location."""
+    smooth, noise = _daily(np.asarray(spec["ghi"]), rng, spread=0.15)
+    daily_ghi = smooth * np.exp(noise - 0.15 ** 2 / 2)
+    monthly_mean = np.bincount(_MONTH_OF_DAY, daily_ghi) / _MONTH_DAYS
+    daily_ghi *= (np.asarray(spec["ghi"]) / monthly_mean)[_MONTH_OF_DAY]
+    ghi = (daily_ghi[:, None] * 1000 * _solar_weights(spec["latitude"])).ravel()
+
+    smooth, noise = _daily(np.asarray(spec["temperature"]), rng, spread=0.8)
+    hours = np.arange(24) + 0.5
+    swing = spec["temperature_range"] / 2 * np.cos(2 * np.pi * (hours - 15) / 24)
+    temperature = ((smooth + noise)[:, None] + swing[None, :]).ravel()
+    return ghi.astype(np.float32), temperature.astype(np.float32)
+
+
+def _manifest_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def build(path=CLIMATE_PATH, locations=LOCATIONS, seed=SEED):
+    """Write the typical years of `locations` to `path` (+ its .json manifest)."""
+    data = np.empty((len(locations), len(FIELDS), HOURS_PER_YEAR), dtype=np.float32)
+    for i, spec in enumerate(locations.values()):
+        data[i] = typical_year(spec, np.random.default_rng(seed + i))
+    manifest = {"locations": list(locations), "fields": list(FIELDS), "hours": HOURS_PER_YEAR,
+                "units": {"ghi": "W/m2", "temperature": "degC"}, "seed": seed,
+                "latitude": {name: spec["latitude"] for name, spec in locations.items()}}
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    for target, write in ((path, lambda fh: np.save(fh, data)),
+                          (_manifest_path(path), lambda fh: fh.write(json.dumps(manifest, indent=2).encode()))):
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=".climate-")
+        with os.fdopen(fd, "wb") as fh:
+            write(fh)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, target)
+    _dataset.cache_clear()
+    location_climate.cache_clear()
+    return data
+
+
+# =============================================================================
+# LOADER
+# =============================================================================
+_dataset_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _dataset(path):
+    with open(_manifest_path(path), encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    data = np.load(path, mmap_mode="r")
+    expected = (len(manifest["locations"]), len(manifest["fields"]), manifest["hours"])
+    if data.shape != expected or data.dtype != np.float32:
+        raise ValueError(f"{path}: expected float32 {expected}, found {data.dtype} {data.shape}")
+    return data, {name: i for i, name in enumerate(manifest["locations"])}, manifest
+
+
+class LocationClimate:
+    """One location's typical year: read-only views into the shared mapping."""
+
+    def __init__(self, name, ghi, temperature):
+        self.name = name
+        self.ghi = ghi                    # (8760,) W/m², float32
+        self.temperature = temperature    # (8760,) °C, float32
+
+    def __repr__(self):
+        return f"LocationClimate({self.name}: {self.design_sun_hours} sun hours, {self.temperature_factor}% derating)"
+
+    def daily_sun_hours(self):
+        """365 daily peak sun hours (kWh/m²/day)."""
+        return self.ghi.reshape(DAYS_PER_YEAR, 24).sum(axis=1, dtype=np.float64) / 1000
+
+    def monthly_sun_hours(self):
+        return np.bincount(_MONTH_OF_DAY, self.daily_sun_hours()) / _MONTH_DAYS
+
+    @functools.cached_property
+    def design_sun_hours(self):
+        """Sun hours of the worst month, on the sizing slider's 0.5 h steps."""
+        low, high, step = SUN_HOURS_RANGE
+        return float(np.clip(np.floor(self.monthly_sun_hours().min() / step) * step, low, high))
+
+    @functools.cached_property
+    def hot_season_temperature(self):
+        return float(np.percentile(self.temperature, HOT_SEASON_PERCENTILE))
+
+    @functools.cached_property
+    def coldest_temperature(self):
+        return float(self.temperature.min())
+
+    @functools.cached_property
+    def temperature_factor(self):
+        """Battery temperature derating (%) for the hot-season ambient."""
+        loss = DERATING_PER_DEGREE * max(0.0, self.hot_season_temperature - REFERENCE_TEMPERATURE)
+        return int(np.clip(round(100 - loss), *TEMPERATURE_FACTOR_RANGE))
+
+
+@functools.lru_cache(maxsize=None)
+def location_climate(name, path):
+    data, index, _ = _dataset(path)
+    if name not in index:
+        return None
+    row = data[index[name]]
+    return LocationClimate(name, row[FIELDS.index("ghi")], row[FIELDS.index("temperature")])
+
+
+def get_climate(location, path=None):
+    """The location's climate (shared by every caller), or None if there is no data for it."""
+    with _dataset_lock:
+        return location_climate(location, path or CLIMATE_PATH)
+
+
+def design_defaults(location, path=None):
+    """Location-specific sizing defaults ({} when there is no data for it)."""
+    climate = get_climate(location, path)
+    if climate is None:
+        return {}
+    return {"sun_hours": climate.design_sun_hours, "temperature_factor": climate.temperature_factor}
+
+
+def climate_locations(path=None):
+    with _dataset_lock:
+        return list(_dataset(path or CLIMATE_PATH)[1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect the bundled location climate data.")
+    parser.add_argument("--path", default=CLIMATE_PATH, help="climate array file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="regenerate the typical years from the monthly climatology")
+    commands.add_parser("info", help="show the design values per location")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        data = build(args.path)
+        print(f"Wrote {args.path} ({data.nbytes / 1024:,.0f} KiB)")
+    for name in climate_locations(args.path):
+        climate = get_climate(name, args.path)
+        print(f"{name:15s} annual {climate.daily_sun_hours().mean():.2f} sun h/day | design month "
+              f"{climate.monthly_sun_hours().min():.2f} -> {climate.design_sun_hours} | "
+              f"hot season {climate.hot_season_temperature:.1f} °C -> {climate.temperature_factor}% derating")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# =============================================================================
+# BATTERY DEGRADATION
+# =============================================================================
+# How long a bank lasts in this design, from what it actually goes through:
+# the simulated state of charge is rainflow-counted into cycles by depth,
+# each cycle uses up a share of the chemistry's cycle life at that depth
+# (N = full_depth_cycles x depth ^ -depth_exponent, summed by Miner's rule),
+# and calendar ageing adds a yearly fade that doubles every 10 °C above
+# 25 °C. The bank is replaced when it has lost END_OF_LIFE_FADE % of its
+# capacity; the replacement years feed cashflow.cash_flows.
+#
+# Rainflow counting uses the four-point rule on each trace's turning points:
+# an inner range no larger than both of its neighbours is a closed cycle and
+# is removed. All such non-overlapping pairs of every trace go in one array
+# pass, and passes repeat until none is left (the nesting depth of the
+# cycles, not the length of the trace); what remains counts as half cycles.
+# Kept free of any Streamlit import.
+
+import numpy as np
+
+from catalog import get_catalog
+from climate import get_climate
+from simulation import HOURS_PER_YEAR, simulate_year
+from sizing_engine import battery_bank, system_costs
+from cashflow import cash_flows
+
+# Cycles to end of life at 100% depth, Wöhler exponent of the depth, and
+# calendar fade (% of capacity per year at 25 °C) per battery technology
+CHEMISTRIES = {
+    "Lead Acid": {"full_depth_cycles": 500, "depth_exponent": 1.25, "calendar_fade": 2.5},
+    "AGM": {"full_depth_cycles": 450, "depth_exponent": 1.3, "calendar_fade": 3.0},
+    "Gel": {"full_depth_cycles": 550, "depth_exponent": 1.35, "calendar_fade": 2.0},
+    "Li-ion": {"full_depth_cycles": 4000, "depth_exponent": 1.1, "calendar_fade": 1.0},
+    "LiFePO4": {"full_depth_cycles": 5000, "depth_exponent": 1.1, "calendar_fade": 0.8},
+}
+DEFAULT_CHEMISTRY = "Lead Acid"
+END_OF_LIFE_FADE = 20.0        # % capacity lost when the bank is replaced
+REFERENCE_TEMPERATURE = 25.0   # °C
+DOUBLING_TEMPERATURE = 10.0    # °C per doubling of calendar fade
+DEFAULT_BATTERY_TEMPERATURE = 27.0   # °C, where there is no climate data
+MAX_LIFE_YEARS = 25.0
+MIN_DEPTH = 1e-3               # shallower reversals are measurement noise
+
+
+# =============================================================================
+# RAINFLOW COUNTING
+# =============================================================================
+def turning_points(trace):
+    """Reversals of each row of `trace` (N, T), with its first and last points.
+
+    Returns (values, row) flattened in row order. Flat stretches are skipped.
+    """
+    trace = np.atleast_2d(np.asarray(trace, dtype=float))
+    rows, length = trace.shape
+    step = np.sign(np.diff(trace, axis=1))
+    # Direction of the last non-flat step up to each step
+    last = np.where(step != 0, np.arange(length - 1), -1)
+    np.maximum.accumulate(last, axis=1, out=last)
+    direction = np.where(last >= 0, np.take_along_axis(step, np.maximum(last, 0), axis=1), 0)
+    keep = np.ones((rows, length), dtype=bool)
+    if length > 2:
+        keep[:, 1:-1] = (step[:, 1:] != 0) & (direction[:, :-1] * step[:, 1:] < 0)
+    row, column = np.nonzero(keep)
+    return trace[row, column], row
+
+
+def rainflow(trace):
+    """Rainflow cycles of each row of `trace` (N, T).
+
+    Returns (row, depth, count) arrays: one entry per full (count 1) or half
+    (count 0.5) cycle, depth in the units of the trace.
+    """
+    values, row = turning_points(trace)
+    rows, depths, counts = [], [], []
+    while len(values) >= 4:
+        ranges = np.abs(np.diff(values))
+        same = row[:-1] == row[1:]
+        inner = ranges[1:-1]
+        closed = (same[:-2] & same[1:-1] & same[2:]
+                  & (inner <= ranges[:-2]) & (inner <= ranges[2:]))
+        candidates = np.flatnonzero(closed)
+        if not candidates.size:
+            break
+        # Pairs sharing a point cannot both go in one pass: every other one
+        # along each run of consecutive candidates
+        starts = np.r_[True, np.diff(candidates) != 1]
+        run_start = np.maximum.accumulate(np.where(starts, np.arange(len(candidates)), 0))
+        candidates = candidates[(np.arange(len(candidates)) - run_start) % 2 == 0]
+        rows.append(row[candidates + 1])
+        depths.append(inner[candidates])
+        counts.append(np.ones(len(candidates)))
+        removed = np.zeros(len(values), dtype=bool)
+        removed[candidates + 1] = removed[candidates + 2] = True
+        values, row = values[~removed], row[~removed]
+    # The residue: every remaining range is half a cycle
+    same = row[:-1] == row[1:]
+    rows.append(row[:-1][same])
+    depths.append(np.abs(np.diff(values))[same])
+    counts.append(np.full(int(same.sum()), 0.5))
+    return np.concatenate(rows), np.concatenate(depths), np.concatenate(counts)
+
+
+# =============================================================================
+# CAPACITY FADE
+# =============================================================================
+def chemistry(battery_type):
+    """Degradation parameters of a catalog battery name."""
+    spec = get_catalog().batteries.get(battery_type, {})
+    return CHEMISTRIES.get(spec.get("type"), CHEMISTRIES[DEFAULT_CHEMISTRY])
+
+
+def battery_temperature(location=None):
+    """Yearly mean ambient (°C) at the location, the batteries' working temperature."""
+    climate = None if not location else get_climate(location)
+    return DEFAULT_BATTERY_TEMPERATURE if climate is None else float(climate.temperature.mean())
+
+
+def battery_lifetime(soc, battery_types, temperature=DEFAULT_BATTERY_TEMPERATURE, hours_per_step=1):
+    """Cycling, fade and life of N banks from their state-of-charge traces.
+
+    `soc` is (N, T) (or (T,)) as a fraction of nominal capacity, one value
+    every `hours_per_step` hours (1 hourly, 24 daily); `battery_types` are N
+    catalog names (or one). Returns a dict of (N,) arrays: cycles (equivalent
+    full cycles per year), cycle_fade and calendar_fade (% per year),
+    life_years.
+    """
+    soc = np.atleast_2d(np.asarray(soc, dtype=float))
+    n = len(soc)
+    params = [chemistry(name) for name in np.broadcast_to(np.asarray(battery_types, dtype=object), (n,))]
+    full_depth_cycles, exponent, calendar = (np.array([p[key] for p in params], dtype=float) for key in
+                                             ("full_depth_cycles", "depth_exponent", "calendar_fade"))
+    per_year = HOURS_PER_YEAR / (soc.shape[1] * hours_per_step) if soc.shape[1] else 0.0
+
+    row, depth, count = rainflow(soc)
+    deep = depth >= MIN_DEPTH
+    row, depth, count = row[deep], np.minimum(depth[deep], 1.0), count[deep]
+    damage = count / (full_depth_cycles[row] * depth ** -exponent[row])
+    cycle_fade = np.bincount(row, damage, minlength=n) * per_year * END_OF_LIFE_FADE
+    calendar_fade = calendar * 2 ** ((np.asarray(temperature, dtype=float) - REFERENCE_TEMPERATURE)
+                                     / DOUBLING_TEMPERATURE)
+    calendar_fade = np.broadcast_to(calendar_fade, (n,))
+    fade = cycle_fade + calendar_fade
+    with np.errstate(divide="ignore"):
+        life = np.minimum(END_OF_LIFE_FADE / fade, MAX_LIFE_YEARS)
+    return {
+        "cycles": np.bincount(row, count * depth, minlength=n) * per_year,
+        "cycle_fade": cycle_fade,
+        "calendar_fade": calendar_fade.copy(),
+        "life_years": life,
+    }
+
+
+def replacement_years(life_years, system_lifespan):
+    """Years within the lifespan in which a bank lasting `life_years` is replaced."""
+    years = np.arange(1, int(system_lifespan))
+    return years[np.floor(years / life_years) > np.floor((years - 1) / life_years)].tolist()
+
+
+# =============================================================================
+# EVERY BATTERY FOR ONE DESIGN
+# =============================================================================
+def battery_options(pv_w, load_w, total_wh, battery_voltage, backup_time, dod_limit, temperature_factor,
+                    other_equipment_cost, elec_rate, system_lifespan, backup_wh=None, location=None,
+                    **assumptions):
+    """Size, simulate, wear out and cost every catalog battery for one design.
+
+    `pv_w` and `load_w` are the design's hourly year; `other_equipment_cost`
+    is the panels, inverter and controllers, so installed costs can be
+    recomputed per battery. `assumptions` takes cashflow's
+    discount_rate, tariff_escalation and maintenance_rate. Returns a dict of
+    per-battery arrays (catalog order): battery_type, fits (bank voltage
+    divides the system voltage), num_batteries, bank_wh, battery_cost,
+    total_cost, loss_of_load_fraction, cycles, cycle_fade, calendar_fade,
+    life_years, replacements, replacement_cost, npv, irr, lcoe.
+    """
+    batteries = get_catalog().batteries
+    names = batteries.names
+    capacity, price, volts = (batteries.column(field) for field in ("capacity", "price", "voltage"))
+    _, num_batteries = battery_bank(total_wh, backup_time, battery_voltage, dod_limit, temperature_factor,
+                                    capacity, backup_wh)
+    count = np.ceil(num_batteries)
+    bank_wh = count * capacity * battery_voltage * (temperature_factor / 100)
+
+    sim = simulate_year(pv_w, load_w, bank_wh, dod_limit, return_soc=True)
+    wear = battery_lifetime(sim["soc"], names, battery_temperature(location))
+    costs = system_costs(num_batteries, price, 0, 0, other_equipment_cost, 0)
+    flows = cash_flows(total_wh, costs["total_cost"], costs["battery_cost"], elec_rate, system_lifespan,
+                       wear["life_years"], **assumptions)
+    return {
+        "battery_type": names,
+        "fits": (volts <= battery_voltage) & (battery_voltage % np.maximum(volts, 1) == 0),
+        "num_batteries": count,
+        "bank_wh": bank_wh,
+        "battery_cost": costs["battery_cost"],
+        "total_cost": costs["total_cost"],
+        "loss_of_load_fraction": sim["loss_of_load_fraction"],
+        **wear,
+        "replacements": np.array([len(replacement_years(life, system_lifespan)) for life in wear["life_years"]]),
+        "replacement_cost": flows["replacement_cost"],
+        "npv": flows["npv"],
+        "irr": flows["irr"],
+        "lcoe": flows["lcoe"],
+    }
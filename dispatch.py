@@ -0,0 +1,214 @@
+# =============================================================================
+# GRID / GENERATOR / SOLAR DISPATCH
+# =============================================================================
+# What a client actually pays for energy today is unreliable grid supply plus
+# a petrol or diesel generator for the hours without it. This steps a year
+# hour by hour against many grid-availability scenarios at once and reports
+# served and unserved load, generator runtime, fuel and grid spend, both
+# before (grid and generator only) and after the solar/battery design; the
+# difference is the design's true yearly saving.
+#
+# Dispatch each hour, in order:
+#   - solar feeds the load, and its surplus charges the bank (the rest is
+#     curtailed),
+#   - while the grid is up it takes the remaining load and tops the bank up
+#     at `grid_charge_rate` of its capacity per hour, keeping the bank full
+#     for the next outage,
+#   - during an outage the bank discharges down to the DoD limit, then the
+#     generator takes what it can (up to its rating) and the rest is unserved.
+# Generator fuel follows a linear fuel curve: an idle term on the rating
+# plus a term on the output (L/h = idle x rated kW + slope x output kW).
+#
+# Grid availability alternates supply and outage spells of geometric length
+# whose averages give the supply band's hours per day. Only the bank's
+# energy is carried hour to hour, so the loop is a few array operations over
+# all scenarios; everything else is computed on whole (T, S) arrays. Kept
+# free of any Streamlit import.
+
+import numpy as np
+
+from simulation import HOURS_PER_DAY, HOURS_PER_YEAR, CHARGE_EFFICIENCY, DISCHARGE_EFFICIENCY
+
+# Minimum daily supply hours of each tariff band
+SUPPLY_BANDS = {"Band A": 20, "Band B": 16, "Band C": 12, "Band D": 8, "Band E": 4, "No grid": 0}
+DEFAULT_BAND = "Band C"
+DEFAULT_OUTAGE_HOURS = 4.0     # mean length of one outage
+
+# Fuel curve terms (L/h per kW of rating, L/h per kW of output)
+GENERATORS = {
+    "None": {"rated_kw": 0.0, "fuel": "Petrol", "idle": 0.0, "slope": 0.0},
+    "Petrol 2.5 kVA": {"rated_kw": 2.0, "fuel": "Petrol", "idle": 0.15, "slope": 0.40},
+    "Petrol 5 kVA": {"rated_kw": 4.0, "fuel": "Petrol", "idle": 0.14, "slope": 0.38},
+    "Diesel 10 kVA": {"rated_kw": 8.0, "fuel": "Diesel", "idle": 0.08, "slope": 0.25},
+    "Diesel 20 kVA": {"rated_kw": 16.0, "fuel": "Diesel", "idle": 0.08, "slope": 0.25},
+}
+DEFAULT_GENERATOR = "Petrol 2.5 kVA"
+FUEL_PRICES = {"Petrol": 950.0, "Diesel": 1200.0}   # ₦ per litre
+
+DEFAULT_SCENARIOS = 200
+GRID_CHARGE_RATE = 0.2          # fraction of bank capacity per hour
+PERCENTILES = (10, 50, 90)
+
+OUTPUTS = {
+    "savings": "True Savings (₦/yr)",
+    "energy_cost_before": "Grid + Fuel Spend Before (₦/yr)",
+    "energy_cost_after": "Grid + Fuel Spend After (₦/yr)",
+    "generator_hours_before": "Generator Hours Before (h/yr)",
+    "generator_hours_after": "Generator Hours After (h/yr)",
+    "fuel_saved": "Fuel Saved (L/yr)",
+    "unserved_kwh_before": "Unserved Load Before (kWh/yr)",
+    "unserved_kwh_after": "Unserved Load After (kWh/yr)",
+}
+
+
+# =============================================================================
+# GRID AVAILABILITY
+# =============================================================================
+def grid_availability(supply_hours, scenarios=1, mean_outage_hours=DEFAULT_OUTAGE_HOURS, hours=HOURS_PER_YEAR,
+                      seed=0):
+    """Hourly grid availability, (scenarios, hours) booleans.
+
+    Supply and outage spells alternate with geometric lengths averaging
+    `supply_hours` per day overall and `mean_outage_hours` per outage; each
+    scenario starts in a random state.
+    """
+    share = min(max(supply_hours / HOURS_PER_DAY, 0.0), 1.0)
+    if share in (0.0, 1.0):
+        return np.full((scenarios, hours), share == 1.0)
+    # Spells last at least an hour: with little supply, outages run longer
+    mean_off = max(float(mean_outage_hours), 1.0, (1 - share) / share)
+    mean_on = max(mean_off * share / (1 - share), 1.0)
+    rng = np.random.default_rng(seed)
+    # Enough spells for every scenario to cover the year, drawn in one go
+    spells = int(np.ceil(hours / (mean_on + mean_off) * 2 * 1.5)) + 16
+    starts_on = rng.random(scenarios) < share
+    while True:
+        odd = (np.arange(spells) % 2 == 1)
+        on_spell = starts_on[:, None] ^ odd[None, :]
+        lengths = np.where(on_spell, rng.geometric(1 / mean_on, (scenarios, spells)),
+                           rng.geometric(1 / mean_off, (scenarios, spells)))
+        ends = np.cumsum(lengths, axis=1)
+        if (ends[:, -1] >= hours).all():
+            break
+        spells *= 2
+    # Mark where each spell after the first starts; the running parity of
+    # the marks flips the starting state
+    rows, spell = np.nonzero(ends < hours)
+    flips = np.zeros((scenarios, hours), dtype=np.uint8)
+    flips[rows, ends[rows, spell]] = 1
+    return starts_on[:, None] ^ (np.cumsum(flips, axis=1, dtype=np.uint8) & 1).astype(bool)
+
+
+# =============================================================================
+# DISPATCH
+# =============================================================================
+def dispatch(pv_w, load_w, grid, battery_wh=0.0, dod_limit=80, generator=None, elec_rate=0.0, fuel_price=None,
+             grid_charge_rate=GRID_CHARGE_RATE, charge_efficiency=CHARGE_EFFICIENCY,
+             discharge_efficiency=DISCHARGE_EFFICIENCY):
+    """Dispatch one design against S grid-availability scenarios.
+
+    `pv_w` and `load_w` are hourly (T,) or (S, T); `grid` is (S, T)
+    availability; `generator` is a GENERATORS spec (None: no generator);
+    `elec_rate` is ₦/kWh and `fuel_price` ₦/L (default: the fuel's price).
+    Returns a dict of (S,) arrays: load_wh, served_wh, unserved_wh, pv_wh,
+    curtailed_wh, grid_wh, generator_wh, generator_hours, fuel_litres,
+    grid_cost, fuel_cost, energy_cost.
+    """
+    grid = np.atleast_2d(np.asarray(grid, dtype=bool))
+    scenarios, hours = grid.shape
+    generator = GENERATORS["None"] if generator is None else generator
+    fuel_price = FUEL_PRICES[generator["fuel"]] if fuel_price is None else fuel_price
+    capacity = float(battery_wh)
+    floor = capacity * (1 - dod_limit / 100)
+    ce, de = charge_efficiency, discharge_efficiency
+
+    # Hour-major (T, S) so each step reads contiguous rows; profiles shared
+    # by every scenario stay (T, 1)
+    pv_w = np.atleast_2d(np.asarray(pv_w, dtype=float)).T
+    load_w = np.atleast_2d(np.asarray(load_w, dtype=float)).T
+    up = np.ascontiguousarray(grid.T)
+    net = pv_w - load_w
+    surplus = np.maximum(net, 0)
+    deficit = np.maximum(-net, 0)
+    from_grid = np.where(up, deficit, 0.0)
+    outage_need = np.where(up, 0.0, deficit)
+    charge = discharge = grid_charge = np.zeros((1, 1))
+    if capacity > 0:
+        charge, discharge, grid_charge = (np.zeros((hours, scenarios)) for _ in range(3))
+        # Stored energy offered by solar and the grid, and drawn for the load
+        solar_in = np.broadcast_to(surplus * ce, (hours, scenarios))
+        grid_in = np.where(up, grid_charge_rate * capacity * ce, 0.0)
+        drawn = outage_need / de
+        energy = np.full(scenarios, capacity)
+        room = np.empty(scenarios)
+        for t in range(hours):
+            np.subtract(capacity, energy, out=room)
+            np.minimum(solar_in[t], room, out=charge[t])
+            energy += charge[t]
+            np.subtract(energy, floor, out=room)
+            np.minimum(drawn[t], room, out=discharge[t])
+            energy -= discharge[t]
+            np.subtract(capacity, energy, out=room)
+            np.minimum(grid_in[t], room, out=grid_charge[t])
+            energy += grid_charge[t]
+
+    remaining = np.maximum(outage_need - discharge * de, 0)
+    generated = np.minimum(remaining, generator["rated_kw"] * 1000)
+    generator_wh = generated.sum(axis=0)
+    generator_hours = np.count_nonzero(generated, axis=0)
+    unserved = remaining.sum(axis=0) - generator_wh
+    litres = generator["idle"] * generator["rated_kw"] * generator_hours + generator["slope"] * generator_wh / 1000
+    grid_wh = from_grid.sum(axis=0) + grid_charge.sum(axis=0) / ce
+    load_wh = np.broadcast_to(load_w.sum(axis=0), (scenarios,)).copy()
+    grid_cost = grid_wh / 1000 * elec_rate
+    fuel_cost = litres * fuel_price
+    return {
+        "load_wh": load_wh,
+        "served_wh": load_wh - unserved,
+        "unserved_wh": unserved,
+        "pv_wh": np.broadcast_to(pv_w.sum(axis=0), (scenarios,)).copy(),
+        "curtailed_wh": surplus.sum(axis=0) - charge.sum(axis=0) / ce,
+        "grid_wh": grid_wh,
+        "generator_wh": generator_wh,
+        "generator_hours": generator_hours,
+        "fuel_litres": litres,
+        "grid_cost": grid_cost,
+        "fuel_cost": fuel_cost,
+        "energy_cost": grid_cost + fuel_cost,
+    }
+
+
+def outage_savings(pv_w, load_w, battery_wh, dod_limit=80, supply_hours=SUPPLY_BANDS[DEFAULT_BAND],
+                   mean_outage_hours=DEFAULT_OUTAGE_HOURS, generator=None, elec_rate=0.0, fuel_price=None,
+                   scenarios=DEFAULT_SCENARIOS, seed=0):
+    """A year of grid and generator only ("before") against the design
+    ("after") over the same `scenarios` grid-availability draws.
+
+    Returns {"before": ..., "after": ... (dispatch results), "savings":
+    yearly energy-cost saving, "generator_hours_avoided", "fuel_saved",
+    "percentiles": {output: {p: value}}} with (S,) arrays throughout.
+    """
+    grid = grid_availability(supply_hours, scenarios, mean_outage_hours, np.shape(load_w)[-1], seed)
+    before = dispatch(0.0, load_w, grid, 0.0, dod_limit, generator, elec_rate, fuel_price)
+    after = dispatch(pv_w, load_w, grid, battery_wh, dod_limit, generator, elec_rate, fuel_price)
+    result = {
+        "before": before,
+        "after": after,
+        "savings": before["energy_cost"] - after["energy_cost"],
+        "generator_hours_avoided": before["generator_hours"] - after["generator_hours"],
+        "fuel_saved": before["fuel_litres"] - after["fuel_litres"],
+        "supply_hours": grid.sum(axis=1) / (grid.shape[1] / HOURS_PER_DAY),
+    }
+    outputs = {
+        "savings": result["savings"],
+        "energy_cost_before": before["energy_cost"],
+        "energy_cost_after": after["energy_cost"],
+        "generator_hours_before": before["generator_hours"],
+        "generator_hours_after": after["generator_hours"],
+        "fuel_saved": result["fuel_saved"],
+        "unserved_kwh_before": before["unserved_wh"] / 1000,
+        "unserved_kwh_after": after["unserved_wh"] / 1000,
+    }
+    result["percentiles"] = {name: dict(zip(PERCENTILES, np.percentile(values, PERCENTILES)))
+                             for name, values in outputs.items()}
+    return result
@@ -0,0 +1,236 @@
+# =============================================================================
+# LOAD LEDGER
+# =============================================================================
+# Array-backed replacement for the list-of-dicts load list. Columns live in
+# growable NumPy buffers (amortised O(1) append), the daily Wh and peak W
+# totals are kept up to date on every append/edit/delete instead of being
+# re-summed, and charts/tables read read-only views of the live rows.
+#
+# The ledger still behaves like the old list where the app relies on it:
+# `len()`, truthiness, iteration and indexing yield the familiar item dicts.
+#
+# Rows may carry their own usage schedule (see schedules.py), kept as 96
+# quarter-hour weights beside the columns; None means the appliance default.
+
+import hashlib
+
+import numpy as np
+
+from sizing_engine import make_load_item
+from schedules import usage_weights
+
+COLUMNS = ("appliance", "watt", "quantity", "total_watt", "hours", "wh")
+_NUMERIC = ("watt", "quantity", "total_watt", "hours", "wh")
+_INITIAL_CAPACITY = 16
+
+
+def _plain(value):
+    # Integral floats back to int, so item dicts print like hand-entered ones
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class LoadSnapshot:
+    """Immutable copy of a ledger's rows, hashed and compared by content.
+
+    Used as the cache key for pipeline stages: two sessions with the same
+    load list share cached tables and charts.
+    """
+
+    def __init__(self, columns, total_wh, total_watt, fingerprint, schedules=None):
+        self.columns = columns
+        self.schedules = schedules
+        self.total_wh = total_wh
+        self.total_watt = total_watt
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.columns["appliance"])
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def __eq__(self, other):
+        return isinstance(other, LoadSnapshot) and other.fingerprint == self.fingerprint
+
+    def items(self):
+        schedules = self.schedules if self.schedules is not None else [None] * len(self)
+        return [make_load_item(a, _plain(w), _plain(q), _plain(h), s) for a, w, q, h, s in
+                zip(self.columns["appliance"], self.columns["watt"], self.columns["quantity"], self.columns["hours"],
+                    schedules)]
+
+
+class LoadLedger:
+    """Columnar load list with incremental totals."""
+
+    def __init__(self, capacity=_INITIAL_CAPACITY):
+        self._size = 0
+        self._appliance = np.empty(capacity, dtype=object)
+        self._schedule = np.empty(capacity, dtype=object)
+        self._data = {name: np.zeros(capacity) for name in _NUMERIC}
+        self.total_wh = 0.0
+        self.total_watt = 0.0
+        self.version = 0
+        self._snapshot = None
+
+    @classmethod
+    def from_items(cls, items):
+        ledger = cls()
+        items = list(items)
+        if items:
+            ledger.extend([item["appliance"] for item in items], [item["watt"] for item in items],
+                          [item["quantity"] for item in items], [item["hours"] for item in items],
+                          [item.get("schedule") for item in items])
+        return ledger
+
+    # ------------------------------------------------------------------ list-like
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return (self[i] for i in range(self._size))
+
+    def __getitem__(self, index):
+        index = self._check(index)
+        return make_load_item(self._appliance[index], _plain(self._data["watt"][index]),
+                              _plain(self._data["quantity"][index]), _plain(self._data["hours"][index]),
+                              self._schedule[index])
+
+    def _check(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("load ledger index out of range")
+        return index
+
+    # ------------------------------------------------------------------ mutation
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._appliance)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        appliance = np.empty(capacity, dtype=object)
+        appliance[:self._size] = self._appliance[:self._size]
+        self._appliance = appliance
+        schedule = np.empty(capacity, dtype=object)
+        schedule[:self._size] = self._schedule[:self._size]
+        self._schedule = schedule
+        for name, column in self._data.items():
+            grown = np.zeros(capacity)
+            grown[:self._size] = column[:self._size]
+            self._data[name] = grown
+
+    def _changed(self):
+        self.version += 1
+        self._snapshot = None
+
+    def append(self, appliance, watt, quantity, hours, schedule=None):
+        self.extend([appliance], [watt], [quantity], [hours], None if schedule is None else [schedule])
+
+    def extend(self, appliances, watts, quantities, hours, schedules=None):
+        """Bulk insert; all arguments are equal-length sequences or arrays.
+
+        `schedules`, when given, holds each row's usage schedule or None.
+        """
+        watts = np.asarray(watts, dtype=float)
+        count = len(watts)
+        if count == 0:
+            return
+        quantities = np.asarray(quantities, dtype=float)
+        hours = np.asarray(hours, dtype=float)
+        total_watt = watts * quantities
+        wh = total_watt * hours
+
+        self._reserve(count)
+        rows = slice(self._size, self._size + count)
+        self._appliance[rows] = np.asarray(appliances, dtype=object)
+        self._schedule[rows] = None
+        if schedules is not None:
+            for row, schedule in zip(range(rows.start, rows.stop), schedules):
+                self._schedule[row] = usage_weights(schedule)
+        for name, values in (("watt", watts), ("quantity", quantities), ("total_watt", total_watt),
+                             ("hours", hours), ("wh", wh)):
+            self._data[name][rows] = values
+        self._size += count
+        self.total_watt += float(total_watt.sum())
+        self.total_wh += float(wh.sum())
+        self._changed()
+
+    def update(self, index, appliance=None, watt=None, quantity=None, hours=None, schedule=None):
+        """Edit one row; omitted fields keep their value."""
+        index = self._check(index)
+        data = self._data
+        self.total_watt -= data["total_watt"][index]
+        self.total_wh -= data["wh"][index]
+        if appliance is not None:
+            self._appliance[index] = appliance
+        if schedule is not None:
+            self._schedule[index] = usage_weights(schedule)
+        for name, value in (("watt", watt), ("quantity", quantity), ("hours", hours)):
+            if value is not None:
+                data[name][index] = value
+        data["total_watt"][index] = data["watt"][index] * data["quantity"][index]
+        data["wh"][index] = data["total_watt"][index] * data["hours"][index]
+        self.total_watt += data["total_watt"][index]
+        self.total_wh += data["wh"][index]
+        self._changed()
+
+    def delete(self, indexes):
+        """Remove one row or a collection of rows."""
+        drop = np.unique([self._check(i) for i in np.atleast_1d(indexes)])
+        if drop.size == 0:
+            return
+        keep = np.ones(self._size, dtype=bool)
+        keep[drop] = False
+        self.total_watt -= float(self._data["total_watt"][drop].sum())
+        self.total_wh -= float(self._data["wh"][drop].sum())
+        remaining = int(keep.sum())
+        self._appliance[:remaining] = self._appliance[:self._size][keep]
+        self._appliance[remaining:self._size] = None
+        self._schedule[:remaining] = self._schedule[:self._size][keep]
+        self._schedule[remaining:self._size] = None
+        for column in self._data.values():
+            column[:remaining] = column[:self._size][keep]
+        self._size = remaining
+        if remaining == 0:
+            self.total_wh = self.total_watt = 0.0
+        self._changed()
+
+    def clear(self):
+        self.delete(range(self._size))
+
+    # ------------------------------------------------------------------ views
+    def columns(self):
+        """Read-only views of the live rows, keyed by column name (no copies)."""
+        views = {"appliance": self._appliance[:self._size].view()}
+        views.update({name: column[:self._size].view() for name, column in self._data.items()})
+        for view in views.values():
+            view.setflags(write=False)
+        return {name: views[name] for name in COLUMNS}
+
+    def fingerprint(self):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update("\x1f".join(map(str, self._appliance[:self._size])).encode("utf-8"))
+        for name in ("watt", "quantity", "hours"):
+            digest.update(self._data[name][:self._size].tobytes())
+        for row, schedule in enumerate(self._schedule[:self._size]):
+            if schedule is not None:
+                digest.update(row.to_bytes(8, "little") + schedule.tobytes())
+        return digest.hexdigest()
+
+    def schedules(self):
+        """Each live row's own usage weights, or None when no row has any."""
+        schedules = self._schedule[:self._size]
+        return schedules.copy() if any(schedule is not None for schedule in schedules) else None
+
+    def snapshot(self):
+        """Immutable, content-hashed copy of the current rows (cached until the next edit)."""
+        if self._snapshot is None:
+            columns = {name: view.copy() for name, view in self.columns().items()}
+            for column in columns.values():
+                column.setflags(write=False)
+            self._snapshot = LoadSnapshot(columns, self.total_wh, self.total_watt, self.fingerprint(),
+                                          self.schedules())
+        return self._snapshot
@@ -0,0 +1,333 @@
+# =============================================================================
+# BULK LOAD IMPORT
+# =============================================================================
+# Load schedules from CSV or Excel (.xlsx) files of any size, for audits too
+# long to enter one appliance at a time. The file is read in chunks of
+# CHUNK_ROWS rows and each chunk is checked with vectorised rules, the same
+# limits the Load Audit inputs enforce. Valid rows collect into column arrays
+# and go into the load ledger in one `extend`; every rejected row is reported
+# with its spreadsheet row number. Kept free of any Streamlit import.
+#
+# Columns (header case and spacing ignored; common aliases accepted):
+#   appliance   required; catalog names match ignoring case and spacing
+#   watt        1-5000 W; blank takes the catalog appliance's wattage
+#   quantity    whole number 1-100; blank is 1
+#   hours       0-24 h/day; blank takes the catalog appliance's hours
+#   start, end  optional usage window (hour of day; end < start wraps past
+#               midnight); blank uses the appliance's default schedule
+#
+#     python load_import.py audit.xlsx       # validate a file, list its errors
+
+import argparse
+import difflib
+import io
+import os
+import re
+import sys
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from catalog import NIGERIAN_APPLIANCES, appliance_spec
+
+CHUNK_ROWS = 20000
+MAX_ERRORS = 1000            # row errors kept for display; all are counted
+
+# Limits of the Load Audit inputs
+WATT_RANGE = (1, 5000)
+QUANTITY_RANGE = (1, 100)
+HOURS_RANGE = (0.0, 24.0)
+
+COLUMNS = ("appliance", "watt", "quantity", "hours", "start", "end")
+ALIASES = {
+    "appliance": ("appliance", "appliance name", "name", "item", "description", "load"),
+    "watt": ("watt", "watts", "wattage", "wattage (w)", "power", "power (w)", "rating (w)", "w"),
+    "quantity": ("quantity", "qty", "count", "number", "units"),
+    "hours": ("hours", "hours/day", "hours per day", "hrs", "daily hours", "usage (h)"),
+    "start": ("start", "start hour", "from", "on"),
+    "end": ("end", "end hour", "to", "off"),
+}
+_ALIAS = {alias: column for column, aliases in ALIASES.items() for alias in aliases}
+# Catalog names keyed the way imported names are normalised
+_CATALOG_KEYS = {}
+
+
+def _key(text):
+    return re.sub(r"\s+", " ", str(text)).strip().casefold()
+
+
+for _name in NIGERIAN_APPLIANCES:
+    _CATALOG_KEYS[_key(_name)] = _name
+
+
+# =============================================================================
+# READING
+# =============================================================================
+def _header_map(header):
+    """Map file headers to COLUMNS; raises ValueError without an appliance column."""
+    mapping = {}
+    for original in header:
+        column = _ALIAS.get(_key(original))
+        if column and column not in mapping.values():
+            mapping[original] = column
+    if "appliance" not in mapping.values():
+        raise ValueError(f"no appliance column (expected one of: {', '.join(ALIASES['appliance'])})")
+    if "start" in mapping.values() and "end" not in mapping.values():
+        raise ValueError("a start column needs an end column")
+    return mapping
+
+
+def _is_excel(filename):
+    return str(filename).lower().endswith((".xlsx", ".xlsm"))
+
+
+def iter_chunks(source, filename=None, chunk_rows=CHUNK_ROWS):
+    """Yield (first spreadsheet row number, DataFrame of raw COLUMNS cells)."""
+    filename = filename or getattr(source, "name", "") or str(source)
+    first_row = 2                  # row 1 is the header
+    if _is_excel(filename):
+        try:
+            from openpyxl import load_workbook
+            from openpyxl.utils.exceptions import InvalidFileException
+        except ImportError:
+            raise ImportError("Reading Excel files requires openpyxl (pip install openpyxl)")
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        try:
+            book = load_workbook(source, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, InvalidFileException, KeyError) as error:
+            raise ValueError(f"not a readable Excel workbook ({error})")
+        try:
+            rows = book.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            mapping = _header_map(["" if cell is None else cell for cell in header])
+            positions = [i for i, cell in enumerate(header) if cell is not None and cell in mapping]
+            names = [mapping[header[i]] for i in positions]
+            block = []
+            for row in rows:
+                block.append([row[i] if i < len(row) else None for i in positions])
+                if len(block) == chunk_rows:
+                    yield first_row, pd.DataFrame(block, columns=names, dtype=object)
+                    first_row += len(block)
+                    block = []
+            if block:
+                yield first_row, pd.DataFrame(block, columns=names, dtype=object)
+        finally:
+            book.close()
+        return
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    reader = pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False,
+                         skipinitialspace=True, encoding_errors="replace")
+    mapping = None
+    for chunk in reader:
+        if mapping is None:
+            mapping = _header_map(chunk.columns)
+        yield first_row, chunk[list(mapping)].rename(columns=mapping)
+        first_row += len(chunk)
+
+
+# =============================================================================
+# VALIDATION
+# =============================================================================
+def _numbers(frame, column):
+    # (values, blank mask, unreadable mask) of one numeric column
+    if column not in frame:
+        blank = np.ones(len(frame), dtype=bool)
+        return np.full(len(frame), np.nan), blank, ~blank
+    raw = frame[column]
+    text = raw.astype(str).str.strip()
+    blank = (raw.isna() | text.isin(("", "None", "nan"))).to_numpy()
+    values = pd.to_numeric(text.str.replace(",", "", regex=False), errors="coerce").to_numpy(dtype=float)
+    return values, blank, np.isnan(values) & ~blank
+
+
+def _catalog_names(names):
+    """(name, catalog spec) per row: catalog names in catalog spelling, others
+    as given; the spec is empty for custom appliances."""
+    unique, inverse = np.unique(names, return_inverse=True)
+    spelled = np.array([_CATALOG_KEYS.get(_key(name), name) for name in unique], dtype=object)
+    specs = np.array([appliance_spec(name) for name in spelled], dtype=object)
+    return spelled[inverse], specs[inverse]
+
+
+def validate_chunk(frame, first_row=2):
+    """Check one chunk of raw cells.
+
+    Returns (rows, errors): the valid rows as a dict of column arrays (plus
+    their usage windows) and a list of {"row", "column", "value", "error"}.
+    """
+    count = len(frame)
+    appliance = frame["appliance"].fillna("").astype(str).str.strip().str.replace(r"\s+", " ", regex=True)
+    # Qualified catalog names ("Deep Freezer (Kitchen)") still take its defaults
+    appliance, specs = _catalog_names(appliance.to_numpy(dtype=object))
+    default_watt = np.array([spec.get("watt", np.nan) for spec in specs], dtype=float)
+    default_hours = np.array([spec.get("hours", np.nan) for spec in specs], dtype=float)
+
+    watt, watt_blank, watt_bad = _numbers(frame, "watt")
+    quantity, quantity_blank, quantity_bad = _numbers(frame, "quantity")
+    hours, hours_blank, hours_bad = _numbers(frame, "hours")
+    watt = np.where(watt_blank, default_watt, watt)
+    hours = np.where(hours_blank, default_hours, hours)
+    quantity = np.where(quantity_blank, 1.0, quantity)
+
+    checks = [
+        ("appliance", appliance == "", "appliance name is blank"),
+        ("watt", watt_bad, "wattage is not a number"),
+        ("watt", watt_blank & np.isnan(watt), "wattage is required for appliances not in the catalog"),
+        ("watt", ~np.isnan(watt) & ((watt < WATT_RANGE[0]) | (watt > WATT_RANGE[1])),
+         f"wattage must be {WATT_RANGE[0]}-{WATT_RANGE[1]} W"),
+        ("quantity", quantity_bad, "quantity is not a number"),
+        ("quantity", ~np.isnan(quantity) & ((quantity < QUANTITY_RANGE[0]) | (quantity > QUANTITY_RANGE[1])
+                                           | (quantity != np.round(quantity))),
+         f"quantity must be a whole number {QUANTITY_RANGE[0]}-{QUANTITY_RANGE[1]}"),
+        ("hours", hours_bad, "hours is not a number"),
+        ("hours", hours_blank & np.isnan(hours), "hours are required for appliances not in the catalog"),
+        ("hours", ~np.isnan(hours) & ((hours < HOURS_RANGE[0]) | (hours > HOURS_RANGE[1])),
+         f"hours must be {HOURS_RANGE[0]:g}-{HOURS_RANGE[1]:g} per day"),
+    ]
+    start, start_blank, start_bad = _numbers(frame, "start")
+    end, end_blank, end_bad = _numbers(frame, "end")
+    windowed = ~start_blank & ~end_blank
+    checks += [
+        ("start", start_bad, "start is not a number"),
+        ("end", end_bad, "end is not a number"),
+        ("start", start_blank & ~end_blank, "a usage window needs both start and end"),
+        ("end", end_blank & ~start_blank, "a usage window needs both start and end"),
+        ("start", windowed & ((start < 0) | (start > 24) | (end < 0) | (end > 24)),
+         "usage window hours must be 0-24"),
+        ("end", windowed & (start == end), "usage window is empty (start equals end)"),
+    ]
+
+    invalid = np.zeros(count, dtype=bool)
+    errors = []
+    for column, failed, message in checks:
+        failed = failed & ~invalid           # one error per row: the first rule it breaks
+        if not failed.any():
+            continue
+        invalid |= failed
+        values = frame[column].to_numpy(dtype=object) if column in frame else np.full(count, "", dtype=object)
+        for i in np.flatnonzero(failed):
+            value = "" if values[i] is None else values[i]
+            errors.append({"row": first_row + int(i), "column": column, "value": value, "error": message})
+    errors.sort(key=lambda error: error["row"])
+
+    valid = ~invalid
+    rows = {
+        "appliance": appliance[valid],
+        "watt": watt[valid],
+        "quantity": quantity[valid],
+        "hours": hours[valid],
+        "start": np.where(windowed, start, np.nan)[valid],
+        "end": np.where(windowed, end, np.nan)[valid],
+        "custom": np.array([not spec for spec in specs], dtype=bool)[valid],
+    }
+    return rows, errors
+
+
+class LoadImport:
+    """Validated contents of one load schedule file."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.rows = 0
+        self.error_count = 0
+        self.errors = []
+        self._parts = []
+        self._columns = None
+
+    def add(self, rows, errors, count):
+        self.rows += count
+        self.error_count += len(errors)
+        self.errors.extend(errors[:max(0, MAX_ERRORS - len(self.errors))])
+        if len(rows["appliance"]):
+            self._parts.append(rows)
+            self._columns = None
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            names = ("appliance", "watt", "quantity", "hours", "start", "end", "custom")
+            self._columns = {name: np.concatenate([part[name] for part in self._parts]) if self._parts
+                             else np.empty(0) for name in names}
+        return self._columns
+
+    @property
+    def valid(self):
+        return len(self.columns["appliance"])
+
+    @property
+    def custom(self):
+        """Number of valid rows naming appliances that are not in the catalog."""
+        return int(self.columns["custom"].sum())
+
+    def suggestions(self, limit=20):
+        """{custom name: closest catalog name} for likely misspellings."""
+        names = pd.unique(self.columns["appliance"][self.columns["custom"]])
+        found = {}
+        for name in names[:1000]:
+            close = difflib.get_close_matches(name, NIGERIAN_APPLIANCES, n=1, cutoff=0.8)
+            if close:
+                found[name] = close[0]
+                if len(found) == limit:
+                    break
+        return found
+
+    def schedules(self):
+        """Each valid row's usage window as [(start, end)], or None."""
+        start, end = self.columns["start"], self.columns["end"]
+        if np.isnan(start).all():
+            return None
+        return [None if np.isnan(s) else [(float(s), float(e))] for s, e in zip(start, end)]
+
+    def append_to(self, ledger):
+        """Add every valid row to `ledger` in one operation; returns the count."""
+        columns = self.columns
+        ledger.extend(columns["appliance"], columns["watt"], columns["quantity"], columns["hours"], self.schedules())
+        return self.valid
+
+    def error_table(self):
+        return pd.DataFrame(self.errors, columns=["row", "column", "value", "error"])
+
+
+def read_load_file(source, filename=None, chunk_rows=CHUNK_ROWS):
+    """Read and validate a CSV/XLSX load schedule (path, bytes or file object)."""
+    result = LoadImport(filename or getattr(source, "name", None) or str(source))
+    for first_row, chunk in iter_chunks(source, filename, chunk_rows):
+        rows, errors = validate_chunk(chunk, first_row)
+        result.add(rows, errors, len(chunk))
+    return result
+
+
+def template_csv():
+    """A small example file with every supported column."""
+    rows = [("Ceiling Fan", 75, 3, 8, "", ""), ("LED Bulb", 10, 12, 6, 18, 24),
+            ("Refrigerator (Medium)", "", 1, "", "", ""), ("Water Dispenser", 500, 1, 2, 7, 9)]
+    frame = pd.DataFrame(rows, columns=["appliance", "watt", "quantity", "hours", "start", "end"])
+    return frame.to_csv(index=False).encode()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a CSV/XLSX load schedule before importing it.")
+    parser.add_argument("path", help="CSV or XLSX file")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--errors", type=int, default=20, help="row errors to list")
+    args = parser.parse_args(argv)
+
+    try:
+        result = read_load_file(args.path, os.path.basename(args.path), args.chunk_rows)
+    except (ImportError, ValueError) as error:
+        raise SystemExit(f"{args.path}: {error}")
+    print(f"{result.rows:,} rows: {result.valid:,} valid ({result.custom:,} custom appliances), "
+          f"{result.error_count:,} rejected")
+    for error in result.errors[:args.errors]:
+        print(f"  row {error['row']}: {error['column']} {error['value']!r}: {error['error']}", file=sys.stderr)
+    for name, match in result.suggestions().items():
+        print(f"  {name!r} is not in the catalog; did you mean {match!r}?", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
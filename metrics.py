@@ -0,0 +1,183 @@
+# =============================================================================
+# TIMING METRICS
+# =============================================================================
+# Latency histograms for reruns, tabs, pipeline stages and report rendering.
+# Every observation goes to the process-wide REGISTRY and, when a session has
+# bound its own registry for the current run, to that session's registry too.
+# Kept free of any Streamlit import (stdlib only).
+#
+# Export, for scraping or a sidecar, is switched on by environment:
+#   ANNUR_METRICS_PORT=9464      serve /metrics (Prometheus text) on 127.0.0.1
+#   ANNUR_METRICS_FILE=/path     rewrite a Prometheus text file every
+#                                ANNUR_METRICS_INTERVAL seconds (default 15)
+
+import bisect
+import collections
+import contextlib
+import contextvars
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Prometheus-style upper bounds (seconds)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_SAMPLES = 1024     # kept per timer for percentile readouts
+METRIC_NAME = "annur_duration_seconds"
+
+
+class Histogram:
+    """Cumulative bucket counts plus a ring of recent samples."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def quantile(self, q):
+        """Percentile (0-100) of the recent samples; None when empty."""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class Registry:
+    """Named timers, safe to share between threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def summary(self):
+        """One row per timer: count, mean/p50/p95/max in milliseconds."""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            return [{
+                "timer": name,
+                "count": h.count,
+                "mean_ms": h.sum / h.count * 1000,
+                "p50_ms": h.quantile(50) * 1000,
+                "p95_ms": h.quantile(95) * 1000,
+                "max_ms": h.max * 1000,
+            } for name, h in items]
+
+    def prometheus(self, metric=METRIC_NAME):
+        """Prometheus text exposition of every timer as one labelled histogram."""
+        lines = [f"# HELP {metric} Time spent per planner rerun, tab, pipeline stage and report.",
+                 f"# TYPE {metric} histogram"]
+        with self._lock:
+            for name, h in sorted(self._histograms.items()):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip((*h.buckets, "+Inf"), h.counts):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else repr(float(bound))
+                    lines.append(f'{metric}_bucket{{timer="{label}",le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{timer="{label}"}} {h.sum!r}')
+                lines.append(f'{metric}_count{{timer="{label}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+_session = contextvars.ContextVar("metrics_session", default=None)
+
+
+def bind_session(registry):
+    """Also record this thread's observations into `registry` (a session's own)."""
+    _session.set(registry)
+
+
+def record(name, seconds):
+    REGISTRY.observe(name, seconds)
+    session = _session.get()
+    if session is not None:
+        session.observe(name, seconds)
+
+
+@contextlib.contextmanager
+def timed(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve /metrics from a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_prometheus(path):
+    """Atomically replace `path` with the current exposition."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    with os.fdopen(fd, "w") as fh:
+        fh.write(REGISTRY.prometheus())
+    os.replace(temporary, path)
+
+
+_exporters_lock = threading.Lock()
+_exporters_started = False
+
+
+def start_exporters():
+    """Start the exporters configured in the environment, once per process."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    port = os.environ.get("ANNUR_METRICS_PORT")
+    if port:
+        serve(int(port))
+    path = os.environ.get("ANNUR_METRICS_FILE")
+    if path:
+        interval = float(os.environ.get("ANNUR_METRICS_INTERVAL", 15))
+
+        def loop():
+            while True:
+                write_prometheus(path)
+                time.sleep(interval)
+
+        threading.Thread(target=loop, name="metrics-file", daemon=True).start()
@@ -0,0 +1,126 @@
+# =============================================================================
+# LEAST-COST DESIGN OPTIMIZER
+# =============================================================================
+# Searches panels x batteries x inverters x charge controllers x system
+# voltage for the cheapest designs that meet the load, using the same sizing
+# formulas as sizing_engine.
+#
+# Installation and wiring grow with equipment cost, so ranking by equipment
+# cost ranks by total cost. Equipment cost is a sum of independent parts
+# (battery bank | inverter | panels + controllers) at a given voltage, so any
+# of the K cheapest designs uses one of the K cheapest options of each part.
+# Each part is therefore costed for the whole catalog as one array, pruned to
+# its K cheapest feasible options, and only those survivors are combined.
+
+import numpy as np
+
+from catalog import get_catalog, as_table
+from sizing_engine import DEFAULT_DESIGN, battery_bank, solar_array, inverter_rating, system_costs
+from string_layout import layout_grid, design_temperatures
+
+SYSTEM_VOLTAGES = (12, 24, 48)
+
+
+def _columns(catalog, *fields):
+    table = as_table(catalog)
+    return table.names, [table.column(field) for field in fields]
+
+
+def _cheapest(cost, k):
+    # Indexes of the k cheapest finite entries, cheapest first
+    finite = np.flatnonzero(np.isfinite(cost))
+    if finite.size > k:
+        finite = finite[np.argpartition(cost[finite], k - 1)[:k]]
+    return finite[np.argsort(cost[finite], kind="stable")]
+
+
+def cheapest_designs(total_wh, total_watt, top_n=10, voltages=SYSTEM_VOLTAGES,
+                     panels=None, batteries=None, inverters=None, controllers=None, backup_wh=None, location=None,
+                     **design):
+    """Rank the cheapest feasible designs for one load.
+
+    A design is feasible when the battery voltage divides the system voltage,
+    the inverter matches the system voltage with enough power, and the
+    array has a string layout on the controller (see `string_layout`, at the
+    `location`'s temperatures); each panel/controller pair is costed at its
+    cheapest layout and controller count, and each battery SKU in whole
+    series strings at the system voltage.
+
+    `design` takes the sizing sliders (backup_time, dod_limit,
+    temperature_factor, sun_hours, system_efficiency). `backup_wh`, from a
+    usage profile, replaces total_wh x backup_time as the backup energy and
+    `total_watt` may then be its design power. Component tables default to
+    the shared catalog. Returns a DataFrame of at most `top_n`
+    designs, cheapest first.
+    """
+    import pandas as pd
+    params = {**DEFAULT_DESIGN, **design}
+    catalog = get_catalog()
+    panels = catalog.panels if panels is None else panels
+    batteries = catalog.batteries if batteries is None else batteries
+    inverters = catalog.inverters if inverters is None else inverters
+    controllers = catalog.controllers if controllers is None else controllers
+    panel_names, (panel_price, vmp, voc, isc) = _columns(panels, "price", "vmp", "voc", "isc")
+    battery_names, (battery_price, capacity, battery_volts) = _columns(batteries, "price", "capacity", "voltage")
+    inverter_names, (inverter_price, inverter_power, inverter_volts) = _columns(inverters, "price", "power", "voltage")
+    controller_names, (controller_price,) = _columns(controllers, "price")
+    inverter_size = inverter_rating(total_watt)
+    cold, hot = design_temperatures(location)
+
+    candidates = []
+    for voltage in voltages:
+        # Battery bank: one cost per battery SKU
+        battery_capacity_ah, num_batteries = battery_bank(
+            total_wh, params["backup_time"], voltage, params["dod_limit"], params["temperature_factor"], capacity,
+            backup_wh)
+        # `num_batteries` counts parallel strings at the system voltage; each
+        # string is `series` batteries
+        series = np.maximum(voltage // np.maximum(battery_volts, 1), 1)
+        num_batteries = np.ceil(num_batteries) * series
+        battery_cost = num_batteries * battery_price
+        battery_cost[(battery_volts > voltage) | (voltage % np.maximum(battery_volts, 1) != 0)] = np.inf
+
+        # Inverter: one cost per inverter SKU
+        inverter_cost = np.where((inverter_volts == voltage) & (inverter_power >= inverter_size), inverter_price, np.inf)
+
+        # Panels x controllers: the cheapest string layout of each pair (only
+        # controllers that can rank in the top N for some panel)
+        required_solar, num_panels, controller_current = solar_array(
+            total_wh, params["sun_hours"], params["system_efficiency"], voltage, vmp)
+        layouts = layout_grid(num_panels, controller_current, voltage, vmp, voc, isc, panel_price, controllers,
+                              cold, hot, depth=top_n)
+        array_cost = layouts["cost"]
+
+        top_battery = _cheapest(battery_cost, top_n)
+        top_inverter = _cheapest(inverter_cost, top_n)
+        top_array = _cheapest(array_cost.ravel(), top_n)
+        if not (top_battery.size and top_inverter.size and top_array.size):
+            continue
+
+        # Cartesian product of the survivors only
+        b, i, a = (grid.ravel() for grid in np.meshgrid(top_battery, top_inverter, top_array, indexing="ij"))
+        p, k = np.unravel_index(a, array_cost.shape)
+        c = layouts["controller"][k]
+        panels_installed = layouts["panels"][p, k]
+        candidates.append(pd.DataFrame({
+            "battery_voltage": voltage,
+            "panel_type": panel_names[p],
+            "battery_type": battery_names[b],
+            "inverter": inverter_names[i],
+            "controller": controller_names[c],
+            "battery_capacity_ah": battery_capacity_ah,
+            "num_batteries": num_batteries[b],
+            "required_solar": required_solar,
+            "num_panels": panels_installed,
+            "panels_in_series": layouts["series"][p, k],
+            "parallel_strings": layouts["strings"][p, k],
+            "controller_count": layouts["count"][p, k],
+            "inverter_size": inverter_size,
+            **system_costs(num_batteries[b], battery_price[b], panels_installed, panel_price[p],
+                           inverter_price[i], layouts["count"][p, k] * controller_price[c]),
+        }))
+
+    if not candidates:
+        return pd.DataFrame()
+    ranked = pd.concat(candidates, ignore_index=True).sort_values("total_cost", kind="stable")
+    return ranked.head(top_n).reset_index(drop=True)
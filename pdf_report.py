@@ -0,0 +1,463 @@
+# =============================================================================
+# PDF QUOTATION RENDERER
+# =============================================================================
+# A small, dependency-free PDF 1.4 writer for the quotation: branded header,
+# client block, load table (flowing over as many pages as needed), sizing and
+# cost tables, a cost breakdown chart, terms and footer.
+#
+# Everything that does not depend on the quote - font dictionaries, the logo
+# drawing, the page header/footer and the terms block - is compiled to PDF
+# bytes once per process and reused by every render. Renders can run on a
+# background thread (`render_quotation_async`) and batches stream into a ZIP
+# one document at a time (`write_quotation_zip`).
+
+import datetime
+import functools
+import math
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import timed
+from result_cache import cached_result
+from report import COMPANY, MOTTO, ADDRESS, PHONE, EMAIL, WEBSITE, TERMS_AND_CONDITIONS, quotation_reference
+
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89   # A4 in points
+MARGIN = 42
+HEADER_HEIGHT = 86
+FOOTER_HEIGHT = 46
+CONTENT_TOP = PAGE_HEIGHT - HEADER_HEIGHT - 24
+CONTENT_BOTTOM = FOOTER_HEIGHT + 18
+
+GREEN = (0.0, 0.392, 0.0)
+LIGHT_GREEN = (0.941, 1.0, 0.941)
+GREY = (0.4, 0.4, 0.4)
+BLACK = (0.0, 0.0, 0.0)
+WHITE = (1.0, 1.0, 1.0)
+
+# Helvetica advance widths (1/1000 em) for ASCII 32-126, from the standard AFM
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+
+def _clean(text):
+    # Standard fonts are WinAnsi-encoded: spell out the naira sign, drop the rest
+    return str(text).replace("₦", "NGN ").encode("cp1252", errors="replace").decode("cp1252")
+
+
+def text_width(text, size, bold=False):
+    width = sum(_HELVETICA_WIDTHS[ord(ch) - 32] if 32 <= ord(ch) <= 126 else 556 for ch in _clean(text))
+    return width * size / 1000 * (1.05 if bold else 1.0)
+
+
+def _escape(text):
+    raw = _clean(text).encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _num(value):
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _naira(value):
+    return f"NGN {value:,.0f}"
+
+
+def _controller_requirement(calc):
+    # Charge current, plus the string layout on quotes that carry one
+    current = f"{calc.get('controller_current', 0):,.0f} A"
+    layout = calc.get("controller_info") or {}
+    if not layout.get("count"):
+        return current
+    return f"{layout['count']:.0f} x, {layout['series']:.0f}S{layout['strings']:.0f}P / {current}"
+
+
+# =============================================================================
+# DRAWING
+# =============================================================================
+class _Canvas:
+    """Collects content-stream operators for one page."""
+
+    def __init__(self):
+        self.ops = []
+
+    def raw(self, data):
+        self.ops.append(data)
+
+    def color(self, rgb, stroke=False):
+        self.ops.append(f"{_num(rgb[0])} {_num(rgb[1])} {_num(rgb[2])} {'RG' if stroke else 'rg'}".encode())
+
+    def rect(self, x, y, w, h, fill=None, stroke=None, line_width=0.5):
+        if fill:
+            self.color(fill)
+        if stroke:
+            self.color(stroke, stroke=True)
+            self.ops.append(f"{_num(line_width)} w".encode())
+        op = "B" if fill and stroke else ("f" if fill else "S")
+        self.ops.append(f"{_num(x)} {_num(y)} {_num(w)} {_num(h)} re {op}".encode())
+
+    def line(self, x1, y1, x2, y2, color=GREY, line_width=0.5):
+        self.color(color, stroke=True)
+        self.ops.append(f"{_num(line_width)} w {_num(x1)} {_num(y1)} m {_num(x2)} {_num(y2)} l S".encode())
+
+    def text(self, x, y, text, size=10, bold=False, color=BLACK, align="left"):
+        if align == "right":
+            x -= text_width(text, size, bold)
+        elif align == "center":
+            x -= text_width(text, size, bold) / 2
+        self.color(color)
+        self.ops.append(b"BT /" + (b"F2" if bold else b"F1") + f" {_num(size)} Tf {_num(x)} {_num(y)} Td (".encode()
+                        + _escape(text) + b") Tj ET")
+
+    def form(self, name, x, y, scale=1.0):
+        self.ops.append(f"q {_num(scale)} 0 0 {_num(scale)} {_num(x)} {_num(y)} cm /{name} Do Q".encode())
+
+    def content(self):
+        return b"\n".join(self.ops)
+
+
+def _fit(text, width, size, bold=False):
+    text = _clean(text)
+    if text_width(text, size, bold) <= width:
+        return text
+    while text and text_width(text + "...", size, bold) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+# =============================================================================
+# PRECOMPILED STATIC ASSETS (built once per process)
+# =============================================================================
+@functools.lru_cache(maxsize=None)
+def _font_objects():
+    return [
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def _logo_form():
+    # Sun logo as a reusable form XObject (50 x 50 units)
+    k = 0.5523  # Bezier circle constant
+    r, c = 11, 25
+    ops = [b"1 0.8 0 rg 1 0.8 0 RG 2.5 w 1 J"]
+    for i in range(12):
+        angle = math.pi * i / 6
+        x1, y1 = c + 15 * math.cos(angle), c + 15 * math.sin(angle)
+        x2, y2 = c + 22 * math.cos(angle), c + 22 * math.sin(angle)
+        ops.append(f"{_num(x1)} {_num(y1)} m {_num(x2)} {_num(y2)} l S".encode())
+    ops.append((f"{c + r} {c} m "
+                f"{_num(c + r)} {_num(c + r * k)} {_num(c + r * k)} {c + r} {c} {c + r} c "
+                f"{_num(c - r * k)} {c + r} {c - r} {_num(c + r * k)} {c - r} {c} c "
+                f"{c - r} {_num(c - r * k)} {_num(c - r * k)} {c - r} {c} {c - r} c "
+                f"{_num(c + r * k)} {c - r} {c + r} {_num(c - r * k)} {c + r} {c} c f").encode())
+    return b"\n".join(ops)
+
+
+@functools.lru_cache(maxsize=None)
+def _page_template():
+    # Header band and footer shared by every page
+    canvas = _Canvas()
+    canvas.rect(0, PAGE_HEIGHT - HEADER_HEIGHT, PAGE_WIDTH, HEADER_HEIGHT, fill=GREEN)
+    canvas.rect(0, PAGE_HEIGHT - HEADER_HEIGHT - 4, PAGE_WIDTH, 4, fill=(0.0, 0.529, 0.318))
+    canvas.form("Logo", MARGIN - 6, PAGE_HEIGHT - 72, scale=1.15)
+    canvas.text(MARGIN + 58, PAGE_HEIGHT - 42, COMPANY, size=18, bold=True, color=WHITE)
+    canvas.text(MARGIN + 58, PAGE_HEIGHT - 62, MOTTO, size=10, color=WHITE)
+    canvas.text(PAGE_WIDTH - MARGIN, PAGE_HEIGHT - 42, PHONE, size=9, color=WHITE, align="right")
+    canvas.text(PAGE_WIDTH - MARGIN, PAGE_HEIGHT - 56, EMAIL, size=9, color=WHITE, align="right")
+    canvas.text(PAGE_WIDTH - MARGIN, PAGE_HEIGHT - 70, WEBSITE, size=9, color=WHITE, align="right")
+    canvas.line(MARGIN, FOOTER_HEIGHT, PAGE_WIDTH - MARGIN, FOOTER_HEIGHT, color=GREEN, line_width=1)
+    canvas.text(PAGE_WIDTH / 2, FOOTER_HEIGHT - 14, f"{COMPANY} | {PHONE} | {EMAIL}", size=8, color=GREY, align="center")
+    canvas.text(PAGE_WIDTH / 2, FOOTER_HEIGHT - 26, ADDRESS, size=8, color=GREY, align="center")
+    return canvas.content()
+
+
+TERMS_HEIGHT = 24 + 14 * len(TERMS_AND_CONDITIONS) + 22
+
+
+@functools.lru_cache(maxsize=None)
+def _terms_block():
+    # Terms & conditions drawn at the origin; placed with a translation
+    canvas = _Canvas()
+    canvas.text(0, TERMS_HEIGHT - 14, "TERMS & CONDITIONS", size=11, bold=True, color=GREEN)
+    canvas.line(0, TERMS_HEIGHT - 19, PAGE_WIDTH - 2 * MARGIN, TERMS_HEIGHT - 19, color=GREEN)
+    y = TERMS_HEIGHT - 34
+    for term in TERMS_AND_CONDITIONS:
+        canvas.text(6, y, f"- {term}", size=9)
+        y -= 14
+    canvas.text(0, y - 6, "Thank you for choosing Annur Tech - Powering Nigeria's Future!", size=10, bold=True, color=GREEN)
+    return canvas.content()
+
+
+# =============================================================================
+# DOCUMENT ASSEMBLY
+# =============================================================================
+def _assemble(page_streams):
+    """Serialise pages (content-stream bytes) into a complete PDF file."""
+    fonts = _font_objects()
+    logo = zlib.compress(_logo_form())
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # pages tree, filled in below
+        fonts[0],
+        fonts[1],
+        b"<< /Type /XObject /Subtype /Form /BBox [0 0 50 50] /Filter /FlateDecode /Length "
+        + str(len(logo)).encode() + b" >>\nstream\n" + logo + b"\nendstream",
+    ]
+    resources = b"<< /Font << /F1 3 0 R /F2 4 0 R >> /XObject << /Logo 5 0 R >> >>"
+    template = _page_template()
+    kids = []
+    for stream in page_streams:
+        data = zlib.compress(template + b"\n" + stream)
+        objects.append(b"<< /Filter /FlateDecode /Length " + str(len(data)).encode()
+                       + b" >>\nstream\n" + data + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                       f"/Contents {content_ref} 0 R /Resources ".encode() + resources + b" >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+class _Layout:
+    """Top-down flow layout over as many pages as the content needs."""
+
+    def __init__(self):
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.canvas = _Canvas()
+        self.pages.append(self.canvas)
+        self.y = CONTENT_TOP
+
+    def ensure(self, height):
+        if self.y - height < CONTENT_BOTTOM:
+            self.new_page()
+
+    def heading(self, title):
+        self.ensure(40)
+        self.y -= 8
+        self.canvas.text(MARGIN, self.y, title, size=11, bold=True, color=GREEN)
+        self.canvas.line(MARGIN, self.y - 5, PAGE_WIDTH - MARGIN, self.y - 5, color=GREEN)
+        self.y -= 20
+
+    def table(self, headers, rows, widths, align, header_fill=GREEN, zebra=True, size=9):
+        """Rows flow onto new pages, repeating the header row."""
+        row_height = size + 6
+
+        def header():
+            x = MARGIN
+            self.canvas.rect(MARGIN, self.y - 4, sum(widths), row_height, fill=header_fill)
+            for title, width, side in zip(headers, widths, align):
+                tx = x + width - 4 if side == "right" else x + 4
+                self.canvas.text(tx, self.y, title, size=size, bold=True, color=WHITE, align=side)
+                x += width
+            self.y -= row_height
+
+        self.ensure(2 * row_height)
+        header()
+        for number, row in enumerate(rows):
+            if self.y - row_height < CONTENT_BOTTOM:
+                self.new_page()
+                header()
+            if zebra and number % 2:
+                self.canvas.rect(MARGIN, self.y - 4, sum(widths), row_height, fill=LIGHT_GREEN)
+            x = MARGIN
+            for value, width, side in zip(row, widths, align):
+                tx = x + width - 4 if side == "right" else x + 4
+                self.canvas.text(tx, self.y, _fit(value, width - 8, size), size=size, align=side)
+                x += width
+            self.y -= row_height
+        self.y -= 6
+
+    def pairs(self, items, columns=2, size=9):
+        """Label/value pairs laid out in columns."""
+        column_width = (PAGE_WIDTH - 2 * MARGIN) / columns
+        for start in range(0, len(items), columns):
+            self.ensure(size + 6)
+            for offset, (label, value) in enumerate(items[start:start + columns]):
+                x = MARGIN + offset * column_width
+                self.canvas.text(x, self.y, f"{label}:", size=size, bold=True, color=GREY)
+                self.canvas.text(x + 118, self.y, _fit(value, column_width - 124, size), size=size)
+            self.y -= size + 6
+        self.y -= 4
+
+    def bar_chart(self, title, items, height=150):
+        """Horizontal bars of (label, value)."""
+        self.ensure(height + 24)
+        self.canvas.text(MARGIN, self.y, title, size=10, bold=True)
+        self.y -= 12
+        top = self.y
+        label_width, value_width = 130, 90
+        bar_area = PAGE_WIDTH - 2 * MARGIN - label_width - value_width
+        largest = max((value for _, value in items), default=0) or 1
+        bar_height = min(16, (height - 10) / max(len(items), 1) - 4)
+        for i, (label, value) in enumerate(items):
+            y = top - (i + 1) * (bar_height + 4)
+            self.canvas.text(MARGIN, y + bar_height / 2 - 3, _fit(label, label_width - 6, 8), size=8)
+            self.canvas.rect(MARGIN + label_width, y, max(bar_area * value / largest, 0.5), bar_height,
+                             fill=GREEN if i % 2 == 0 else (0.0, 0.529, 0.318))
+            self.canvas.text(PAGE_WIDTH - MARGIN, y + bar_height / 2 - 3, _naira(value), size=8, align="right")
+        self.y = top - len(items) * (bar_height + 4) - 14
+
+    def terms(self):
+        self.ensure(TERMS_HEIGHT)
+        self.canvas.raw(f"q 1 0 0 1 {MARGIN} {_num(self.y - TERMS_HEIGHT)} cm".encode())
+        self.canvas.raw(_terms_block())
+        self.canvas.raw(b"Q")
+        self.y -= TERMS_HEIGHT
+
+
+def render_quotation(client, load_data, design, calc, reference=None, issued=None):
+    """Quotation as PDF bytes; same arguments as `report.quotation_text`."""
+    with timed("report.render_pdf"):
+        return _render_quotation(client, load_data, design, calc, reference, issued)
+
+
+def cached_quotation(client, load_data, design, calc, reference=None, issued=None):
+    """`render_quotation` through the result cache, so an issued quotation renders once.
+
+    Quotations without an issue date are dated now and never cached.
+    """
+    if issued is None:
+        return render_quotation(client, load_data, design, calc, reference, issued)
+    return cached_result("quotation.pdf", lambda: render_quotation(client, load_data, design, calc, reference, issued),
+                         client, load_data, design, calc, reference, issued)
+
+
+def _render_quotation(client, load_data, design, calc, reference, issued):
+    issued = issued or datetime.datetime.now()
+    reference = reference or quotation_reference(issued)
+    doc = _Layout()
+
+    doc.canvas.text(MARGIN, doc.y, "SOLAR POWER SYSTEM QUOTATION", size=15, bold=True, color=GREEN)
+    doc.canvas.text(PAGE_WIDTH - MARGIN, doc.y, f"Ref: {reference}", size=9, bold=True, align="right")
+    doc.canvas.text(PAGE_WIDTH - MARGIN, doc.y - 12, f"Date: {issued.strftime('%Y-%m-%d %H:%M')}", size=9, align="right")
+    doc.y -= 30
+
+    doc.heading("CLIENT INFORMATION")
+    doc.pairs([
+        ("Name", client.get("name", "")),
+        ("Phone", client.get("phone", "")),
+        ("Email", client.get("email") or "Not provided"),
+        ("Location", client.get("location", "")),
+        ("Address", client.get("address", "")),
+    ])
+
+    doc.heading("LOAD AUDIT SUMMARY")
+    doc.table(
+        ["Appliance", "Watt (W)", "Qty", "Hours/Day", "Energy (Wh/day)"],
+        ([item["appliance"], f"{item['watt']:,}", f"{item['quantity']:,}", f"{item['hours']:g}", f"{item['wh']:,.0f}"]
+         for item in load_data),
+        widths=[191, 80, 50, 80, 110], align=["left", "right", "right", "right", "right"])
+    demand = [
+        ("Total Energy Demand", f"{calc.get('total_wh', 0):,.0f} Wh/day"),
+        ("Total Power Demand", f"{calc.get('total_watt', 0):,.0f} W"),
+    ]
+    if "coincident_peak" in calc:
+        demand.append(("Coincident Peak Demand",
+                       f"{calc['coincident_peak']:,.0f} W (diversity {calc['diversity_factor']:.2f})"))
+    doc.pairs(demand)
+
+    doc.heading("SYSTEM SIZING")
+    doc.pairs([
+        ("Backup Time", f"{design['backup_time']} hours"),
+        ("System Voltage", f"{design['battery_voltage']} V"),
+        ("Depth of Discharge", f"{design['dod_limit']}%"),
+        ("Temperature Derating", f"{design['temperature_factor']}%"),
+        ("Sun Hours", f"{design['sun_hours']} hours/day"),
+        ("System Efficiency", f"{design['system_efficiency']}%"),
+    ])
+    doc.table(
+        ["Component", "Specification", "Requirement"],
+        [
+            ["Battery Bank", design["battery_type"],
+             f"{calc.get('battery_capacity_ah', 0):,.0f} Ah / {calc.get('num_batteries', 0):.1f} units"],
+            ["Solar Array", design["panel_type"],
+             f"{calc.get('required_solar', 0):,.0f} W / {calc.get('num_panels', 0):.1f} panels"],
+            ["Charge Controller", calc.get("selected_controller", ""), _controller_requirement(calc)],
+            ["Inverter", calc.get("selected_inverter", ""), f"{calc.get('inverter_size', 0):,.0f} W"],
+        ],
+        widths=[110, 220, 181], align=["left", "left", "right"])
+
+    doc.heading("COST BREAKDOWN")
+    cost_items = [
+        ("Batteries", calc.get("battery_cost", 0)),
+        ("Solar Panels", calc.get("solar_cost", 0)),
+        ("Inverter", calc.get("inverter_cost", 0)),
+        ("Charge Controller", calc.get("controller_cost", 0)),
+        ("Installation", calc.get("installation_cost", 0)),
+        ("Wiring & Accessories", calc.get("wiring_cost", 0)),
+    ]
+    doc.table(["Item", "Cost"], [[label, _naira(value)] for label, value in cost_items]
+              + [["TOTAL SYSTEM COST", _naira(calc.get("total_cost", 0))]],
+              widths=[331, 180], align=["left", "right"])
+    doc.bar_chart("Where the money goes", cost_items, height=130)
+
+    doc.heading("FINANCIAL ANALYSIS")
+    doc.pairs([
+        ("Monthly Energy", f"{calc.get('monthly_energy_kwh', 0):.1f} kWh"),
+        ("Monthly Savings", _naira(calc.get("monthly_savings", 0))),
+        ("Annual Savings", _naira(calc.get("annual_savings", 0))),
+        ("Payback Period", f"{calc.get('payback_period', 0):.1f} years"),
+        (f"ROI ({design['system_lifespan']} yrs)", f"{calc.get('roi', 0):.0f}%"),
+    ])
+
+    doc.terms()
+
+    total = len(doc.pages)
+    for number, page in enumerate(doc.pages, start=1):
+        page.text(PAGE_WIDTH - MARGIN, CONTENT_BOTTOM - 10, f"Page {number} of {total}", size=8, color=GREY, align="right")
+    return _assemble(page.content() for page in doc.pages)
+
+
+# =============================================================================
+# BACKGROUND AND BATCH RENDERING
+# =============================================================================
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def render_quotation_async(*args, **kwargs):
+    """Render on a shared background thread; returns a Future of the PDF bytes."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-render")
+    return _executor.submit(cached_quotation, *args, **kwargs)
+
+
+def write_quotation_zip(target, quotes):
+    """Stream quotations into a ZIP at `target` (path or binary file object).
+
+    `quotes` yields (filename, pdf_bytes) or (filename, kwargs-for-render_quotation)
+    pairs; only one document is held in memory at a time. Returns the count.
+    """
+    count = 0
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_STORED) as archive:
+        for filename, document in quotes:
+            if isinstance(document, dict):
+                document = render_quotation(**document)
+            archive.writestr(filename, document)
+            count += 1
+    return count
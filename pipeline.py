@@ -0,0 +1,377 @@
+# =============================================================================
+# MEMOIZED PIPELINE STAGES
+# =============================================================================
+# The Load Audit -> Sizing -> Costing -> Financials pipeline split into stages,
+# each memoized on its exact inputs in a size-bounded LRU shared by every
+# session in the process. A stage's inputs include the outputs of the stages
+# it depends on, so a widget change only misses the cache from the first
+# stage that actually sees a different value: moving `elec_rate` re-runs the
+# financials stage alone, changing the panel re-runs solar sizing and costing.
+#
+# Stage results are shared between callers; treat them as read-only.
+#
+# Chart stages return figures keyed on their inputs, so an unchanged chart is
+# neither rebuilt nor re-laid out. Its serialized spec is then byte-identical
+# between reruns, which lets Streamlit send the browser a reference to the
+# copy it already holds instead of the spec itself.
+
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from catalog import get_catalog, appliance_category
+from climate import get_climate
+from ledger import LoadLedger
+from metrics import timed
+from charts import pie_chart, bar_chart, line_chart, top_n
+from sizing_engine import (
+    battery_bank,
+    solar_array,
+    inverter_rating,
+    select_inverter,
+    select_controller,
+    system_costs,
+    financial_summary,
+)
+from simulation import pv_profile, irradiance_profile, load_profile, simulate_year, battery_wh_for_target
+from uncertainty import monte_carlo
+from cashflow import cash_flows, battery_life
+from degradation import battery_options, battery_lifetime, battery_temperature
+from dispatch import SUPPLY_BANDS, GENERATORS, outage_savings
+from sensitivity import BatteryGrid, ArrayGrid, SensitivityGrid
+from result_cache import cached_result
+from schedules import DemandProfile, SLOT_HOURS, SLOTS
+
+STAGE_CACHE_SIZE = 256
+CHART_CACHE_SIZE = 32
+
+_STAGES = {}
+
+
+def stage(maxsize=STAGE_CACHE_SIZE):
+    """Memoize a pipeline stage on its (hashable) arguments with LRU eviction.
+
+    Every call, cache hit or miss, is timed as `stage.<name>`.
+    """
+    def decorate(func):
+        cached = functools.lru_cache(maxsize=maxsize)(func)
+        name = f"stage.{func.__name__}"
+
+        @functools.wraps(func)
+        def timed_stage(*args):
+            with timed(name):
+                return cached(*args)
+
+        timed_stage.cache_info = cached.cache_info
+        timed_stage.cache_clear = cached.cache_clear
+        _STAGES[func.__name__] = cached
+        return timed_stage
+    return decorate
+
+
+def stage_stats():
+    """Hits, misses and current size of every stage cache."""
+    return {name: cached.cache_info()._asdict() for name, cached in _STAGES.items()}
+
+
+def clear_stages():
+    for cached in _STAGES.values():
+        cached.cache_clear()
+
+
+def load_key(load_data):
+    """Content-hashed snapshot of a load ledger (or plain list of load items)."""
+    if not isinstance(load_data, LoadLedger):
+        load_data = LoadLedger.from_items(load_data)
+    return load_data.snapshot()
+
+
+# =============================================================================
+# STAGES
+# =============================================================================
+@stage()
+def load_summary(load):
+    return load.total_wh, load.total_watt
+
+
+@stage()
+def load_table(load):
+    import pandas as pd
+    return pd.DataFrame(load.columns, copy=False)
+
+
+@stage(CHART_CACHE_SIZE)
+def load_charts(load):
+    """Daily energy by category (pie) and by appliance (bar), top-N plus "Other"."""
+    columns = load.columns
+    names, inverse = np.unique(columns["appliance"].astype(str), return_inverse=True)
+    categories = np.array([appliance_category(name) for name in names], dtype=object)[inverse]
+    fig_pie = pie_chart(*top_n(categories, columns["wh"]), "Energy Consumption by Category")
+    labels, wh = top_n(columns["appliance"], columns["wh"])
+    fig_bar = bar_chart(labels, wh, "Daily Energy Consumption (Wh)",
+                        x_title="appliance", y_title="wh", xaxis_tickangle=-45)
+    return fig_pie, fig_bar
+
+
+@stage()
+def demand_profile(load):
+    """Coincident demand curve of the load list from its usage schedules."""
+    return DemandProfile.from_load(load)
+
+
+@stage(CHART_CACHE_SIZE)
+def demand_chart(profile):
+    return line_chart(np.arange(SLOTS) * SLOT_HOURS, {"Demand (W)": profile.curve},
+                      f"Coincident Demand (peak {profile.coincident_peak:,.0f} W at {profile.peak_time})",
+                      x_title="Hour of day", y_title="W")
+
+
+@stage()
+def battery_sizing(total_wh, backup_time, battery_voltage, dod_limit, temperature_factor, battery_type,
+                   profile=None):
+    """Battery bank for `backup_time` hours; of the profile's worst window when given."""
+    battery_info = get_catalog().batteries[battery_type]
+    backup_wh = None if profile is None else profile.backup_wh(backup_time)
+    battery_capacity_ah, num_batteries = battery_bank(total_wh, backup_time, battery_voltage, dod_limit,
+                                                      temperature_factor, battery_info["capacity"], backup_wh)
+    return {"battery_capacity_ah": battery_capacity_ah, "num_batteries": num_batteries, "battery_info": battery_info}
+
+
+@stage()
+def solar_sizing(total_wh, sun_hours, system_efficiency, battery_voltage, panel_type):
+    panel_info = get_catalog().panels[panel_type]
+    required_solar, num_panels, controller_current = solar_array(total_wh, sun_hours, system_efficiency,
+                                                                 battery_voltage, panel_info["vmp"])
+    return {"required_solar": required_solar, "num_panels": num_panels,
+            "controller_current": controller_current, "panel_info": panel_info}
+
+
+@stage()
+def inverter_selection(total_watt, battery_voltage):
+    inverter_size = inverter_rating(total_watt)
+    selected_inverter, inverter_info = select_inverter(inverter_size, battery_voltage)
+    return {"inverter_size": inverter_size, "selected_inverter": selected_inverter, "inverter_info": inverter_info}
+
+
+@stage()
+def controller_selection(controller_current, num_panels, battery_voltage, panel_type, location=None):
+    """Cheapest string layout and charge controllers, for the location's temperatures."""
+    selected_controller, controller_info = select_controller(controller_current, num_panels, battery_voltage,
+                                                             get_catalog().panels[panel_type], location=location)
+    return {"selected_controller": selected_controller, "controller_info": controller_info}
+
+
+@stage()
+def costing(num_batteries, battery_type, num_panels, panel_type, controller_current, inverter_price,
+            battery_voltage, location=None):
+    """Equipment and installed costs; the array is priced as its string layout."""
+    catalog = get_catalog()
+    battery_info = catalog.batteries[battery_type]
+    panel_info = catalog.panels[panel_type]
+    controller = controller_selection(controller_current, num_panels, battery_voltage, panel_type, location)
+    controller_info = controller["controller_info"]
+    costs = system_costs(num_batteries, battery_info.get("price", 0), controller_info["panels"],
+                         panel_info.get("price", 0), inverter_price, controller_info["controller_cost"])
+    return {**controller, **costs}
+
+
+@stage()
+def financials(total_wh, total_cost, elec_rate, system_lifespan):
+    return financial_summary(total_wh, total_cost, elec_rate, system_lifespan)
+
+
+def _year_profiles(total_wh, required_solar, sun_hours, system_efficiency, profile=None, location=None):
+    # Hourly PV and load (W) for a year: solar follows the location's typical
+    # year when there is climate data for it, else `sun_hours` every day
+    climate = None if location is None else get_climate(location)
+    if climate is None:
+        pv_hourly = pv_profile(required_solar, sun_hours, system_efficiency)
+    else:
+        pv_hourly = irradiance_profile(required_solar, climate.ghi, system_efficiency)
+    load_hourly = load_profile(total_wh) if profile is None else load_profile(total_wh, profile.daily_shape())
+    return pv_hourly, load_hourly
+
+
+@stage(CHART_CACHE_SIZE)
+def hourly_simulation(total_wh, required_solar, sun_hours, system_efficiency, bank_wh, dod_limit, profile=None,
+                      location=None):
+    """Year simulation of the installed bank, plus the smallest bank (Wh) meeting 99% of the load.
+
+    Solar follows the location's typical year when there is climate data for
+    it, else `sun_hours` every day.
+    """
+    pv_hourly, load_hourly = _year_profiles(total_wh, required_solar, sun_hours, system_efficiency, profile, location)
+    sim = simulate_year(pv_hourly, load_hourly, bank_wh, dod_limit, return_soc=True)
+    target_wh, _ = battery_wh_for_target(pv_hourly, load_hourly, np.linspace(0.02, 1.0, 50) * bank_wh, dod_limit)
+    return sim, target_wh
+
+
+@stage(CHART_CACHE_SIZE)
+def uncertainty(total_wh, total_watt, backup_time, battery_voltage, dod_limit, temperature_factor, battery_type,
+                sun_hours, system_efficiency, panel_type, elec_rate, system_lifespan, samples, seed, profile=None,
+                location=None):
+    """Monte Carlo P10/P50/P90 summary; seeded, so equal inputs give equal results."""
+    return monte_carlo(total_wh, total_watt, samples=samples, seed=seed,
+                       backup_wh=None if profile is None else profile.backup_wh(backup_time),
+                       backup_time=backup_time, battery_voltage=battery_voltage, dod_limit=dod_limit,
+                       temperature_factor=temperature_factor, battery_type=battery_type, sun_hours=sun_hours,
+                       system_efficiency=system_efficiency, panel_type=panel_type, elec_rate=elec_rate,
+                       system_lifespan=system_lifespan, location=location)
+
+
+@stage(CHART_CACHE_SIZE)
+def battery_comparison(total_wh, required_solar, sun_hours, system_efficiency, battery_voltage, backup_time,
+                       dod_limit, temperature_factor, other_equipment_cost, elec_rate, system_lifespan,
+                       discount_rate, tariff_escalation, maintenance_rate, profile=None, location=None):
+    """Every catalog battery in this design: simulated year, rainflow wear, replacements and lifetime figures."""
+    pv_hourly, load_hourly = _year_profiles(total_wh, required_solar, sun_hours, system_efficiency, profile, location)
+    return battery_options(pv_hourly, load_hourly, total_wh, battery_voltage, backup_time, dod_limit,
+                           temperature_factor, other_equipment_cost, elec_rate, system_lifespan,
+                           None if profile is None else profile.backup_wh(backup_time), location,
+                           discount_rate=discount_rate, tariff_escalation=tariff_escalation,
+                           maintenance_rate=maintenance_rate)
+
+
+@stage(CHART_CACHE_SIZE)
+def outage_dispatch(total_wh, required_solar, sun_hours, system_efficiency, bank_wh, dod_limit, supply_band,
+                    mean_outage_hours, generator, fuel_price, elec_rate, scenarios, seed, profile=None,
+                    location=None):
+    """Grid/generator spend before and after the design over `scenarios` seeded outage years."""
+    pv_hourly, load_hourly = _year_profiles(total_wh, required_solar, sun_hours, system_efficiency, profile, location)
+    return outage_savings(pv_hourly, load_hourly, bank_wh, dod_limit, SUPPLY_BANDS[supply_band], mean_outage_hours,
+                          GENERATORS[generator], elec_rate, fuel_price, scenarios, seed)
+
+
+@stage()
+def lifetime_cash_flow(total_wh, total_cost, battery_cost, elec_rate, system_lifespan, battery_type,
+                       discount_rate, tariff_escalation, maintenance_rate, life_years=None):
+    """Year-by-year cash flows of one design, with NPV, IRR, LCOE and discounted payback.
+
+    The bank is replaced every `life_years` (e.g. from `battery_comparison`),
+    else at its technology's typical interval.
+    """
+    life_years = battery_life(battery_type) if life_years is None else life_years
+    result = cash_flows(total_wh, total_cost, battery_cost, elec_rate, system_lifespan, life_years,
+                        discount_rate=discount_rate, tariff_escalation=tariff_escalation,
+                        maintenance_rate=maintenance_rate)
+    return {name: values[0] for name, values in result.items()}
+
+
+@stage(CHART_CACHE_SIZE)
+def battery_grid(total_wh, battery_voltage, battery_type, profile=None):
+    """Battery sizing over every backup time / DoD / derating slider position."""
+    return BatteryGrid(total_wh, battery_voltage, battery_type, profile=profile)
+
+
+@stage(CHART_CACHE_SIZE)
+def array_grid(total_wh, battery_voltage, panel_type, location=None):
+    """PV array and controller sizing over every sun hours / efficiency slider position."""
+    return ArrayGrid(total_wh, battery_voltage, panel_type, location)
+
+
+@stage(CHART_CACHE_SIZE)
+def sensitivity_grid(total_wh, total_watt, battery_voltage, battery_type, panel_type, profile=None, location=None):
+    return SensitivityGrid(battery_grid(total_wh, battery_voltage, battery_type, profile),
+                           array_grid(total_wh, battery_voltage, panel_type, location), total_watt, battery_voltage)
+
+
+# =============================================================================
+# WHOLE DESIGN
+# =============================================================================
+def price_design(load, design, use_schedules=True, location=None):
+    """Sizing, costs and financials of one design, chained from the stages the
+    planner's tabs run; same keys as its `st.session_state.calculations`.
+
+    `design` holds every `sizing_engine.DEFAULT_DESIGN` field. With
+    `use_schedules`, the inverter and battery are sized on coincident demand;
+    the strings are laid out for the `location`'s temperatures. Results are
+    kept in the shared result cache, keyed on the load's content, the design,
+    the location and the price list.
+    """
+    return cached_result("price_design", lambda: _price_design(load, design, use_schedules, location),
+                         load, design, use_schedules, location, get_catalog())
+
+
+def _price_design(load, design, use_schedules, location):
+    total_wh, total_watt = load_summary(load)
+    calc = {"total_wh": total_wh, "total_watt": total_watt}
+    profile, design_watt = None, total_watt
+    if use_schedules:
+        profile = demand_profile(load)
+        design_watt = profile.design_watt
+        calc.update(coincident_peak=profile.coincident_peak, diversity_factor=profile.diversity_factor,
+                    design_watt=design_watt)
+    battery = battery_sizing(total_wh, design["backup_time"], design["battery_voltage"], design["dod_limit"],
+                             design["temperature_factor"], design["battery_type"], profile)
+    solar = solar_sizing(total_wh, design["sun_hours"], design["system_efficiency"], design["battery_voltage"],
+                         design["panel_type"])
+    inverter = inverter_selection(design_watt, design["battery_voltage"])
+    costs = costing(battery["num_batteries"], design["battery_type"], solar["num_panels"], design["panel_type"],
+                    solar["controller_current"], inverter["inverter_info"].get("price", 0),
+                    design["battery_voltage"], location)
+    calc.update(battery, **solar, **inverter, **costs)
+    calc.update(financials(total_wh, costs["total_cost"], design["elec_rate"], design["system_lifespan"]))
+    return calc
+
+
+# =============================================================================
+# DESIGN COMPARISON
+# =============================================================================
+COMPARE_WORKERS = os.cpu_count() or 1
+_compare_executor = None
+_compare_lock = threading.Lock()
+
+
+def _compare_pool():
+    global _compare_executor
+    with _compare_lock:
+        if _compare_executor is None:
+            _compare_executor = ThreadPoolExecutor(max_workers=COMPARE_WORKERS, thread_name_prefix="design-compare")
+    return _compare_executor
+
+
+def compare_designs(load, designs, use_schedules=True, location=None, **assumptions):
+    """Candidate designs of one load side by side.
+
+    Each design (a full `DEFAULT_DESIGN` dict) is sized and priced by
+    `price_design` on a shared worker pool; their hourly years are then
+    simulated together as one (N, 8760) pass, worn out by rainflow counting
+    and run through the lifetime cash flows as one array each.
+    `assumptions` takes cashflow's discount_rate, tariff_escalation and
+    maintenance_rate. Returns (calcs, results): each design's `price_design`
+    dict, and a dict of (N,) arrays: bank_wh, loss_of_load_fraction,
+    curtailed_wh, days_of_autonomy, life_years, replacement_cost, npv, irr, lcoe.
+    """
+    with timed("pipeline.compare_designs"):
+        calcs = list(_compare_pool().map(lambda design: price_design(load, design, use_schedules, location),
+                                         designs))
+        total_wh = calcs[0]["total_wh"]
+        profile = demand_profile(load) if use_schedules else None
+        profiles = [_year_profiles(total_wh, calc["required_solar"], design["sun_hours"], design["system_efficiency"],
+                                   profile, location) for design, calc in zip(designs, calcs)]
+
+        def field(name):
+            return np.array([design[name] for design in designs], dtype=float)
+
+        bank_wh = (np.ceil([calc["num_batteries"] for calc in calcs]) * [calc["battery_info"]["capacity"] for calc in calcs]
+                   * field("battery_voltage") * field("temperature_factor") / 100)
+        sim = simulate_year(np.stack([pv for pv, _ in profiles]), profiles[0][1], bank_wh, field("dod_limit"),
+                            return_soc=True)
+        wear = battery_lifetime(sim.pop("soc"), [design["battery_type"] for design in designs],
+                                battery_temperature(location))
+        flows = cash_flows(total_wh, [calc["total_cost"] for calc in calcs], [calc["battery_cost"] for calc in calcs],
+                           field("elec_rate"), field("system_lifespan"), wear["life_years"], **assumptions)
+    return calcs, {
+        "bank_wh": bank_wh,
+        "loss_of_load_fraction": sim["loss_of_load_fraction"],
+        "curtailed_wh": sim["curtailed_wh"],
+        "days_of_autonomy": sim["days_of_autonomy"],
+        "life_years": wear["life_years"],
+        "replacement_cost": flows["replacement_cost"],
+        "npv": flows["npv"],
+        "irr": flows["irr"],
+        "lcoe": flows["lcoe"],
+    }
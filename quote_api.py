@@ -0,0 +1,621 @@
+# =============================================================================
+# QUOTING API
+# =============================================================================
+# JSON-over-HTTP access to Load Audit -> System Sizing -> Financials -> Report
+# for the CRM and chat bots, running beside the Streamlit UI:
+#
+#     python quote_api.py --port 8600 --workers 4
+#
+#   GET  /health                          queue depth, workers, rejections
+#   GET  /v1/catalog                      appliances, components, locations
+#   POST /v1/quote                        one load audit -> sizing, costs, financials
+#   POST /v1/quotes                       {"quotes": [...]}, many audits at once
+#   GET  /v1/quotes?name=&phone=&...      search the quote store
+#   GET  /v1/quotes/<reference>           a stored quote
+#   GET  /v1/quotes/<reference>.pdf|.txt  its quotation document
+#   GET  /metrics                         Prometheus timers
+#
+# A quote request is
+#
+#     {"client": {"name": ..., "phone": ..., "location": "Kano", ...},
+#      "load": [{"appliance": "LED Bulb", "watt": 10, "quantity": 6, "hours": 6,
+#                "schedule": [[18, 24]]}, ...],
+#      "design": {"battery_voltage": 48, ...},   # omitted fields: app defaults
+#      "use_schedules": true,                    # size on coincident demand
+#      "save": true}                             # store it, allocate a reference
+#
+# Quotes are computed by the memoized pipeline stages the UI runs, with the
+# same catalog, defaults and location climate, so both give the same numbers.
+#
+# The event loop (stdlib asyncio, no web framework) only parses and validates.
+# Sizing runs on a process pool: requests queue up and are handed to the
+# workers in batches, so a burst costs one round trip per batch rather than
+# per request. The queue is bounded; when the workers fall behind, new work is
+# refused with 503 and Retry-After instead of piling up in memory.
+
+import argparse
+import asyncio
+import collections
+import datetime
+import json
+import math
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import numpy as np
+
+from catalog import get_catalog, NIGERIAN_APPLIANCES
+from climate import climate_locations, design_defaults
+from metrics import REGISTRY, record, timed
+from pipeline import load_key, price_design
+from schedules import usage_weights
+from quote_store import save_quote, get_quote, search_quotes
+from report import cached_quotation_text
+from pdf_report import cached_quotation
+from sizing_engine import DEFAULT_DESIGN
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8600
+BATCH_SIZE = 64              # requests handed to a worker at once
+BATCH_WAIT = 0.002           # seconds a partial batch waits for company
+QUEUE_LIMIT = 2048           # queued requests before new ones get 503
+MAX_BODY = 4 * 1024 * 1024
+MAX_HEADERS = 16 * 1024
+MAX_LOAD_ITEMS = 10000
+MAX_QUOTES_PER_REQUEST = 1000
+MAX_SEARCH_RESULTS = 1000
+KEEP_ALIVE = 30              # idle seconds before a connection is closed
+SHUTDOWN_GRACE = 10          # seconds requests in progress get to finish on shutdown
+RETRY_AFTER = 1
+
+# Accepted design inputs: the UI's slider ranges and selectbox options
+DESIGN_LIMITS = {
+    "backup_time": (1, 24),
+    "dod_limit": (50, 100),
+    "temperature_factor": (80, 100),
+    "sun_hours": (3.0, 8.0),
+    "system_efficiency": (50, 95),
+    "elec_rate": (25, 100),
+    "system_lifespan": (5, 25),
+}
+BATTERY_VOLTAGES = (12, 24, 48)
+CLIENT_FIELDS = ("name", "address", "phone", "email", "location")
+
+
+class ApiError(Exception):
+    """A request the API refuses; carries the HTTP status to answer with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = HTTPStatus(status)
+
+
+# =============================================================================
+# VALIDATION (event loop)
+# =============================================================================
+def _number(value, field):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ApiError(400, f"{field} must be a number")
+    return value
+
+
+def parse_load(items):
+    if not isinstance(items, list) or not items:
+        raise ApiError(400, "load must be a non-empty list of appliances")
+    if len(items) > MAX_LOAD_ITEMS:
+        raise ApiError(413, f"load has {len(items):,} items; the limit is {MAX_LOAD_ITEMS:,}")
+    load = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ApiError(400, f"load[{i}] must be an object")
+        missing = {"appliance", "watt", "hours"} - set(item)
+        if missing:
+            raise ApiError(400, f"load[{i}] is missing {', '.join(sorted(missing))}")
+        watt = _number(item["watt"], f"load[{i}].watt")
+        quantity = _number(item.get("quantity", 1), f"load[{i}].quantity")
+        hours = _number(item["hours"], f"load[{i}].hours")
+        if watt < 0 or quantity < 0 or not 0 <= hours <= 24:
+            raise ApiError(400, f"load[{i}]: watt and quantity must be >= 0 and hours within 0-24")
+        try:
+            usage_weights(item.get("schedule"))
+        except (TypeError, ValueError) as error:
+            raise ApiError(400, f"load[{i}].schedule: {error}")
+        load.append({"appliance": str(item["appliance"]), "watt": watt, "quantity": quantity, "hours": hours,
+                     "schedule": item.get("schedule")})
+    return load
+
+
+def parse_design(fields, location=""):
+    """The full design: request fields over the location's climate over the app defaults."""
+    if not isinstance(fields, dict):
+        raise ApiError(400, "design must be an object")
+    unknown = set(fields) - set(DEFAULT_DESIGN)
+    if unknown:
+        raise ApiError(400, f"unknown design fields: {', '.join(sorted(unknown))}")
+    design = {**DEFAULT_DESIGN, **design_defaults(location), **fields}
+    for field, (low, high) in DESIGN_LIMITS.items():
+        if not low <= _number(design[field], field) <= high:
+            raise ApiError(400, f"{field} must be within {low}-{high}")
+    if design["battery_voltage"] not in BATTERY_VOLTAGES:
+        raise ApiError(400, f"battery_voltage must be one of {', '.join(map(str, BATTERY_VOLTAGES))}")
+    catalog = get_catalog()
+    for field, table in (("battery_type", catalog.batteries), ("panel_type", catalog.panels)):
+        if not isinstance(design[field], str):
+            raise ApiError(400, f"{field} must be a string")
+        if design[field] not in table:
+            raise ApiError(400, f"unknown {field}: {design[field]}")
+    return design
+
+
+def parse_search(filters):
+    """Query-string filters of a quote search, with `limit` as an int."""
+    unknown = set(filters) - {"name", "phone", "location", "date_from", "date_to", "limit"}
+    if unknown:
+        raise ApiError(400, f"unknown filters: {', '.join(sorted(unknown))}")
+    if "limit" in filters:
+        limit = filters["limit"].strip()
+        if not (limit.isdigit() and 1 <= int(limit) <= MAX_SEARCH_RESULTS):
+            raise ApiError(400, f"limit must be a whole number within 1-{MAX_SEARCH_RESULTS}")
+        filters["limit"] = int(limit)
+    return filters
+
+
+def parse_quote(body):
+    """Validate one quote request into the plain dict the workers take."""
+    if not isinstance(body, dict):
+        raise ApiError(400, "a quote request must be an object")
+    client = body.get("client") or {}
+    if not isinstance(client, dict):
+        raise ApiError(400, "client must be an object")
+    client = {field: str(client.get(field) or "") for field in CLIENT_FIELDS}
+    save = bool(body.get("save", False))
+    if save and not client["name"]:
+        raise ApiError(400, "client.name is required to save a quote")
+    return {
+        "client": client,
+        "load": parse_load(body.get("load")),
+        "design": parse_design(body.get("design") or {}, client["location"]),
+        "use_schedules": bool(body.get("use_schedules", True)),
+        "save": save,
+    }
+
+
+# =============================================================================
+# QUOTING (worker processes)
+# =============================================================================
+def _plain(value):
+    # NumPy scalars/arrays to JSON types; inf/NaN (e.g. no payback) to None
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_plain(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _links(reference):
+    return {kind: f"/v1/quotes/{reference}.{kind}" for kind in ("pdf", "txt")}
+
+
+def quote(request):
+    """Size, cost and (optionally) store one validated quote request."""
+    ledger_load = load_key(request["load"])
+    calc = price_design(ledger_load, request["design"], request["use_schedules"], request["client"]["location"])
+    reference = None
+    if request["save"]:
+        reference = save_quote(request["client"], ledger_load.items(), request["design"], calc)
+    response = {
+        "reference": reference,
+        "client": request["client"],
+        "design": request["design"],
+        "use_schedules": request["use_schedules"],
+        "results": _plain(calc),
+    }
+    if reference:
+        response["documents"] = _links(reference)
+    return response
+
+
+def quote_batch(requests):
+    """Quote a batch; one (status, body) pair per request, in order."""
+    started = time.perf_counter()
+    answers = []
+    for request in requests:
+        try:
+            answers.append((200, quote(request)))
+        except Exception as error:
+            answers.append((500, {"error": f"quoting failed: {error}"}))
+    return answers, time.perf_counter() - started
+
+
+def render_document(reference, kind):
+    """(content type, bytes) of a stored quote's PDF or text quotation, or None."""
+    stored = get_quote(reference)
+    if stored is None:
+        return None
+    args = (stored["client"], stored["load_data"], stored["design"], stored["calc"])
+    if kind == "txt":
+        text = cached_quotation_text(*args, reference=reference, issued=stored["issued"])
+        return "text/plain; charset=utf-8", text.encode()
+    return "application/pdf", cached_quotation(*args, reference=reference, issued=stored["issued"])
+
+
+def _warm_worker():
+    # Load the catalog and climate mapping before the first batch arrives
+    get_catalog()
+    climate_locations()
+
+
+# =============================================================================
+# BATCHING AND BACKPRESSURE
+# =============================================================================
+class Batcher:
+    """Hands queued requests to a process pool in batches.
+
+    At most `in_flight` batches run at once (two per worker keeps every
+    worker busy while the next batch is pickled); past that, requests wait in
+    a queue of at most `queue_limit`, and `submit` refuses any more.
+    """
+
+    def __init__(self, pool, workers, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT, queue_limit=QUEUE_LIMIT):
+        self.pool = pool
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue = asyncio.Queue(queue_limit)
+        self.slots = asyncio.Semaphore(2 * workers)
+        self.running = 0
+        self.rejected = 0
+        self.completed = 0
+        self.batches = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        """Answer everything already queued, then stop dispatching."""
+        while not self.queue.empty() or self.running:
+            await asyncio.sleep(self.batch_wait or 0.001)
+        self._task.cancel()
+
+    def room(self):
+        return self.queue.maxsize - self.queue.qsize()
+
+    def submit(self, request):
+        """Queue one request; returns a future of its (status, body)."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((request, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise ApiError(503, "quote queue is full, retry shortly")
+        return future
+
+    async def run(self, func, *args):
+        """Run one non-batched job (e.g. a PDF) on the pool, sharing its slots."""
+        async with self.slots:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            await self.slots.acquire()
+            self.running += 1
+            asyncio.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        started = time.perf_counter()
+        for _, _, queued in batch:
+            record("api.queue_wait", started - queued)
+        try:
+            answers, seconds = await asyncio.get_running_loop().run_in_executor(
+                self.pool, quote_batch, [request for request, _, _ in batch])
+            record("api.batch", seconds)
+        except Exception as error:
+            answers = [(500, {"error": f"quoting failed: {error}"})] * len(batch)
+        finally:
+            self.running -= 1
+            self.slots.release()
+        self.batches += 1
+        self.completed += len(batch)
+        for (_, future, _), answer in zip(batch, answers):
+            if not future.done():
+                future.set_result(answer)
+
+
+# =============================================================================
+# HTTP
+# =============================================================================
+def _json_response(status, body):
+    return status, "application/json", json.dumps(body, separators=(",", ":")).encode()
+
+
+class QuoteServer:
+    """Minimal HTTP/1.1 (keep-alive, Content-Length bodies) over asyncio streams."""
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+        self.started = time.time()
+        self.connections = 0
+        self.statuses = collections.Counter()
+        self.closing = False
+        self._handlers = set()
+        self._idle = set()
+
+    # ------------------------------------------------------------------ routes
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        if method == "GET" and path == "/health":
+            return _json_response(200, self.health())
+        if method == "GET" and path == "/metrics":
+            return 200, "text/plain; version=0.0.4; charset=utf-8", REGISTRY.prometheus().encode()
+        if method == "GET" and path == "/v1/catalog":
+            return _json_response(200, catalog_summary())
+        if method == "POST" and path == "/v1/quote":
+            status, answer = await self.batcher.submit(parse_quote(_load_json(body)))
+            return _json_response(status, answer)
+        if method == "POST" and path == "/v1/quotes":
+            return _json_response(200, await self.quote_many(_load_json(body)))
+        if method == "GET" and path == "/v1/quotes":
+            filters = parse_search(dict(parse_qsl(url.query)))
+            found = await asyncio.to_thread(search_quotes, **filters)
+            return _json_response(200, {"quotes": _plain(found)})
+        if method == "GET" and path.startswith("/v1/quotes/"):
+            return await self.stored(unquote(path[len("/v1/quotes/"):]))
+        if path in ROUTES or path.startswith("/v1/quotes/"):
+            raise ApiError(405, f"{method} is not allowed on {path}")
+        raise ApiError(404, f"no route for {path}")
+
+    async def quote_many(self, body):
+        requests = body.get("quotes") if isinstance(body, dict) else None
+        if not isinstance(requests, list) or not requests:
+            raise ApiError(400, 'expected {"quotes": [...]} with at least one quote')
+        if len(requests) > MAX_QUOTES_PER_REQUEST:
+            raise ApiError(413, f"at most {MAX_QUOTES_PER_REQUEST:,} quotes per request")
+        parsed = []
+        for request in requests:
+            try:
+                parsed.append(parse_quote(request))
+            except ApiError as error:
+                parsed.append(error)
+        # All or nothing: a batch that does not fit the queue is refused whole
+        if sum(not isinstance(request, ApiError) for request in parsed) > self.batcher.room():
+            self.batcher.rejected += 1
+            raise ApiError(503, "quote queue is full, retry shortly")
+        futures = [request if isinstance(request, ApiError) else self.batcher.submit(request) for request in parsed]
+        results = []
+        for future in futures:
+            if isinstance(future, ApiError):
+                results.append({"status": future.status.value, "error": str(future)})
+            else:
+                status, answer = await future
+                results.append({"status": status, **answer})
+        return {"quotes": results}
+
+    async def stored(self, name):
+        reference, _, kind = name.partition(".")
+        if kind not in ("", "pdf", "txt"):
+            raise ApiError(404, f"unknown document type: .{kind}")
+        if not kind:
+            found = await asyncio.to_thread(get_quote, reference)
+            if found is None:
+                raise ApiError(404, f"no quote {reference}")
+            return _json_response(200, {**_plain({key: value for key, value in found.items() if key != "issued"}),
+                                        "issued": found["issued"].isoformat(), "documents": _links(reference)})
+        document = await self.batcher.run(render_document, reference, kind)
+        if document is None:
+            raise ApiError(404, f"no quote {reference}")
+        return 200, *document
+
+    def health(self):
+        batcher = self.batcher
+        return {"status": "ok", "uptime_s": round(time.time() - self.started, 1), "workers": batcher.workers,
+                "queued": batcher.queue.qsize(), "queue_limit": batcher.queue.maxsize,
+                "running_batches": batcher.running, "batches": batcher.batches, "quoted": batcher.completed,
+                "rejected": batcher.rejected, "connections": self.connections,
+                "responses": {str(status): count for status, count in sorted(self.statuses.items())}}
+
+    # --------------------------------------------------------------- transport
+    async def handle(self, reader, writer):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while not self.closing:
+                self._idle.add(writer)
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self.respond(writer, *_json_response(431, {"error": "request headers too large"}),
+                                       keep_alive=False)
+                    return
+                finally:
+                    self._idle.discard(writer)
+                try:
+                    method, target, version, headers = _parse_head(head)
+                except ApiError as error:
+                    await self.respond(writer, *_json_response(error.status, {"error": str(error)}), keep_alive=False)
+                    return
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and (version == "HTTP/1.1" or headers.get("connection", "").lower() == "keep-alive"))
+                try:
+                    body = await _read_body(reader, headers)
+                    with timed(f"api.{_route_name(target)}"):
+                        response = await self.route(method, target, body)
+                except ApiError as error:
+                    response = _json_response(error.status, {"error": str(error)})
+                    if error.status == 503:
+                        response = (*response, {"Retry-After": str(RETRY_AFTER)})
+                    if error.status in (411, 413):
+                        keep_alive = False
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except Exception as error:
+                    response = _json_response(500, {"error": f"{type(error).__name__}: {error}"})
+                keep_alive = keep_alive and not self.closing
+                await self.respond(writer, *response, keep_alive=keep_alive)
+                if not keep_alive:
+                    return
+        finally:
+            self.connections -= 1
+            self._handlers.discard(task)
+            writer.close()
+
+    async def shutdown(self, grace=SHUTDOWN_GRACE):
+        """Close idle connections and give requests in progress `grace` seconds
+        to be answered (with `Connection: close`)."""
+        self.closing = True
+        for writer in list(self._idle):
+            writer.close()
+        if self._handlers:
+            await asyncio.wait(list(self._handlers), timeout=grace)
+
+    async def respond(self, writer, status, content_type, payload, headers=None, keep_alive=True):
+        status = HTTPStatus(status)
+        self.statuses[status.value] += 1
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Type: {content_type}",
+                 f"Content-Length: {len(payload)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+def _parse_head(head):
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise ApiError(400, "malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    return method.upper(), target, version, headers
+
+
+async def _read_body(reader, headers):
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise ApiError(411, "send the body with Content-Length")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise ApiError(400, "invalid Content-Length")
+    if length > MAX_BODY:
+        raise ApiError(413, f"body over {MAX_BODY // (1024 * 1024)} MiB")
+    return await reader.readexactly(length) if length > 0 else b""
+
+
+def _load_json(body):
+    try:
+        return json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        raise ApiError(400, "body is not valid JSON")
+
+
+ROUTES = ("/health", "/metrics", "/v1/catalog", "/v1/quote", "/v1/quotes")
+
+
+def _route_name(target):
+    # Timer name: per-quote references and unknown paths folded, so the
+    # number of timers stays fixed
+    path = urlsplit(target).path.rstrip("/")
+    if path.startswith("/v1/quotes/"):
+        return "/v1/quotes/<reference>"
+    return path if path in ROUTES else "<other>"
+
+
+def catalog_summary():
+    catalog = get_catalog()
+    return _plain({
+        "appliances": NIGERIAN_APPLIANCES,
+        "batteries": {name: catalog.batteries[name] for name in catalog.batteries},
+        "panels": {name: catalog.panels[name] for name in catalog.panels},
+        "inverters": {name: catalog.inverters[name] for name in catalog.inverters},
+        "controllers": {name: catalog.controllers[name] for name in catalog.controllers},
+        "locations": {name: design_defaults(name) for name in climate_locations()},
+        "design_defaults": DEFAULT_DESIGN,
+        "design_limits": {**DESIGN_LIMITS, "battery_voltage": BATTERY_VOLTAGES},
+    })
+
+
+# =============================================================================
+# DRIVER
+# =============================================================================
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, batch_size=BATCH_SIZE,
+                batch_wait=BATCH_WAIT, queue_limit=QUEUE_LIMIT, ready=None):
+    """Run the API until SIGINT/SIGTERM; `ready(server)` is called once it listens.
+
+    On a signal it stops accepting connections and lets queued and running
+    batches finish before the workers exit.
+    """
+    workers = workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker) as pool:
+        batcher = Batcher(pool, workers, batch_size, batch_wait, queue_limit)
+        batcher.start()
+        api = QuoteServer(batcher)
+        server = await asyncio.start_server(api.handle, host, port, limit=MAX_HEADERS, backlog=1024)
+        if ready:
+            ready(server)
+        try:
+            await stopping.wait()
+        finally:
+            server.close()
+            await api.shutdown()
+            await batcher.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve planner quotes as JSON over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="interface to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="sizing processes (default: all CPU cores)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="most requests per worker batch")
+    parser.add_argument("--batch-wait", type=float, default=BATCH_WAIT * 1000,
+                        help="milliseconds a partial batch waits for more requests")
+    parser.add_argument("--queue-limit", type=int, default=QUEUE_LIMIT, help="queued requests before 503s")
+    args = parser.parse_args(argv)
+
+    def ready(server):
+        address = server.sockets[0].getsockname()
+        print(f"Quoting API on http://{address[0]}:{address[1]} "
+              f"({args.workers or os.cpu_count() or 1} workers) at {datetime.datetime.now():%H:%M:%S}", flush=True)
+
+    asyncio.run(serve(args.host, args.port, args.workers, args.batch_size, args.batch_wait / 1000,
+                      args.queue_limit, ready))
+    print("Quoting API stopped", flush=True)
+
+
+if __name__ == "__main__":
+    main()
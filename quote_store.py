@@ -0,0 +1,264 @@
+# =============================================================================
+# QUOTE STORE
+# =============================================================================
+# Every issued quotation - client details, load list, design inputs and the
+# computed results - saved in a local SQLite file (WAL mode, so the app and
+# the bulk CLI can read while another process writes). Kept free of any
+# Streamlit import.
+#
+# References stay `ANNUR-YYYYMMDD-NNN`: the day's counter row is bumped and
+# the quote inserted in one write transaction, so concurrent sessions and
+# processes never hand out the same number. Client name, phone, location and
+# date are indexed; searches are index range scans, not table scans.
+
+import argparse
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+from report import quotation_reference
+
+QUOTES_PATH = os.environ.get("ANNUR_QUOTES_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "quotes.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    reference TEXT NOT NULL UNIQUE,
+    issued_date TEXT NOT NULL,
+    issued_at TEXT NOT NULL,
+    client_name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    phone TEXT,
+    phone_key TEXT,
+    email TEXT,
+    location TEXT,
+    address TEXT,
+    total_cost REAL,
+    load_json TEXT NOT NULL,
+    design_json TEXT NOT NULL,
+    results_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quotes_name ON quotes (name_key);
+CREATE INDEX IF NOT EXISTS quotes_phone ON quotes (phone_key);
+CREATE INDEX IF NOT EXISTS quotes_location ON quotes (location, issued_date);
+CREATE INDEX IF NOT EXISTS quotes_date ON quotes (issued_date);
+CREATE TABLE IF NOT EXISTS reference_counters (
+    day TEXT PRIMARY KEY,
+    last INTEGER NOT NULL
+);
+"""
+
+SUMMARY_FIELDS = ("reference", "issued_at", "client_name", "phone", "location", "total_cost")
+
+_local = threading.local()
+
+
+def _name_key(name):
+    return " ".join(str(name).lower().split())
+
+
+def _phone_key(phone):
+    # Digits only, with a leading Nigerian +234 folded to the local 0 prefix
+    digits = re.sub(r"\D", "", str(phone or ""))
+    return "0" + digits[3:] if digits.startswith("234") else digits
+
+
+def _prefix_range(column, prefix):
+    # `column LIKE 'abc%'` can't use a plain index; a half-open range can
+    return f"{column} >= ? AND {column} < ?", [prefix, prefix + "\uffff"]
+
+
+def _connect(path=None):
+    """Per-thread connection to the store at `path`, created on first use."""
+    path = path or QUOTES_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        # Sampled statistics (a few ms at any size) so multi-filter searches
+        # pick the selective index
+        conn.execute("PRAGMA analysis_limit=1000")
+        conn.execute("ANALYZE")
+        connections[path] = conn
+    return conn
+
+
+# =============================================================================
+# SERIALISATION
+# =============================================================================
+def _encode(value):
+    # json.dumps fallback for NumPy values and the optimizer's DataFrame
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    import pandas as pd
+    if isinstance(value, pd.DataFrame):
+        return {"__frame__": json.loads(value.to_json(orient="split"))}
+    raise TypeError(f"cannot store {type(value).__name__} in a quote")
+
+
+def _decode(obj):
+    if "__frame__" in obj:
+        import pandas as pd
+        frame = obj["__frame__"]
+        return pd.DataFrame(frame["data"], columns=frame["columns"])
+    return obj
+
+
+def _dumps(value):
+    return json.dumps(value, default=_encode, separators=(",", ":"))
+
+
+def _loads(text):
+    return json.loads(text, object_hook=_decode)
+
+
+# =============================================================================
+# API
+# =============================================================================
+def save_quote(client, load_data, design, calc, issued=None, path=None):
+    """Store a quotation and return its newly allocated reference.
+
+    `client`, `design` and `calc` are the dicts `report.quotation_text`
+    takes; `load_data` is any iterable of load items (a `LoadLedger` works).
+    """
+    issued = issued or datetime.datetime.now()
+    day = issued.strftime("%Y%m%d")
+    row = {
+        "issued_date": issued.strftime("%Y-%m-%d"),
+        "issued_at": issued.isoformat(timespec="seconds"),
+        "client_name": client.get("name", ""),
+        "name_key": _name_key(client.get("name", "")),
+        "phone": client.get("phone", ""),
+        "phone_key": _phone_key(client.get("phone", "")),
+        "email": client.get("email", ""),
+        "location": client.get("location", ""),
+        "address": client.get("address", ""),
+        "total_cost": float(calc.get("total_cost", 0) or 0),
+        "load_json": _dumps(list(load_data)),
+        "design_json": _dumps(design),
+        "results_json": _dumps(calc),
+    }
+    conn = _connect(path)
+    # BEGIN IMMEDIATE takes the write lock up front: counter bump and insert
+    # are one atomic step across threads and processes
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        (sequence,) = conn.execute(
+            "INSERT INTO reference_counters (day, last) VALUES (?, 1) "
+            "ON CONFLICT (day) DO UPDATE SET last = last + 1 RETURNING last", (day,)).fetchone()
+        row["reference"] = quotation_reference(issued, sequence)
+        conn.execute(f"INSERT INTO quotes ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                     list(row.values()))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return row["reference"]
+
+
+def reserve_sequences(count, issued=None, path=None):
+    """Allocate `count` consecutive reference numbers on the issue day's
+    counter, without storing any quote; returns the first.
+
+    Bulk runs number their quotations from these, so they never collide
+    with the references `save_quote` hands out on the same day.
+    """
+    issued = issued or datetime.datetime.now()
+    (last,) = _connect(path).execute(
+        "INSERT INTO reference_counters (day, last) VALUES (?, ?) "
+        "ON CONFLICT (day) DO UPDATE SET last = last + excluded.last RETURNING last",
+        (issued.strftime("%Y%m%d"), count)).fetchone()
+    return last - count + 1
+
+
+def get_quote(reference, path=None):
+    """The stored quotation as a dict (client, load_data, design, calc, ...) or None."""
+    found = _connect(path).execute(
+        "SELECT reference, issued_at, client_name, phone, email, location, address, "
+        "load_json, design_json, results_json FROM quotes WHERE reference = ?", (reference,)).fetchone()
+    if found is None:
+        return None
+    reference, issued_at, name, phone, email, location, address, load_json, design_json, results_json = found
+    return {
+        "reference": reference,
+        "issued": datetime.datetime.fromisoformat(issued_at),
+        "client": {"name": name, "phone": phone, "email": email, "location": location, "address": address},
+        "load_data": _loads(load_json),
+        "design": _loads(design_json),
+        "calc": _loads(results_json),
+    }
+
+
+def search_quotes(name=None, phone=None, location=None, date_from=None, date_to=None, limit=50, path=None):
+    """Summaries of quotes matching every given filter.
+
+    `name` and `phone` match by prefix (case, spacing and +234 ignored),
+    `location` exactly; `date_from`/`date_to` are inclusive dates. Results
+    follow the index being searched, so the first `limit` rows come straight
+    off it: by name, by phone, otherwise newest first.
+    """
+    where, params = [], []
+    order = "issued_date DESC, id DESC"
+    if name:
+        clause, values = _prefix_range("name_key", _name_key(name))
+        where.append(clause)
+        params += values
+        order = "name_key, id"
+    if phone and _phone_key(phone):
+        clause, values = _prefix_range("phone_key", _phone_key(phone))
+        where.append(clause)
+        params += values
+        order = "phone_key, id" if not name else order
+    if location:
+        where.append("location = ?")
+        params.append(location)
+    if date_from:
+        where.append("issued_date >= ?")
+        params.append(str(date_from))
+    if date_to:
+        where.append("issued_date <= ?")
+        params.append(str(date_to))
+    sql = f"SELECT {', '.join(SUMMARY_FIELDS)} FROM quotes"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order} LIMIT ?"
+    rows = _connect(path).execute(sql, params + [int(limit)]).fetchall()
+    return [dict(zip(SUMMARY_FIELDS, row)) for row in rows]
+
+
+def quote_count(path=None):
+    return _connect(path).execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search the local quote store.")
+    parser.add_argument("--db", default=QUOTES_PATH, help="SQLite quote store (default: %(default)s)")
+    parser.add_argument("--name")
+    parser.add_argument("--phone")
+    parser.add_argument("--location")
+    parser.add_argument("--date-from")
+    parser.add_argument("--date-to")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    for quote in search_quotes(args.name, args.phone, args.location, args.date_from, args.date_to,
+                               args.limit, path=args.db):
+        print(f"{quote['reference']}  {quote['issued_at']}  {quote['client_name']:<30}  "
+              f"{quote['phone'] or '':<15}  {quote['location'] or '':<14}  ₦{quote['total_cost'] or 0:,.0f}")
+    print(f"{quote_count(args.db):,} quotes in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# =============================================================================
+# QUOTATION REPORT
+# =============================================================================
+# Company branding and the quotation document shared by the Streamlit app and
+# the bulk quoting CLI. Kept free of any Streamlit import.
+
+import datetime
+
+from result_cache import cached_result
+from sizing_engine import layout_summary
+
+# Company branding
+COMPANY = "ANNUR TECH SOLAR SOLUTIONS"
+MOTTO = "Illuminating Nigeria's Future"
+ADDRESS = "No 6 Kolo Drive, Behind Zuma Barrack, Tafa LGA, Niger State, Nigeria"
+PHONE = "+234 905 169 3000"
+EMAIL = "albataskumyjr@gmail.com"
+WEBSITE = "www.annurtech.ng"
+
+RULE = "=" * 70
+
+TERMS_AND_CONDITIONS = [
+    "Quote Validity: 30 days from date of issue",
+    "Warranty: Equipment as per manufacturer warranty + 1 year workmanship",
+    "Payment Terms: 50% advance, 50% upon completion",
+    "Installation Timeline: 5-7 working days after material availability",
+    "Service: 6 months free maintenance included",
+]
+
+
+def quotation_reference(issued=None, sequence=1):
+    issued = issued or datetime.datetime.now()
+    return f"ANNUR-{issued.strftime('%Y%m%d')}-{sequence:03d}"
+
+
+def quotation_filename(client_name, issued=None, extension="pdf"):
+    issued = issued or datetime.datetime.now()
+    return f"AnnurTech_Quotation_{client_name.replace(' ', '_')}_{issued.strftime('%Y%m%d')}.{extension}"
+
+
+def quotation_text(client, load_data, design, calc, reference=None, issued=None):
+    """Plain-text quotation.
+
+    `client` holds name/address/phone/email/location, `design` the sizing
+    inputs (see `sizing_engine.DEFAULT_DESIGN`) and `calc` the results of
+    `sizing_engine.size_system` (or the UI's session calculations).
+    """
+    issued = issued or datetime.datetime.now()
+    reference = reference or quotation_reference(issued)
+
+    lines = [
+        RULE,
+        COMPANY.upper(),
+        RULE,
+        MOTTO,
+        "",
+        "CLIENT INFORMATION",
+        RULE,
+        f"Name: {client.get('name', '')}",
+        f"Address: {client.get('address', '')}",
+        f"Phone: {client.get('phone', '')}",
+        f"Email: {client.get('email') or 'Not provided'}",
+        f"Location: {client.get('location', '')}",
+        f"Date: {issued.strftime('%Y-%m-%d %H:%M')}",
+        f"Quote Reference: {reference}",
+        "",
+        "LOAD AUDIT SUMMARY",
+        RULE,
+    ]
+    for item in load_data:
+        lines.append(f"{item['appliance']} - {item['watt']}W × {item['quantity']} × {item['hours']}h = {item['wh']} Wh/day")
+
+    lines += [
+        "",
+        f"Total Energy Demand: {calc.get('total_wh', 0):,.0f} Wh/day",
+        f"Total Power Demand: {calc.get('total_watt', 0):,.0f} W",
+    ]
+    if "coincident_peak" in calc:
+        lines.append(f"Coincident Peak Demand: {calc['coincident_peak']:,.0f} W "
+                     f"(diversity factor {calc['diversity_factor']:.2f})")
+    lines += [
+        "",
+        "SYSTEM SIZING",
+        RULE,
+        f"Backup Time: {design['backup_time']} hours",
+        f"Battery Voltage: {design['battery_voltage']}V",
+        f"Depth of Discharge: {design['dod_limit']}%",
+        f"Temperature Derating: {design['temperature_factor']}%",
+        "",
+        f"Battery Capacity: {calc.get('battery_capacity_ah', 0):.0f} Ah",
+        f"Battery Type: {design['battery_type']}",
+        f"Number of Batteries: {calc.get('num_batteries', 0):.1f}",
+        "",
+        f"Required Solar Capacity: {calc.get('required_solar', 0):.0f} W",
+        f"Solar Panel Type: {design['panel_type']}",
+        f"Number of Panels: {calc.get('num_panels', 0):.1f}",
+        f"Sun Hours: {design['sun_hours']} hours/day",
+        f"System Efficiency: {design['system_efficiency']}%",
+        "",
+        f"Charge Controller Size: {calc.get('controller_current', 0):.0f} A",
+        f"Recommended Controller: {calc.get('selected_controller', '')}",
+        *([f"String Layout: {layout_summary(calc['controller_info'])}"] if "controller_info" in calc else []),
+        "",
+        f"Inverter Size: {calc.get('inverter_size', 0):.0f} W",
+        f"Recommended Inverter: {calc.get('selected_inverter', '')}",
+        "",
+        "FINANCIAL ANALYSIS",
+        RULE,
+        f"Battery Cost: ₦{calc.get('battery_cost', 0):,.0f}",
+        f"Solar Panel Cost: ₦{calc.get('solar_cost', 0):,.0f}",
+        f"Inverter Cost: ₦{calc.get('inverter_cost', 0):,.0f}",
+        f"Charge Controller Cost: ₦{calc.get('controller_cost', 0):,.0f}",
+        f"Installation Cost: ₦{calc.get('installation_cost', 0):,.0f}",
+        f"Wiring & Accessories: ₦{calc.get('wiring_cost', 0):,.0f}",
+        "-" * 70,
+        f"TOTAL SYSTEM COST: ₦{calc.get('total_cost', 0):,.0f}",
+        "",
+        "FINANCIAL ANALYSIS",
+        RULE,
+        f"Monthly Energy Consumption: {calc.get('monthly_energy_kwh', 0):.1f} kWh",
+        f"Monthly Savings: ₦{calc.get('monthly_savings', 0):,.0f}",
+        f"Annual Savings: ₦{calc.get('annual_savings', 0):,.0f}",
+        f"Payback Period: {calc.get('payback_period', 0):.1f} years",
+        f"ROI over {design['system_lifespan']} years: {calc.get('roi', 0):.0f}%",
+        "",
+        "TERMS & CONDITIONS",
+        RULE,
+        *TERMS_AND_CONDITIONS,
+        "",
+        f"{COMPANY} | {PHONE} | {EMAIL} | {WEBSITE}",
+        ADDRESS,
+        "",
+        "Thank you for choosing Annur Tech - Powering Nigeria's Future!",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def cached_quotation_text(client, load_data, design, calc, reference=None, issued=None):
+    """`quotation_text` through the result cache; undated quotations are never cached."""
+    if issued is None:
+        return quotation_text(client, load_data, design, calc, reference, issued)
+    return cached_result("quotation.txt", lambda: quotation_text(client, load_data, design, calc, reference, issued),
+                         client, load_data, design, calc, reference, issued)
@@ -0,0 +1,277 @@
+# =============================================================================
+# RESULT CACHE
+# =============================================================================
+# Finished results - a design's sizing, costs and financials, a rendered
+# quotation - stored under a hash of everything they were computed from, so
+# an estate house or template package quoted again comes back at once. Kept
+# free of any Streamlit import.
+#
+# Two tiers, shared by every session and worker thread of the process:
+#   - memory: an LRU of pickled values, bounded by entries and bytes;
+#   - disk: a SQLite file (WAL mode) bounded in bytes, least recently used
+#     entries evicted first, which survives restarts and is shared with
+#     other processes (the API server, the bulk CLI).
+# A memory miss that hits the disk is promoted to memory. Values go in and
+# out pickled, so callers always get their own copy. Unpickling runs code
+# from the file, so the cache file must be trusted: keep it on local disk,
+# writable only by the planner's own processes, and never point
+# ANNUR_RESULT_CACHE at a shared or downloaded file.
+#
+# Keys are SHA-256 hashes of a canonical JSON form of the inputs: dict keys
+# sorted, numbers as floats (a slider's 5 and 5.0 are the same design), NumPy
+# values and DataFrames as plain lists, load snapshots and catalogs by their
+# content fingerprints. Every key also carries CACHE_VERSION, so results
+# computed by older code are never served after a deploy.
+#
+#     python result_cache.py stats
+#     python result_cache.py clear
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_PATH = os.environ.get("ANNUR_RESULT_CACHE",
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), "results_cache.db"))
+DISK_LIMIT_MB = float(os.environ.get("ANNUR_RESULT_CACHE_MB", 256))
+MEMORY_ENTRIES = 512
+MEMORY_LIMIT_MB = 64
+# Disk eviction trims to this share of the limit, so it runs once per batch
+# of writes rather than on every one
+EVICT_TO = 0.9
+
+# Bump whenever a sizing, costing, financial or report formula changes:
+# results cached by the old code stop matching and age out of the disk tier
+CACHE_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+"""
+
+STAT_FIELDS = ("memory_hits", "disk_hits", "misses", "writes", "memory_evictions", "disk_evictions")
+
+
+# =============================================================================
+# KEYS
+# =============================================================================
+def _canonical(value):
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (bool, np.bool_)) or value is None or isinstance(value, str):
+        return value.item() if isinstance(value, np.bool_) else value
+    if isinstance(value, (int, float, np.number)):
+        value = float(value)
+        return value if np.isfinite(value) else repr(value)
+    if isinstance(value, np.ndarray):
+        return _canonical(value.tolist())
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    fingerprint = getattr(value, "fingerprint", None)
+    if isinstance(fingerprint, str):
+        return {"__fingerprint__": fingerprint}
+    to_dict = getattr(value, "to_dict", None)
+    if callable(to_dict):
+        return _canonical(to_dict(orient="split"))
+    raise TypeError(f"cannot key a cached result on {type(value).__name__}")
+
+
+def content_key(*parts):
+    """SHA-256 hex digest of the canonical form of `parts`."""
+    text = json.dumps(_canonical(parts), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+class ResultCache:
+    """Two-tier (memory LRU, bounded SQLite file) cache of pickled results.
+
+    `path=None` (or "") keeps the memory tier only. The file is unpickled,
+    so it must only ever be written by trusted local processes.
+    """
+
+    def __init__(self, path=None, disk_limit_mb=DISK_LIMIT_MB, memory_entries=MEMORY_ENTRIES,
+                 memory_limit_mb=MEMORY_LIMIT_MB):
+        self.path = path or None
+        self.disk_limit = int(disk_limit_mb * 1024 * 1024)
+        self.memory_entries = memory_entries
+        self.memory_limit = int(memory_limit_mb * 1024 * 1024)
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = dict.fromkeys(STAT_FIELDS, 0)
+        # Bytes on disk as last read, plus this process's writes since
+        self._disk_bytes = None
+
+    def _connect(self):
+        # Per-thread connection, created on first use
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, field, n=1):
+        with self._lock:
+            self._stats[field] += n
+
+    def _remember(self, key, blob):
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            if len(blob) > self.memory_limit:
+                return
+            self._memory[key] = blob
+            self._memory_bytes += len(blob)
+            while len(self._memory) > self.memory_entries or self._memory_bytes > self.memory_limit:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self._stats["memory_evictions"] += 1
+
+    def get(self, key, default=None):
+        """The value stored under `key`, or `default`."""
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+        if blob is None and self.path:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                blob = row[0]
+                conn.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+                self._remember(key, blob)
+                self._count("disk_hits")
+        if blob is None:
+            self._count("misses")
+            return default
+        return pickle.loads(blob)
+
+    def put(self, key, value):
+        """Store `value` under `key` in both tiers."""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, blob)
+        if self.path and len(blob) <= self.disk_limit:
+            conn = self._connect()
+            conn.execute("INSERT OR REPLACE INTO results (key, value, size, used) VALUES (?, ?, ?, ?)",
+                         (key, blob, len(blob), time.time()))
+            with self._lock:
+                if self._disk_bytes is None:
+                    self._disk_bytes = self._disk_size(conn)
+                else:
+                    self._disk_bytes += len(blob)
+                over = self._disk_bytes > self.disk_limit
+            if over:
+                self._evict(conn)
+        self._count("writes")
+
+    def _disk_size(self, conn):
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def _evict(self, conn):
+        # Everything past the newest EVICT_TO x `disk_limit` bytes goes; the
+        # scan runs only once this process's count passes the limit, then
+        # the count is re-read (other processes write to the file too)
+        evicted = conn.execute(
+            "DELETE FROM results WHERE key IN (SELECT key FROM (SELECT key, SUM(size) OVER "
+            "(ORDER BY used DESC, key) AS kept FROM results) WHERE kept > ?)",
+            (int(self.disk_limit * EVICT_TO),)).rowcount
+        size = self._disk_size(conn)
+        with self._lock:
+            self._disk_bytes = size
+            self._stats["disk_evictions"] += max(evicted, 0)
+
+    def get_or_compute(self, key, compute):
+        """Cached value of `key`, computing and storing it with `compute()` on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        """Hit, miss, write and eviction counts, plus each tier's entries and bytes."""
+        with self._lock:
+            stats = dict(self._stats, memory_entries=len(self._memory), memory_bytes=self._memory_bytes)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        if self.path:
+            entries, size = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            stats.update(disk_entries=entries, disk_bytes=size)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.path:
+            self._connect().execute("DELETE FROM results")
+            with self._lock:
+                self._disk_bytes = 0
+
+
+_cache_lock = threading.Lock()
+_caches = {}
+
+
+def get_result_cache(path=None):
+    """The process-wide cache for `path` (default `CACHE_PATH`), shared by every caller."""
+    path = path or CACHE_PATH
+    with _cache_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ResultCache(path)
+        return cache
+
+
+def cached_result(kind, compute, *parts):
+    """`compute()`, cached under `kind`, the content of `parts` and
+    CACHE_VERSION (uncached if some part has no canonical form)."""
+    try:
+        key = content_key(CACHE_VERSION, kind, *parts)
+    except TypeError:
+        return compute()
+    return get_result_cache().get_or_compute(key, compute)
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or clear the on-disk result cache.")
+    parser.add_argument("command", choices=("stats", "clear"))
+    parser.add_argument("--cache", default=CACHE_PATH, help=f"cache file (default {CACHE_PATH})")
+    args = parser.parse_args(argv)
+    cache = ResultCache(args.cache)
+    if args.command == "clear":
+        cache.clear()
+    stats = cache.stats()
+    print(f"{stats['disk_entries']:,} results, {stats['disk_bytes'] / 1024 / 1024:,.1f} MB in {args.cache}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# =============================================================================
+# USAGE SCHEDULES AND COINCIDENT DEMAND
+# =============================================================================
+# When in the day each load runs, and what the whole load list draws at once.
+# Summing nameplate watts assumes every appliance is on at the same moment;
+# on a large audit that oversizes the inverter several times over.
+#
+# A schedule is a set of usage weights over the day's 96 quarter-hour slots
+# (or 24 hourly ones, repeated): 1 where the appliance may run all slot, 0
+# where it is off. A line item's `hours` of use are filled into its window,
+# and any hours beyond the window spill evenly over the rest of the day, so
+# daily energy always equals watts x hours. Items without their own schedule
+# take their catalog appliance's default window, or DEFAULT_WEIGHTS (the
+# simulation's evening-peaked household shape) for custom appliances.
+#
+# Aggregation groups line items by schedule, so thousands of items cost a
+# few bincounts plus one (groups x 96) product. Kept free of any Streamlit
+# import.
+
+import functools
+
+import numpy as np
+
+from catalog import appliance_spec
+from simulation import HOURS_PER_DAY, DEFAULT_LOAD_SHAPE
+
+SLOTS_PER_HOUR = 4
+SLOTS = HOURS_PER_DAY * SLOTS_PER_HOUR
+SLOT_HOURS = 1 / SLOTS_PER_HOUR
+
+# Custom appliances: the household load shape, scaled so the evening peak is 1
+DEFAULT_WEIGHTS = np.repeat(DEFAULT_LOAD_SHAPE / DEFAULT_LOAD_SHAPE.max(), SLOTS_PER_HOUR)
+DEFAULT_WEIGHTS.setflags(write=False)
+
+
+def window_weights(windows):
+    """Usage weights from (start, end) hour pairs; end < start wraps past midnight."""
+    slot_start = np.arange(SLOTS) * SLOT_HOURS
+    weights = np.zeros(SLOTS)
+    for start, end in windows:
+        start, end = float(start) % HOURS_PER_DAY, float(end) % HOURS_PER_DAY or HOURS_PER_DAY
+        inside = (slot_start >= start) & (slot_start < end) if start < end else (slot_start >= start) | (slot_start < end)
+        weights[inside] = 1.0
+    return weights
+
+
+def usage_weights(schedule):
+    """Normalise a schedule to 96 read-only quarter-hour weights in [0, 1].
+
+    `schedule` is 24 hourly or 96 quarter-hourly weights, or a sequence of
+    (start, end) hour windows. Returns None for None.
+    """
+    if schedule is None:
+        return None
+    if len(schedule) and np.ndim(schedule[0]) == 1:
+        weights = window_weights(schedule)
+    else:
+        weights = np.asarray(schedule, dtype=float)
+        if weights.shape == (HOURS_PER_DAY,):
+            weights = np.repeat(weights, SLOTS_PER_HOUR)
+        elif weights.shape != (SLOTS,):
+            raise ValueError(f"a schedule needs {HOURS_PER_DAY} or {SLOTS} values, got {weights.shape}")
+        weights = np.clip(weights, 0.0, 1.0)
+    if not weights.any():
+        raise ValueError("a schedule needs at least one slot in use")
+    weights.setflags(write=False)
+    return weights
+
+
+@functools.lru_cache(maxsize=None)
+def _catalog_weights(windows):
+    return usage_weights(windows)
+
+
+@functools.lru_cache(maxsize=4096)
+def default_weights(name):
+    """Default usage weights of a line item, from its catalog appliance.
+    Appliances sharing a window share one (read-only) array."""
+    windows = appliance_spec(name).get("schedule")
+    return DEFAULT_WEIGHTS if windows is None else _catalog_weights(tuple(map(tuple, windows)))
+
+
+def demand_curve(total_watt, hours, weights, group):
+    """Coincident demand (W) per quarter-hour slot of the day.
+
+    `weights` is (G, 96) usage weights and `group` (N,) the row of `weights`
+    each of the N items with `total_watt` and `hours` follows.
+    """
+    total_watt = np.asarray(total_watt, dtype=float)
+    hours = np.asarray(hours, dtype=float)
+    window = weights.sum(axis=1) * SLOT_HOURS          # hours each schedule covers
+    covered = window[group]
+    inside = total_watt * np.minimum(1.0, hours / covered)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        outside = np.where(covered < HOURS_PER_DAY,
+                           total_watt * np.maximum(0.0, hours - covered) / (HOURS_PER_DAY - covered), 0.0)
+    inside = np.bincount(group, weights=inside, minlength=len(weights))
+    outside = np.bincount(group, weights=outside, minlength=len(weights))
+    return inside @ weights + outside @ (1 - weights)
+
+
+class DemandProfile:
+    """Demand curve of one load list, with its coincident peak and diversity.
+
+    Hashed and compared by the load's fingerprint, so it can key pipeline
+    stages the way `LoadSnapshot` does.
+    """
+
+    def __init__(self, curve, connected_watt, largest_watt, fingerprint):
+        self.curve = curve
+        self.curve.setflags(write=False)
+        self.connected_watt = connected_watt
+        self.largest_watt = largest_watt
+        self.fingerprint = fingerprint
+        self.peak_slot = int(curve.argmax()) if len(curve) else 0
+        self.coincident_peak = float(curve.max()) if len(curve) else 0.0
+        energy = np.tile(curve * SLOT_HOURS, 2)
+        totals = np.concatenate([[0.0], np.cumsum(energy)])
+        starts = np.arange(SLOTS)
+        # Most energy drawn over any k consecutive slots, k = 0..96, across midnight
+        self._worst = np.array([(totals[starts + k] - totals[starts]).max() for k in range(SLOTS + 1)])
+
+    @classmethod
+    def from_load(cls, load):
+        """Profile of a `LoadSnapshot` (or anything with its `columns` and `schedules`)."""
+        columns = load.columns
+        names, inverse = np.unique(columns["appliance"].astype(str), return_inverse=True)
+        weights, rows, name_rows = [], {}, []
+        for name in names:
+            default = default_weights(name)
+            if id(default) not in rows:
+                rows[id(default)] = len(weights)
+                weights.append(default)
+            name_rows.append(rows[id(default)])
+        group = np.array(name_rows, dtype=np.intp)[inverse]
+
+        schedules = getattr(load, "schedules", None)
+        if schedules is not None:
+            own = np.flatnonzero([schedule is not None for schedule in schedules])
+            group[own] = len(weights) + np.arange(len(own))
+            weights.extend(schedules[own])
+        weights = np.array(weights).reshape(-1, SLOTS)
+
+        total_watt = columns["total_watt"]
+        in_use = total_watt[columns["hours"] > 0]
+        return cls(demand_curve(total_watt, columns["hours"], weights, group),
+                   float(total_watt.sum()), float(in_use.max()) if in_use.size else 0.0, load.fingerprint)
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def __eq__(self, other):
+        return isinstance(other, DemandProfile) and other.fingerprint == self.fingerprint
+
+    @property
+    def daily_wh(self):
+        return float(self.curve.sum() * SLOT_HOURS)
+
+    @property
+    def diversity_factor(self):
+        """Connected load over coincident peak (1 = everything runs at once)."""
+        return self.connected_watt / self.coincident_peak if self.coincident_peak else 1.0
+
+    @property
+    def peak_time(self):
+        """Start of the peak slot as "HH:MM"."""
+        return f"{self.peak_slot // SLOTS_PER_HOUR:02d}:{self.peak_slot % SLOTS_PER_HOUR * 15:02d}"
+
+    @property
+    def design_watt(self):
+        """Power the inverter must carry: the coincident peak, and never less
+        than the largest single line item running on its own."""
+        return max(self.coincident_peak, self.largest_watt)
+
+    def hourly(self):
+        """Mean demand (W) in each of the 24 hours."""
+        return self.curve.reshape(HOURS_PER_DAY, SLOTS_PER_HOUR).mean(axis=1)
+
+    def daily_shape(self):
+        """24 hourly fractions of the daily energy (for `simulation.load_profile`)."""
+        hourly = self.hourly()
+        return hourly / hourly.sum() if hourly.sum() > 0 else DEFAULT_LOAD_SHAPE
+
+    def backup_wh(self, backup_time):
+        """Most energy the load draws over any `backup_time` hours (scalar or
+        array), starting at any time of day; whole days add a full day each."""
+        slots = np.ceil(np.asarray(backup_time, dtype=float) * SLOTS_PER_HOUR - 1e-9).astype(int)
+        days, remainder = np.divmod(np.maximum(slots, 0), SLOTS)
+        return (days * self._worst[SLOTS] + self._worst[remainder])[()]
@@ -0,0 +1,201 @@
+# =============================================================================
+# SENSITIVITY GRIDS
+# =============================================================================
+# The sizing and cost pipeline evaluated over every position of the sizing
+# sliders in one batched pass, so a slider move is an array lookup.
+#
+# The pipeline separates: the battery bank depends only on backup time, depth
+# of discharge and temperature derating; the PV array and its controller only
+# on sun hours and system efficiency. The grids are therefore kept as one
+# 3-D battery array and one 2-D array grid (~26k + ~500 points) rather than
+# the ~13M-point product, and any total cost on the full 5-D grid is a sum of
+# two lookups. `SensitivityGrid.cube()` materialises the product when wanted.
+
+import numpy as np
+
+from catalog import get_catalog
+from string_layout import best_layout, design_temperatures
+from sizing_engine import (
+    NO_CONTROLLER,
+    battery_bank,
+    solar_array,
+    inverter_rating,
+    select_inverter,
+    system_costs,
+    MIN_INSTALLATION_COST,
+    INSTALLATION_RATE,
+    MIN_WIRING_COST,
+    WIRING_RATE,
+)
+
+# Every position of the System Sizing sliders
+SLIDER_GRIDS = {
+    "backup_time": np.arange(1, 25),
+    "dod_limit": np.arange(50, 101),
+    "temperature_factor": np.arange(80, 101),
+    "sun_hours": np.arange(3.0, 8.01, 0.5),
+    "system_efficiency": np.arange(50, 96),
+}
+BATTERY_AXES = ("backup_time", "dod_limit", "temperature_factor")
+ARRAY_AXES = ("sun_hours", "system_efficiency")
+
+LABELS = {
+    "backup_time": "Backup Time (h)",
+    "dod_limit": "Depth of Discharge (%)",
+    "temperature_factor": "Temperature Derating (%)",
+    "sun_hours": "Sun Hours",
+    "system_efficiency": "System Efficiency (%)",
+}
+
+
+class _Axes:
+    """Grid values per axis with O(1) value -> position lookup."""
+
+    def __init__(self, names, grids):
+        self.names = names
+        self.values = {name: np.asarray(grids[name], dtype=float) for name in names}
+        self._positions = {name: {round(v, 6): i for i, v in enumerate(values.tolist())}
+                           for name, values in self.values.items()}
+
+    def position(self, name, value):
+        found = self._positions[name].get(round(float(value), 6))
+        if found is None:
+            # Off-grid value: nearest grid point
+            found = int(np.abs(self.values[name] - float(value)).argmin())
+        return found
+
+    def positions(self, values):
+        return tuple(self.position(name, values[name]) for name in self.names)
+
+    def mesh(self):
+        return np.meshgrid(*(self.values[name] for name in self.names), indexing="ij")
+
+
+class BatteryGrid(_Axes):
+    """Battery bank sizing and cost over backup time x DoD x temperature derating."""
+
+    def __init__(self, total_wh, battery_voltage, battery_type, grids=SLIDER_GRIDS, profile=None):
+        super().__init__(BATTERY_AXES, grids)
+        self.battery_info = get_catalog().batteries[battery_type]
+        backup, dod, temp = self.mesh()
+        self.battery_capacity_ah, self.num_batteries = battery_bank(
+            total_wh, backup, battery_voltage, dod, temp, self.battery_info["capacity"],
+            None if profile is None else profile.backup_wh(backup))
+        self.battery_cost = np.ceil(self.num_batteries) * self.battery_info["price"]
+
+    def at(self, backup_time, dod_limit, temperature_factor):
+        """Same keys as `pipeline.battery_sizing`."""
+        i = self.positions({"backup_time": backup_time, "dod_limit": dod_limit,
+                            "temperature_factor": temperature_factor})
+        return {"battery_capacity_ah": float(self.battery_capacity_ah[i]),
+                "num_batteries": float(self.num_batteries[i]),
+                "battery_info": self.battery_info}
+
+
+class ArrayGrid(_Axes):
+    """PV array, its string layout and controllers, and their cost over sun
+    hours x system efficiency."""
+
+    def __init__(self, total_wh, battery_voltage, panel_type, location=None, grids=SLIDER_GRIDS):
+        super().__init__(ARRAY_AXES, grids)
+        catalog = get_catalog()
+        self.panel_info = catalog.panels[panel_type]
+        sun, efficiency = self.mesh()
+        self.required_solar, self.num_panels, self.controller_current = solar_array(
+            total_wh, sun, efficiency, battery_voltage, self.panel_info["vmp"])
+        layout = best_layout(self.num_panels.ravel(), self.controller_current.ravel(), battery_voltage,
+                             *(self.panel_info[field] for field in ("vmp", "voc", "isc", "price")),
+                             catalog.controllers, *design_temperatures(location))
+        self.controller_names = np.append(catalog.controllers.names, NO_CONTROLLER)[layout["controller"]].reshape(sun.shape)
+        self.controller_cost = layout["controller_cost"].reshape(sun.shape)
+        self.installed_panels = layout["panels"].reshape(sun.shape)
+        self.solar_cost = self.installed_panels * self.panel_info["price"]
+
+    def at(self, sun_hours, system_efficiency):
+        """Same keys as `pipeline.solar_sizing`, plus the selected controller."""
+        i = self.positions({"sun_hours": sun_hours, "system_efficiency": system_efficiency})
+        return {"required_solar": float(self.required_solar[i]),
+                "num_panels": float(self.num_panels[i]),
+                "controller_current": float(self.controller_current[i]),
+                "panel_info": self.panel_info,
+                "selected_controller": str(self.controller_names[i]),
+                "controller_cost": float(self.controller_cost[i])}
+
+
+def _total(equipment):
+    # system_costs' installation and wiring rules on an equipment total
+    return (equipment + np.maximum(MIN_INSTALLATION_COST, equipment * INSTALLATION_RATE)
+            + np.maximum(MIN_WIRING_COST, equipment * WIRING_RATE))
+
+
+class SensitivityGrid:
+    """Total system cost over all five sizing sliders for one load and component choice."""
+
+    def __init__(self, battery_grid, array_grid, total_watt, battery_voltage):
+        self.battery = battery_grid
+        self.array = array_grid
+        _, inverter_info = select_inverter(inverter_rating(total_watt), battery_voltage)
+        self.inverter_cost = inverter_info.get("price", 0)
+        self.axes = {**battery_grid.values, **array_grid.values}
+
+    def costs(self, **at):
+        """`system_costs` output at one grid point (every slider given)."""
+        b = self.battery.positions(at)
+        a = self.array.positions(at)
+        return system_costs(self.battery.num_batteries[b], self.battery.battery_info["price"],
+                            self.array.installed_panels[a], self.array.panel_info["price"],
+                            self.inverter_cost, self.array.controller_cost[a])
+
+    def cube(self, dtype=np.float32):
+        """Total cost over the full 5-D slider grid, axes in SLIDER_GRIDS order."""
+        equipment = (self.battery.battery_cost[:, :, :, None, None]
+                     + (self.array.solar_cost + self.array.controller_cost)[None, None, None, :, :]
+                     + self.inverter_cost)
+        return _total(equipment).astype(dtype)
+
+    def sweep(self, parameter, **at):
+        """Outputs along one slider with the others held at `at`."""
+        import pandas as pd
+        values = self.axes[parameter]
+        if parameter in BATTERY_AXES:
+            index = list(self.battery.positions(at))
+            index[BATTERY_AXES.index(parameter)] = slice(None)
+            battery_cost = self.battery.battery_cost[tuple(index)]
+            battery_ah = self.battery.battery_capacity_ah[tuple(index)]
+            a = self.array.positions(at)
+            array_cost = np.full(len(values), self.array.solar_cost[a] + self.array.controller_cost[a])
+            solar_w = np.full(len(values), self.array.required_solar[a])
+        else:
+            index = list(self.array.positions(at))
+            index[ARRAY_AXES.index(parameter)] = slice(None)
+            array_cost = self.array.solar_cost[tuple(index)] + self.array.controller_cost[tuple(index)]
+            solar_w = self.array.required_solar[tuple(index)]
+            b = self.battery.positions(at)
+            battery_cost = np.full(len(values), self.battery.battery_cost[b])
+            battery_ah = np.full(len(values), self.battery.battery_capacity_ah[b])
+        return pd.DataFrame({
+            parameter: values,
+            "total_cost": _total(battery_cost + array_cost + self.inverter_cost),
+            "battery_capacity_ah": battery_ah,
+            "required_solar": solar_w,
+        })
+
+    def tornado(self, **at):
+        """Total cost at each slider's minimum and maximum, biggest swing first."""
+        import pandas as pd
+        base = float(self.costs(**at)["total_cost"])
+        rows = []
+        for parameter in self.axes:
+            sweep = self.sweep(parameter, **at)
+            low, high = sweep.iloc[0], sweep.iloc[-1]
+            rows.append({
+                "parameter": parameter,
+                "label": LABELS[parameter],
+                "low_value": low[parameter],
+                "high_value": high[parameter],
+                "cost_at_low": low["total_cost"],
+                "cost_at_high": high["total_cost"],
+                "swing": abs(high["total_cost"] - low["total_cost"]),
+                "base_cost": base,
+            })
+        return pd.DataFrame(rows).sort_values("swing", ascending=False, kind="stable").reset_index(drop=True)
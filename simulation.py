@@ -0,0 +1,189 @@
+# =============================================================================
+# HOURLY ENERGY SIMULATION
+# =============================================================================
+# Steps a full year (8760 h) of PV output against load and tracks the battery
+# state of charge inside the depth-of-discharge window. The daily sizing
+# figures in sizing_engine assume every day is the worst day; this reports
+# what the bank actually does: unmet energy, curtailment and autonomy.
+#
+# The time loop is unavoidable (each hour depends on the previous SoC), so it
+# is vectorized across designs instead: every hour is a handful of NumPy ops
+# on arrays of N designs. A single design takes a plain-float fast path.
+
+import numpy as np
+
+HOURS_PER_DAY = 24
+DAYS_PER_YEAR = 365
+HOURS_PER_YEAR = HOURS_PER_DAY * DAYS_PER_YEAR
+
+CHARGE_EFFICIENCY = 0.95
+DISCHARGE_EFFICIENCY = 0.95
+
+# Typical Nigerian household day: low overnight, morning bump, evening peak
+_LOAD_WEIGHTS = np.array([
+    2.5, 2.5, 2.5, 2.5, 2.5, 3.0,   # 00-05
+    4.0, 4.5, 4.0, 3.5, 3.5, 3.5,   # 06-11
+    3.5, 3.5, 3.5, 3.5, 4.0, 5.5,   # 12-17
+    7.5, 8.0, 8.0, 7.0, 5.0, 3.0,   # 18-23
+])
+DEFAULT_LOAD_SHAPE = _LOAD_WEIGHTS / _LOAD_WEIGHTS.sum()
+
+
+def _solar_shape(sunrise=6.0, sunset=18.0):
+    # Half-sine between sunrise and sunset, evaluated mid-hour, summing to 1
+    mid_hour = np.arange(HOURS_PER_DAY) + 0.5
+    shape = np.clip(np.sin(np.pi * (mid_hour - sunrise) / (sunset - sunrise)), 0, None)
+    shape[(mid_hour < sunrise) | (mid_hour > sunset)] = 0
+    return shape / shape.sum()
+
+
+DEFAULT_SOLAR_SHAPE = _solar_shape()
+
+
+# =============================================================================
+# PROFILES
+# =============================================================================
+def pv_profile(pv_watts, sun_hours, system_efficiency=75, shape=DEFAULT_SOLAR_SHAPE):
+    """Hourly PV output (W) for a year.
+
+    `pv_watts` is the array rating, scalar or shape (N,). `sun_hours` is a
+    scalar or 365 daily peak-sun-hour values (for seasonality). Returns shape
+    (8760,) or (N, 8760).
+    """
+    daily_sun = np.broadcast_to(np.asarray(sun_hours, dtype=float), (DAYS_PER_YEAR,))
+    per_watt = (daily_sun[:, None] * shape[None, :]).ravel() * (system_efficiency / 100)
+    return np.multiply.outer(np.asarray(pv_watts, dtype=float), per_watt)
+
+
+def irradiance_profile(pv_watts, ghi, system_efficiency=75):
+    """Hourly PV output (W) from measured or typical-year irradiance `ghi`
+    (W/m², e.g. `climate.LocationClimate.ghi`). Shape (T,) or (N, T)."""
+    per_watt = np.asarray(ghi, dtype=float) / 1000 * (system_efficiency / 100)
+    return np.multiply.outer(np.asarray(pv_watts, dtype=float), per_watt)
+
+
+def load_profile(total_wh, shape=DEFAULT_LOAD_SHAPE):
+    """Hourly load (W) for a year from the daily energy `total_wh` (scalar or (N,)).
+
+    `shape` is 24 hourly fractions of the daily energy, or a full 8760-hour
+    profile already normalised per day.
+    """
+    shape = np.asarray(shape, dtype=float)
+    if shape.shape[-1] == HOURS_PER_DAY:
+        shape = np.tile(shape, DAYS_PER_YEAR)
+    return np.multiply.outer(np.asarray(total_wh, dtype=float), shape)
+
+
+# =============================================================================
+# SIMULATION
+# =============================================================================
+def _simulate_one(net, capacity, floor, energy, ce, de):
+    # Plain-float loop: much faster than per-hour NumPy calls for one design
+    unmet = curtailed = 0.0
+    lol_hours = 0
+    lowest = energy
+    soc = np.empty(len(net))
+    for t, flow in enumerate(net.tolist()):
+        if flow >= 0:
+            charge = min(flow * ce, capacity - energy)
+            energy += charge
+            curtailed += flow - charge / ce
+        else:
+            discharge = min(-flow / de, energy - floor)
+            energy -= discharge
+            shortfall = -flow - discharge * de
+            if shortfall > 1e-9:
+                unmet += shortfall
+                lol_hours += 1
+        if energy < lowest:
+            lowest = energy
+        soc[t] = energy
+    return unmet, curtailed, lol_hours, lowest, soc
+
+
+def simulate_year(pv_w, load_w, battery_wh, dod_limit=80, initial_soc=1.0,
+                  charge_efficiency=CHARGE_EFFICIENCY, discharge_efficiency=DISCHARGE_EFFICIENCY,
+                  return_soc=False):
+    """Simulate battery state of charge hour by hour.
+
+    `pv_w` and `load_w` are hourly series of shape (T,) or (N, T) (they
+    broadcast against each other); `battery_wh` is the nominal bank energy,
+    scalar or (N,). The bank may only be discharged down to `dod_limit` %.
+
+    Returns a dict of per-design arrays: `unmet_wh`, `curtailed_wh`,
+    `load_wh`, `pv_wh`, `loss_of_load_hours`, `loss_of_load_fraction`,
+    `days_of_autonomy`, `min_soc`, and `soc` (N, T) when `return_soc`.
+    """
+    pv_w = np.atleast_2d(np.asarray(pv_w, dtype=float))
+    load_w = np.atleast_2d(np.asarray(load_w, dtype=float))
+    capacity = np.atleast_1d(np.asarray(battery_wh, dtype=float))
+    n = np.broadcast_shapes(pv_w.shape[:1], load_w.shape[:1], capacity.shape)[0]
+    hours = np.broadcast_shapes(pv_w.shape[1:], load_w.shape[1:])[0]
+    pv_w = np.broadcast_to(pv_w, (n, hours))
+    load_w = np.broadcast_to(load_w, (n, hours))
+    capacity = np.broadcast_to(capacity, (n,)).copy()
+    floor = capacity * (1 - np.broadcast_to(np.asarray(dod_limit, dtype=float), (n,)) / 100)
+    energy = np.maximum(capacity * initial_soc, floor)
+    ce, de = charge_efficiency, discharge_efficiency
+    net = pv_w - load_w
+
+    soc = np.empty((n, hours)) if return_soc or n == 1 else None
+    if n == 1:
+        unmet, curtailed, lol_hours, lowest, soc[0] = _simulate_one(
+            net[0], capacity[0], floor[0], energy[0], ce, de)
+        unmet, curtailed = np.array([unmet]), np.array([curtailed])
+        lol_hours, lowest = np.array([lol_hours]), np.array([lowest])
+    else:
+        net_t = np.ascontiguousarray(net.T)
+        unmet = np.zeros(n)
+        curtailed = np.zeros(n)
+        lol_hours = np.zeros(n, dtype=int)
+        lowest = energy.copy()
+        surplus = np.empty(n)
+        deficit = np.empty(n)
+        charge = np.empty(n)
+        discharge = np.empty(n)
+        for t in range(hours):
+            np.maximum(net_t[t], 0, out=surplus)
+            np.subtract(surplus, net_t[t], out=deficit)
+            np.minimum(surplus * ce, capacity - energy, out=charge)
+            np.minimum(deficit / de, energy - floor, out=discharge)
+            energy += charge - discharge
+            curtailed += surplus - charge / ce
+            shortfall = deficit - discharge * de
+            unmet += shortfall
+            lol_hours += shortfall > 1e-9
+            np.minimum(lowest, energy, out=lowest)
+            if soc is not None:
+                soc[:, t] = energy
+
+    load_wh = load_w.sum(axis=1)
+    usable_wh = capacity - floor
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_load = load_wh / (hours / HOURS_PER_DAY)
+        results = {
+            "unmet_wh": np.maximum(unmet, 0),
+            "curtailed_wh": np.maximum(curtailed, 0),
+            "load_wh": load_wh,
+            "pv_wh": pv_w.sum(axis=1),
+            "loss_of_load_hours": lol_hours,
+            "loss_of_load_fraction": np.where(load_wh > 0, np.maximum(unmet, 0) / load_wh, 0.0),
+            "days_of_autonomy": np.where(daily_load > 0, usable_wh * de / daily_load, np.inf),
+            "min_soc": np.where(capacity > 0, lowest / capacity, 0.0),
+        }
+        if return_soc:
+            results["soc"] = np.where(capacity[:, None] > 0, soc / capacity[:, None], 0.0)
+    return results
+
+
+def battery_wh_for_target(pv_w, load_w, candidates_wh, dod_limit=80, max_unmet_fraction=0.01, **kwargs):
+    """Smallest candidate bank (Wh) whose simulated year meets the load.
+
+    All candidates are simulated in one vectorized pass; returns
+    (battery_wh or None, results for every candidate).
+    """
+    candidates_wh = np.sort(np.asarray(candidates_wh, dtype=float))
+    results = simulate_year(pv_w, load_w, candidates_wh, dod_limit, **kwargs)
+    feasible = np.flatnonzero(results["loss_of_load_fraction"] <= max_unmet_fraction)
+    best = float(candidates_wh[feasible[0]]) if feasible.size else None
+    return best, results
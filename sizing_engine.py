@@ -0,0 +1,320 @@
+# =============================================================================
+# HEADLESS SIZING ENGINE
+# =============================================================================
+# Pure-Python/NumPy version of the Load Audit -> System Sizing -> Financials
+# calculations. Nothing in here imports Streamlit, so the same formulas drive
+# the UI, scripts and batch jobs.
+#
+# Every stage function is written with NumPy operations, so it accepts plain
+# scalars (one design, as the UI does) or equally-shaped arrays (thousands of
+# sites in one call). `size_batch` chains all stages for a whole table.
+
+import numpy as np
+
+from catalog import get_catalog, as_table
+from string_layout import best_layout, design_temperatures, site_temperatures
+
+# Sizing margins used throughout the planner
+SOLAR_MARGIN = 1.2           # 20% margin for losses
+CONTROLLER_MARGIN = 1.25     # 25% safety margin
+INVERTER_MARGIN = 1.3        # 30% safety margin
+MIN_INVERTER_SIZE = 1000     # minimum 1000W
+INSTALLATION_RATE = 0.2      # 20% of equipment cost...
+MIN_INSTALLATION_COST = 150000  # ...or 150k min
+WIRING_RATE = 0.1            # 10% of equipment cost...
+MIN_WIRING_COST = 50000      # ...or 50k min
+
+NO_INVERTER = "No suitable inverter found"
+NO_CONTROLLER = "No suitable controller found"
+
+# Slider/selectbox defaults from the System Sizing and Financials tabs
+DEFAULT_DESIGN = {
+    "backup_time": 5,
+    "battery_voltage": 24,
+    "dod_limit": 80,
+    "temperature_factor": 90,
+    "battery_type": next(iter(get_catalog().batteries)),
+    "sun_hours": 5.0,
+    "system_efficiency": 75,
+    "panel_type": next(iter(get_catalog().panels)),
+    "elec_rate": 50,
+    "system_lifespan": 10,
+}
+
+
+# =============================================================================
+# LOAD AUDIT
+# =============================================================================
+def make_load_item(appliance, watt, quantity, hours, schedule=None):
+    total_watt = watt * quantity
+    item = {
+        "appliance": appliance,
+        "watt": watt,
+        "quantity": quantity,
+        "total_watt": total_watt,
+        "hours": hours,
+        "wh": total_watt * hours,
+    }
+    if schedule is not None:
+        item["schedule"] = [float(weight) for weight in schedule]
+    return item
+
+
+def load_totals(load_data):
+    total_wh = sum(item["wh"] for item in load_data)
+    total_watt = sum(item["total_watt"] for item in load_data)
+    return total_wh, total_watt
+
+
+# =============================================================================
+# SIZING STAGES (scalar or array inputs)
+# =============================================================================
+def battery_bank(total_wh, backup_time, battery_voltage, dod_limit, temperature_factor, battery_capacity,
+                 backup_wh=None):
+    # `backup_wh` (e.g. a DemandProfile's worst window) replaces total_wh x backup_time
+    if backup_wh is None:
+        backup_wh = total_wh * backup_time
+    battery_capacity_ah = backup_wh / (battery_voltage * (dod_limit/100) * (temperature_factor/100))
+    num_batteries = battery_capacity_ah / battery_capacity
+    return battery_capacity_ah, num_batteries
+
+
+def solar_array(total_wh, sun_hours, system_efficiency, battery_voltage, vmp):
+    required_solar = (total_wh * SOLAR_MARGIN) / (sun_hours * (system_efficiency/100))
+    num_panels = required_solar / vmp * (battery_voltage/vmp)
+    controller_current = (required_solar * CONTROLLER_MARGIN) / battery_voltage
+    return required_solar, num_panels, controller_current
+
+
+def inverter_rating(total_watt):
+    return np.maximum(np.multiply(total_watt, INVERTER_MARGIN), MIN_INVERTER_SIZE)
+
+
+def _first_match(mask):
+    # Index of the first True per row, -1 where nothing matches
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), -1)
+
+
+# Rows per block when matching many designs against a large catalog
+_MATCH_CELLS = 1 << 22
+
+
+def inverter_choice(inverter_size, battery_voltage, catalog=None):
+    """Catalog index of the chosen inverter per design, -1 if none.
+
+    Smallest inverter at the system voltage with enough power (binary search
+    on the catalog's power index), falling back to the largest one at the
+    system voltage.
+    """
+    table = as_table(get_catalog().inverters if catalog is None else catalog)
+    size, voltage = np.broadcast_arrays(np.atleast_1d(np.asarray(inverter_size, dtype=float)),
+                                        np.atleast_1d(np.asarray(battery_voltage, dtype=float)))
+    chosen = table.smallest_at_least("power", size, group_by="voltage", group=voltage)
+    return np.where(chosen >= 0, chosen, table.largest("power", group_by="voltage", group=voltage))
+
+
+def select_inverter(inverter_size, battery_voltage, catalog=None):
+    table = as_table(get_catalog().inverters if catalog is None else catalog)
+    index = int(inverter_choice(inverter_size, battery_voltage, table)[0])
+    if index < 0:
+        return NO_INVERTER, {"price": 0, "power": 0}
+    name = table.names[index]
+    return name, table[name]
+
+
+def select_controller(controller_current, num_panels, battery_voltage, panel_info, catalog=None, location=None):
+    """Cheapest string layout and charge controllers for one array.
+
+    Returns (controller name, layout) where the layout holds the controller's
+    catalog spec plus `string_layout.best_layout`'s count, series, strings,
+    panels (installed), string_voc, string_vmp and controller_cost.
+    """
+    table = as_table(get_catalog().controllers if catalog is None else catalog)
+    layout = {name: values[0].item() for name, values in best_layout(
+        num_panels, controller_current, battery_voltage, panel_info.get("vmp", 0), panel_info.get("voc", 0),
+        panel_info.get("isc", 0), panel_info.get("price", 0), table, *design_temperatures(location)).items()}
+    index = layout.pop("controller")
+    if index < 0:
+        return NO_CONTROLLER, {"price": 0, **layout}
+    name = table.names[index]
+    return name, {**table[name], **layout}
+
+
+def layout_summary(layout):
+    """One line describing a `select_controller` layout, for captions and reports."""
+    if not layout.get("count"):
+        return "No string layout fits the controller catalog"
+    return (f"{layout['series']:.0f} in series x {layout['strings']:.0f} strings = {layout['panels']:.0f} panels "
+            f"on {layout['count']:.0f} controller(s); cold Voc {layout['string_voc']:.0f} V, "
+            f"hot Vmp {layout['string_vmp']:.0f} V")
+
+
+def system_costs(num_batteries, battery_price, num_panels, panel_price, inverter_cost, controller_cost):
+    battery_cost = np.ceil(num_batteries) * battery_price
+    solar_cost = np.ceil(num_panels) * panel_price
+    equipment_cost = battery_cost + solar_cost + inverter_cost + controller_cost
+    installation_cost = np.maximum(MIN_INSTALLATION_COST, equipment_cost * INSTALLATION_RATE)
+    wiring_cost = np.maximum(MIN_WIRING_COST, equipment_cost * WIRING_RATE)
+    return {
+        "battery_cost": battery_cost,
+        "solar_cost": solar_cost,
+        "inverter_cost": inverter_cost,
+        "controller_cost": controller_cost,
+        "installation_cost": installation_cost,
+        "wiring_cost": wiring_cost,
+        "total_cost": equipment_cost + installation_cost + wiring_cost,
+    }
+
+
+def financial_summary(total_wh, total_cost, elec_rate, system_lifespan):
+    monthly_energy_kwh = np.divide(total_wh, 1000)
+    monthly_savings = monthly_energy_kwh * 30 * elec_rate
+    annual_savings = monthly_savings * 12
+    lifetime_savings = annual_savings * system_lifespan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback_period = np.where(annual_savings > 0, total_cost / annual_savings, 0.0)
+        roi = np.where(np.asarray(total_cost) > 0, (lifetime_savings - total_cost) / total_cost * 100, 0.0)
+    return {
+        "monthly_energy_kwh": monthly_energy_kwh,
+        "monthly_savings": monthly_savings,
+        "annual_savings": annual_savings,
+        "lifetime_savings": lifetime_savings,
+        "payback_period": payback_period[()],
+        "roi": roi[()],
+    }
+
+
+# =============================================================================
+# SINGLE DESIGN
+# =============================================================================
+def size_system(total_wh, total_watt, profile=None, location=None, **design):
+    """Size and cost one design; returns the same keys the UI keeps in
+    `st.session_state.calculations`, plus the financial summary.
+
+    With a `schedules.DemandProfile`, the inverter is sized on its design
+    power and the battery on its worst backup window instead of on the
+    nameplate total. The array's strings are laid out for the `location`'s
+    temperatures.
+    """
+    params = {**DEFAULT_DESIGN, **design}
+    catalog = get_catalog()
+    battery_info = catalog.batteries[params["battery_type"]]
+    panel_info = catalog.panels[params["panel_type"]]
+
+    battery_capacity_ah, num_batteries = battery_bank(
+        total_wh, params["backup_time"], params["battery_voltage"],
+        params["dod_limit"], params["temperature_factor"], battery_info["capacity"],
+        None if profile is None else profile.backup_wh(params["backup_time"]))
+    required_solar, num_panels, controller_current = solar_array(
+        total_wh, params["sun_hours"], params["system_efficiency"],
+        params["battery_voltage"], panel_info["vmp"])
+    inverter_size = inverter_rating(total_watt if profile is None else profile.design_watt)
+    selected_inverter, inverter_info = select_inverter(inverter_size, params["battery_voltage"])
+    selected_controller, controller_info = select_controller(controller_current, num_panels, params["battery_voltage"],
+                                                             panel_info, location=location)
+
+    costs = system_costs(num_batteries, battery_info["price"], controller_info["panels"], panel_info["price"],
+                         inverter_info.get("price", 0), controller_info["controller_cost"])
+    results = {
+        "total_wh": total_wh,
+        "total_watt": total_watt,
+        "battery_capacity_ah": battery_capacity_ah,
+        "num_batteries": num_batteries,
+        "battery_info": battery_info,
+        "required_solar": required_solar,
+        "num_panels": num_panels,
+        "panel_info": panel_info,
+        "controller_current": controller_current,
+        "inverter_size": inverter_size,
+        "selected_inverter": selected_inverter,
+        "inverter_info": inverter_info,
+        "selected_controller": selected_controller,
+        "controller_info": controller_info,
+        **costs,
+    }
+    results.update(financial_summary(total_wh, costs["total_cost"], params["elec_rate"], params["system_lifespan"]))
+    return results
+
+
+# =============================================================================
+# BATCH API
+# =============================================================================
+def _catalog_index(table, names, label):
+    index = table.positions(np.asarray(names))
+    if (index < 0).any():
+        unknown = sorted(set(np.asarray(names)[index < 0]))
+        raise KeyError(f"Unknown {label}: {', '.join(map(str, unknown))}")
+    return index
+
+
+def size_batch(sites, **design):
+    """Size, cost and evaluate many designs in one vectorized pass.
+
+    `sites` is a DataFrame (or dict of arrays) with `total_wh` and
+    `total_watt` columns and, optionally, any `DEFAULT_DESIGN` column and a
+    `location` (for the string layout temperatures). Missing design columns
+    are taken from keyword arguments, then from the defaults.
+    Returns a DataFrame with one row per site and every sizing, cost and
+    financial output.
+    """
+    import pandas as pd
+    frame = pd.DataFrame(sites).reset_index(drop=True)
+    for column, default in {**DEFAULT_DESIGN, **design}.items():
+        if column not in frame:
+            frame[column] = default
+
+    total_wh = frame["total_wh"].to_numpy(dtype=float)
+    total_watt = frame["total_watt"].to_numpy(dtype=float)
+    voltage = frame["battery_voltage"].to_numpy(dtype=float)
+
+    catalog = get_catalog()
+    batteries, panels = catalog.batteries, catalog.panels
+    battery_idx = _catalog_index(batteries, frame["battery_type"], "battery_type")
+    panel_idx = _catalog_index(panels, frame["panel_type"], "panel_type")
+
+    battery_capacity_ah, num_batteries = battery_bank(
+        total_wh, frame["backup_time"].to_numpy(dtype=float), voltage,
+        frame["dod_limit"].to_numpy(dtype=float), frame["temperature_factor"].to_numpy(dtype=float),
+        batteries.column("capacity")[battery_idx])
+    required_solar, num_panels, controller_current = solar_array(
+        total_wh, frame["sun_hours"].to_numpy(dtype=float),
+        frame["system_efficiency"].to_numpy(dtype=float), voltage,
+        panels.column("vmp")[panel_idx])
+    inverter_size = inverter_rating(total_watt)
+
+    # Index -1 (no match) picks the trailing "not found" name / zero price
+    inverter_idx = inverter_choice(inverter_size, voltage, catalog.inverters)
+    inverter_names = np.append(catalog.inverters.names, NO_INVERTER)
+    inverter_prices = np.append(catalog.inverters.column("price"), 0.0)
+    cold, hot = (site_temperatures(frame["location"].fillna("")) if "location" in frame
+                 else design_temperatures())
+    layout = best_layout(num_panels, controller_current, voltage, *(
+        panels.column(field)[panel_idx] for field in ("vmp", "voc", "isc", "price")),
+        catalog.controllers, cold, hot)
+    controller_names = np.append(catalog.controllers.names, NO_CONTROLLER)
+
+    costs = system_costs(
+        num_batteries, batteries.column("price")[battery_idx],
+        layout["panels"], panels.column("price")[panel_idx],
+        inverter_prices[inverter_idx], layout["controller_cost"])
+    finance = financial_summary(total_wh, costs["total_cost"],
+                                frame["elec_rate"].to_numpy(dtype=float),
+                                frame["system_lifespan"].to_numpy(dtype=float))
+
+    results = pd.DataFrame({
+        "battery_capacity_ah": battery_capacity_ah,
+        "num_batteries": num_batteries,
+        "required_solar": required_solar,
+        "num_panels": num_panels,
+        "controller_current": controller_current,
+        "inverter_size": inverter_size,
+        "selected_inverter": inverter_names[inverter_idx],
+        "selected_controller": controller_names[layout["controller"]],
+        "controller_count": layout["count"],
+        "panels_in_series": layout["series"],
+        "parallel_strings": layout["strings"],
+        "installed_panels": layout["panels"],
+        **costs,
+        **finance,
+    })
+    return pd.concat([frame, results], axis=1)
@@ -0,0 +1,189 @@
+# =============================================================================
+# PV STRING LAYOUT
+# =============================================================================
+# How an array is wired: `series` panels per string, `strings` in parallel,
+# shared between `count` identical charge controllers. A layout is valid when
+#   - each string's cold-morning Voc stays under the controller's PV voltage
+#     rating (Voc rises as the cells cool below 25 °C),
+#   - its hot-afternoon Vmp still clears the bank's charging voltage, so the
+#     controller can charge at all,
+#   - the strings each controller takes short-circuit within its current
+#     rating (string Isc x ISC_MARGIN), and
+#   - the controllers together carry the array's charge current.
+# Parallel strings are rounded up, so a layout may install a few more panels
+# than the sizing asks for; those are costed like the rest.
+#
+# Every (design, controller, series count) is evaluated as one array
+# expression, in row blocks that bound the memory, then reduced to the
+# cheapest series count per controller and the cheapest controller per
+# design. Kept free of any Streamlit import.
+
+import functools
+
+import numpy as np
+
+from catalog import get_catalog, as_table
+from climate import get_climate
+
+REFERENCE_TEMPERATURE = 25.0     # °C, panel datasheet (STC) ratings
+VOC_COEFFICIENT = -0.0030        # per °C, crystalline silicon
+VMP_COEFFICIENT = -0.0040        # per °C
+CELL_TEMPERATURE_RISE = 25.0     # °C of cell above ambient in full sun
+ISC_MARGIN = 1.25                # continuous-current factor on string Isc
+CHARGE_VOLTAGE_FACTOR = 1.2      # string Vmp must clear the bank's charging voltage
+# Design temperatures where there is no climate data for the site
+DEFAULT_COLD_TEMPERATURE = 10.0  # °C, coldest dawn
+DEFAULT_HOT_TEMPERATURE = 35.0   # °C, hot-season afternoon
+
+# (design, controller, series) cells per block
+_BLOCK_CELLS = 1 << 22
+
+
+def design_temperatures(location=None):
+    """(coldest, hot-season) ambient °C at the location, or the defaults without data for it."""
+    climate = None if not location else get_climate(location)
+    if climate is None:
+        return DEFAULT_COLD_TEMPERATURE, DEFAULT_HOT_TEMPERATURE
+    return climate.coldest_temperature, climate.hot_season_temperature
+
+
+def site_temperatures(locations):
+    """`design_temperatures` for an array of locations, looked up once per distinct name."""
+    names, inverse = np.unique(np.asarray(locations, dtype=str), return_inverse=True)
+    cold, hot = np.array([design_temperatures(name) for name in names], dtype=float).reshape(-1, 2).T
+    return cold[inverse], hot[inverse]
+
+
+def string_voltages(series, voc, vmp, cold_temperature, hot_temperature):
+    """Cold-morning Voc and hot-afternoon Vmp of a string of `series` panels."""
+    string_voc = series * voc * (1 + VOC_COEFFICIENT * (cold_temperature - REFERENCE_TEMPERATURE))
+    cell_temperature = hot_temperature + CELL_TEMPERATURE_RISE
+    string_vmp = series * vmp * (1 + VMP_COEFFICIENT * (cell_temperature - REFERENCE_TEMPERATURE))
+    return string_voc, string_vmp
+
+
+def dominators(controllers=None):
+    """How many catalog controllers dominate each one: no dearer, at least
+    the current and voltage rating (exact duplicates: the earlier one).
+
+    A controller any layout fits, fits each of its dominators at no more
+    cost, so one dominated k times is never among the k cheapest choices.
+    """
+    table = as_table(get_catalog().controllers if controllers is None else controllers)
+    return _dominators(*(table.column(field).tobytes() for field in ("price", "current", "voltage")))
+
+
+@functools.lru_cache(maxsize=16)
+def _dominators(price, rating, max_voltage):
+    # Keyed on the column bytes, so a catalog is compared pairwise only once
+    price, rating, max_voltage = (np.frombuffer(values) for values in (price, rating, max_voltage))
+    width = len(price)
+    counts = np.zeros(width, dtype=int)
+    index = np.arange(width)
+    step = max(1, _BLOCK_CELLS // max(width, 1))
+    for lo in range(0, width, step):
+        c = slice(lo, lo + step)
+        at_least = ((price[None, :] <= price[c, None]) & (rating[None, :] >= rating[c, None])
+                    & (max_voltage[None, :] >= max_voltage[c, None]))
+        better = ((price[None, :] < price[c, None]) | (rating[None, :] > rating[c, None])
+                  | (max_voltage[None, :] > max_voltage[c, None]) | (index[None, :] < index[c, None]))
+        counts[c] = (at_least & better).sum(axis=1)
+    counts.setflags(write=False)
+    return counts
+
+
+def layout_grid(num_panels, charge_current, battery_voltage, vmp, voc, isc, panel_price, controllers=None,
+                cold_temperature=DEFAULT_COLD_TEMPERATURE, hot_temperature=DEFAULT_HOT_TEMPERATURE, depth=None):
+    """Cheapest valid layout of every design on every controller.
+
+    Design inputs are scalars or equally-shaped (R,) arrays: at least
+    `num_panels` panels of the given Vmp/Voc/Isc/price, `charge_current` A
+    into a `battery_voltage` bank. Returns a dict of (R, K) arrays over K
+    controllers: series, strings, count, panels and cost (panels plus
+    controllers; inf where no layout fits that controller), and
+    `controller`, the (K,) catalog indexes of those controllers. That is
+    the whole catalog, or with `depth` only the controllers that can be
+    among the `depth` cheapest for some design (see `dominators`).
+    """
+    table = as_table(get_catalog().controllers if controllers is None else controllers)
+    kept = np.arange(len(table)) if depth is None else np.flatnonzero(dominators(table) < depth)
+    price, rating, max_voltage = (table.column(field)[kept] for field in ("price", "current", "voltage"))
+    needed, current, voltage, vmp, voc, isc, panel_price, cold, hot = (
+        np.ravel(values) for values in np.broadcast_arrays(
+            np.ceil(np.asarray(num_panels, dtype=float)), charge_current, battery_voltage,
+            vmp, voc, isc, panel_price, cold_temperature, hot_temperature))
+    rows, width = len(needed), len(price)
+
+    panel_voc, panel_vmp = string_voltages(1, voc, vmp, cold, hot)
+    # Longest string any controller takes, and no longer than the array (or
+    # the shortest string that charges the bank) needs: past that, one string
+    # only adds panels
+    series_limit = 1
+    if rows and width:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shortest = np.ceil(voltage * CHARGE_VOLTAGE_FACTOR / panel_vmp)
+            longest = np.floor(max_voltage.max() / panel_voc)
+        useful = np.nan_to_num(np.minimum(longest, np.maximum(needed, shortest)), posinf=0.0)
+        series_limit = max(int(useful.max()), 1)
+    series = np.arange(1, series_limit + 1, dtype=float)
+
+    out = {name: np.zeros((rows, width)) for name in ("series", "strings", "count")}
+    out["cost"] = np.full((rows, width), np.inf)
+    step = max(1, _BLOCK_CELLS // max(width * len(series), 1))
+    for lo in range(0, rows, step):
+        block = slice(lo, lo + step)
+        # Per (design, series): parallel strings and panel cost, inf where
+        # the string cannot charge the bank
+        strings = np.ceil(needed[block, None] / series[None, :])
+        charges = series[None, :] * panel_vmp[block, None] >= voltage[block, None] * CHARGE_VOLTAGE_FACTOR
+        panel_cost = np.where(charges & (needed[block, None] > 0),
+                              series[None, :] * strings * panel_price[block, None], np.inf)
+        # Per (design, controller): longest string, whole strings per
+        # controller within its current rating, controllers for the charge current
+        with np.errstate(divide="ignore", invalid="ignore"):
+            longest = np.floor(max_voltage[None, :] / panel_voc[block, None])
+            per_controller = np.floor(rating[None, :] / (isc[block, None] * ISC_MARGIN))
+            least = np.maximum(np.ceil(current[block, None] / rating[None, :]), 1)
+            per_controller[per_controller < 1] = np.nan
+            # Per (design, controller, series)
+            count = np.maximum(least[..., None], np.ceil(strings[:, None, :] / per_controller[..., None]))
+        valid = (series <= longest[..., None]) & (count <= strings[:, None, :])
+        cost = np.where(valid, panel_cost[:, None, :] + count * price[None, :, None], np.inf)
+
+        best = cost.argmin(axis=2)
+        out["cost"][block] = np.take_along_axis(cost, best[..., None], axis=2)[..., 0]
+        out["series"][block] = series[best]
+        out["strings"][block] = np.ceil(needed[block, None] / out["series"][block])
+        out["count"][block] = np.maximum(least, np.ceil(out["strings"][block] / per_controller))
+    out["panels"] = out["series"] * out["strings"]
+    out["controller"] = kept
+    return out
+
+
+def best_layout(num_panels, charge_current, battery_voltage, vmp, voc, isc, panel_price, controllers=None,
+                cold_temperature=DEFAULT_COLD_TEMPERATURE, hot_temperature=DEFAULT_HOT_TEMPERATURE):
+    """Cheapest layout and controller per design (arguments as `layout_grid`).
+
+    Returns a dict of (R,) arrays: controller (catalog index, -1 if no
+    controller fits), count, series, strings, panels, string_voc, string_vmp
+    and controller_cost. Designs without a layout keep ceil(num_panels)
+    panels and zero controllers.
+    """
+    table = as_table(get_catalog().controllers if controllers is None else controllers)
+    grid = layout_grid(num_panels, charge_current, battery_voltage, vmp, voc, isc, panel_price, table,
+                       cold_temperature, hot_temperature, depth=1)
+    kept = np.append(grid.pop("controller"), -1)
+    # A trailing "no controller" column: zero of everything, chosen only when nothing fits
+    grid = {name: np.column_stack([values, np.full(len(values), np.inf if name == "cost" else 0.0)])
+            for name, values in grid.items()}
+    rows = np.arange(len(grid["cost"]))
+    found = np.isfinite(grid["cost"]).any(axis=1)
+    choice = np.where(found, grid["cost"].argmin(axis=1), grid["cost"].shape[1] - 1)
+    pick = {name: values[rows, choice] for name, values in grid.items() if name != "cost"}
+    needed, vmp, voc, cold, hot = (np.broadcast_to(values, rows.shape).astype(float) for values in (
+        np.ceil(np.asarray(num_panels, dtype=float)), vmp, voc, cold_temperature, hot_temperature))
+    pick["panels"] = np.where(found, pick["panels"], needed)
+    pick["string_voc"], pick["string_vmp"] = string_voltages(pick["series"], voc, vmp, cold, hot)
+    pick["controller"] = kept[choice]
+    pick["controller_cost"] = pick["count"] * np.append(table.column("price"), 0.0)[pick["controller"]]
+    return pick
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from cashflow import cash_flows, irr
+
+
+def test_irr_of_known_cash_flows():
+    # -100 then 110 a year later is exactly 10%; -1000 then 5 x 300 is ~15.24%
+    rates = irr(np.array([[-100.0, 110.0, 0.0, 0.0, 0.0, 0.0],
+                          [-1000.0, 300.0, 300.0, 300.0, 300.0, 300.0]]))
+    assert rates[0] == pytest.approx(0.10, abs=1e-9)
+    assert rates[1] == pytest.approx(0.152382, abs=1e-6)
+
+
+def test_irr_is_nan_without_a_sign_change():
+    assert np.isnan(irr(np.array([-100.0, -10.0, -10.0]))[0])
+
+
+def test_npv_at_the_irr_is_zero():
+    result = cash_flows(8000, 2_500_000, 400_000, 120, 15, 5, discount_rate=0)
+    rate = result["irr"][0] / 100
+    flows = result["flows"][0]
+    assert (flows / (1 + rate) ** np.arange(len(flows))).sum() == pytest.approx(0, abs=1e-3)
+
+
+def test_battery_replacements_within_lifespan():
+    # 4-year bank over 10 years: replaced after years 4 and 8
+    result = cash_flows(5000, 1_000_000, 100_000, 50, 10, 4, maintenance_rate=0, tariff_escalation=0,
+                        pv_degradation=0)
+    assert result["replacement_cost"][0] == 200_000
+    savings = 5000 * 360 / 1000 * 50
+    expected = np.full(10, savings)
+    expected[[3, 7]] -= 100_000
+    np.testing.assert_allclose(result["flows"][0], [-1_000_000, *expected])
+
+
+def test_batch_matches_single_designs():
+    args = ([3000, 8000, 20000], [900_000, 2_500_000, 6_000_000], [65_000, 400_000, 1_200_000], [50, 120, 250],
+            [10, 15, 20], [4, 5.5, 10])
+    batch = cash_flows(*args)
+    for i in range(3):
+        single = cash_flows(*(values[i] for values in args))
+        for key in ("npv", "irr", "lcoe", "discounted_payback", "simple_payback", "replacement_cost"):
+            assert batch[key][i] == pytest.approx(single[key][0], nan_ok=True), key
+
+
+def test_payback_interpolates_within_the_year():
+    result = cash_flows(5000, 135_000, 0, 50, 10, 20, maintenance_rate=0, tariff_escalation=0, pv_degradation=0)
+    # 90,000 saved a year: recovered halfway through year 2
+    assert result["simple_payback"][0] == pytest.approx(1.5)
+
+
+def test_evaluate_portfolio_precedence():
+    import pandas as pd
+    from cashflow import evaluate_portfolio
+    designs = pd.DataFrame({"total_wh": [5000.0, 8000.0], "total_cost": [1e6, 2e6], "battery_cost": [1e5, 2e5],
+                            "system_lifespan": [10, 15], "battery_type": ["Trojan T-105 (225Ah)"] * 2})
+    # No elec_rate column: the keyword applies to every row
+    by_keyword = evaluate_portfolio(designs, elec_rate=120)
+    by_column = evaluate_portfolio(designs.assign(elec_rate=120.0), elec_rate=50)
+    np.testing.assert_allclose(by_keyword["npv"], by_column["npv"])
+    # A column wins over the keyword for the assumptions too
+    np.testing.assert_allclose(
+        evaluate_portfolio(designs.assign(elec_rate=120.0, discount_rate=15.0), discount_rate=5)["npv"],
+        by_keyword["npv"])
+    with pytest.raises(KeyError, match="elec_rate"):
+        evaluate_portfolio(designs)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from degradation import (MAX_LIFE_YEARS, battery_lifetime, rainflow, replacement_years, turning_points)
+
+
+def _sequential_rainflow(trace):
+    # Textbook four-point rainflow, one point at a time
+    values, _ = turning_points(trace)
+    stack, cycles = [], []
+    for value in values:
+        stack.append(value)
+        while len(stack) >= 4:
+            a, b, c, d = stack[-4:]
+            inner = abs(c - b)
+            if inner <= abs(b - a) and inner <= abs(d - c):
+                cycles.append((1.0, inner))
+                del stack[-3:-1]
+            else:
+                break
+    cycles += [(0.5, abs(b - a)) for a, b in zip(stack, stack[1:])]
+    return sorted(cycles)
+
+
+def _cycles(rows, depths, counts, row):
+    mine = rows == row
+    return sorted(zip(counts[mine].tolist(), depths[mine].tolist()))
+
+
+def test_rainflow_matches_sequential_reference():
+    rng = np.random.default_rng(7)
+    traces = np.vstack([rng.random((6, 300)), np.cumsum(rng.normal(size=(2, 300)), axis=1)])
+    rows, depths, counts = rainflow(traces)
+    for i, trace in enumerate(traces):
+        expected = _sequential_rainflow(trace)
+        found = _cycles(rows, depths, counts, i)
+        assert [count for count, _ in found] == [count for count, _ in expected]
+        np.testing.assert_allclose([depth for _, depth in found], [depth for _, depth in expected])
+
+
+def test_turning_points_skip_flat_and_monotone_stretches():
+    values, row = turning_points([[1, 1, 2, 3, 3, 2, 2, 1, 4]])
+    np.testing.assert_array_equal(values, [1, 3, 1, 4])
+    assert (row == 0).all()
+
+
+def test_daily_full_cycles():
+    # One full 100% -> 20% -> 100% swing a day for a year
+    day = np.r_[np.linspace(1, 0.2, 13), np.linspace(0.2, 1, 13)[1:-1]]
+    soc = np.tile(day, 365)[None, :]
+    result = battery_lifetime(soc, "Pylontech US2000 (200Ah)", temperature=25, hours_per_step=24 / len(day))
+    assert result["cycles"][0] == pytest.approx(365 * 0.8, rel=0.01)
+    assert result["life_years"][0] < MAX_LIFE_YEARS
+
+
+def test_idle_bank_ages_on_the_calendar_only():
+    result = battery_lifetime(np.ones((1, 8760)), "Trojan T-105 (225Ah)", temperature=35)
+    assert result["cycles"][0] == 0
+    # Lead acid: 2.5 %/yr at 25 °C, doubled at 35 °C; replaced at 20% fade
+    assert result["calendar_fade"][0] == pytest.approx(5.0)
+    assert result["life_years"][0] == pytest.approx(4.0)
+
+
+def test_replacement_years():
+    assert replacement_years(4, 10) == [4, 8]
+    assert replacement_years(3.5, 10) == [4, 7]
+    assert replacement_years(12, 10) == []
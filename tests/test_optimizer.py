@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from catalog import get_catalog
+from optimizer import cheapest_designs
+
+
+def test_batteries_come_in_whole_series_strings():
+    batteries = get_catalog().batteries
+    ranked = cheapest_designs(7000, 2000, top_n=20)
+    assert not ranked.empty
+    for row in ranked.itertuples():
+        spec = batteries[row.battery_type]
+        series = row.battery_voltage // spec["voltage"]
+        assert row.num_batteries % series == 0
+        # Installed parallel strings cover the required capacity
+        assert row.num_batteries / series * spec["capacity"] >= row.battery_capacity_ah
+        assert row.battery_cost == row.num_batteries * spec["price"]
+
+
+def test_six_volt_bank_at_24_volts():
+    # 6912 Wh x 5 h backup at 24 V, 80% DoD, 90% derating: 2000 Ah, i.e. 9
+    # strings of 4 x T-105 (6 V, 225 Ah)
+    ranked = cheapest_designs(6912, 2000, top_n=1, voltages=(24,),
+                              batteries={"Trojan T-105 (225Ah)": get_catalog().batteries["Trojan T-105 (225Ah)"]})
+    row = ranked.iloc[0]
+    assert row["battery_capacity_ah"] == pytest.approx(2000)
+    assert row["num_batteries"] == 36
+    assert row["battery_cost"] == 36 * 65000
+
+
+def test_designs_are_ranked_cheapest_first():
+    ranked = cheapest_designs(5000, 1500, top_n=10)
+    assert np.all(np.diff(ranked["total_cost"].to_numpy()) >= 0)
@@ -0,0 +1,22 @@
+import result_cache
+from result_cache import ResultCache, cached_result, content_key
+
+
+def test_disk_tier_stays_within_its_limit(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.db"), disk_limit_mb=0.05)
+    for i in range(300):
+        cache.put(f"k{i}", b"x" * 1000)
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= cache.disk_limit
+    assert stats["disk_evictions"] > 0
+    # A fresh cache on the same file (another process) still finds the newest
+    assert ResultCache(str(tmp_path / "results.db")).get("k299") == b"x" * 1000
+
+
+def test_keys_carry_the_cache_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "_caches", {result_cache.CACHE_PATH: ResultCache(str(tmp_path / "r.db"))})
+    assert cached_result("kind", lambda: 1, {"a": 5}) == 1
+    assert cached_result("kind", lambda: 2, {"a": 5.0}) == 1
+    monkeypatch.setattr(result_cache, "CACHE_VERSION", result_cache.CACHE_VERSION + 1)
+    assert cached_result("kind", lambda: 3, {"a": 5}) == 3
+    assert content_key(1, "kind") != content_key(2, "kind")
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from ledger import LoadLedger
+from schedules import SLOT_HOURS, SLOTS, DemandProfile, demand_curve, usage_weights, window_weights
+
+
+def _profile(*items):
+    ledger = LoadLedger()
+    for item in items:
+        ledger.append(*item)
+    return DemandProfile.from_load(ledger.snapshot())
+
+
+def test_window_weights_wrap_past_midnight():
+    weights = window_weights([(22, 2)])
+    assert weights.sum() * SLOT_HOURS == 4
+    assert weights[0] == 1 and weights[-1] == 1 and weights[SLOTS // 2] == 0
+
+
+def test_usage_weights_accepts_hourly_values():
+    hourly = np.zeros(24)
+    hourly[18:22] = 1
+    np.testing.assert_array_equal(usage_weights(hourly), window_weights([(18, 22)]))
+    with pytest.raises(ValueError):
+        usage_weights(np.zeros(24))
+
+
+def test_demand_curve_keeps_daily_energy():
+    weights = np.stack([window_weights([(18, 22)]), window_weights([(6, 8), (17, 23)]), np.ones(SLOTS)])
+    total_watt = np.array([100.0, 60.0, 1500.0, 40.0, 250.0])
+    # Within the window, beyond it (spills over the rest of the day) and all day
+    hours = np.array([3.0, 10.0, 2.0, 24.0, 8.0])
+    group = np.array([0, 0, 1, 2, 1])
+    curve = demand_curve(total_watt, hours, weights, group)
+    assert curve.sum() * SLOT_HOURS == pytest.approx((total_watt * hours).sum())
+
+
+def test_demand_curve_matches_item_by_item_sum():
+    weights = np.stack([window_weights([(18, 22)]), window_weights([(9, 17)])])
+    total_watt, hours, group = np.array([100.0, 200.0, 300.0]), np.array([2.0, 6.0, 12.0]), np.array([0, 1, 1])
+    separate = sum(demand_curve(total_watt[[i]], hours[[i]], weights, group[[i]]) for i in range(3))
+    np.testing.assert_allclose(demand_curve(total_watt, hours, weights, group), separate)
+
+
+def test_profile_energy_peak_and_diversity():
+    profile = _profile(("Lights", 100, 4, 5, [(18, 23)]), ("Pump", 750, 1, 2, [(7, 9)]),
+                       ("Fridge", 150, 1, 24, None))
+    assert profile.daily_wh == pytest.approx(100 * 4 * 5 + 750 * 2 + 150 * 24)
+    assert profile.coincident_peak == pytest.approx(750 + 150)
+    assert profile.design_watt == profile.coincident_peak
+    assert profile.diversity_factor == pytest.approx((400 + 750 + 150) / 900)
+
+
+def test_backup_wh_is_the_worst_window():
+    profile = _profile(("Lights", 400, 1, 5, [(18, 23)]), ("Fridge", 100, 1, 24, [(0, 24)]))
+    assert profile.backup_wh(5) == pytest.approx(5 * 500)
+    assert profile.backup_wh(24) == pytest.approx(profile.daily_wh)
+    assert profile.backup_wh(29) == pytest.approx(profile.daily_wh + 5 * 500)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from catalog import get_catalog
+from sensitivity import SLIDER_GRIDS, ArrayGrid, BatteryGrid, SensitivityGrid
+
+AT = {"backup_time": 5, "dod_limit": 80, "temperature_factor": 90, "sun_hours": 5.0, "system_efficiency": 75}
+
+
+def _grid(total_wh, total_watt, battery_voltage=24):
+    catalog = get_catalog()
+    return SensitivityGrid(BatteryGrid(total_wh, battery_voltage, next(iter(catalog.batteries))),
+                           ArrayGrid(total_wh, battery_voltage, next(iter(catalog.panels))),
+                           total_watt, battery_voltage)
+
+
+def _cell(at):
+    return tuple(int(np.flatnonzero(np.isclose(SLIDER_GRIDS[name], value))[0]) for name, value in at.items())
+
+
+@pytest.mark.parametrize("total_wh, total_watt", [(3000, 800), (12000, 2500), (40000, 4500)])
+def test_costs_match_the_cube_and_sweeps(total_wh, total_watt):
+    grid = _grid(total_wh, total_watt)
+    total = float(grid.costs(**AT)["total_cost"])
+    assert total == pytest.approx(float(grid.cube(np.float64)[_cell(AT)]))
+    for parameter in AT:
+        sweep = grid.sweep(parameter, **AT)
+        assert total == pytest.approx(sweep.loc[np.isclose(sweep[parameter], AT[parameter]), "total_cost"].item())
+    assert grid.tornado(**AT)["base_cost"].iloc[0] == total
+
+
+def test_off_grid_values_snap_to_the_nearest_point():
+    grid = _grid(5000, 1500)
+    assert grid.costs(**{**AT, "sun_hours": 5.1})["total_cost"] == grid.costs(**AT)["total_cost"]
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from simulation import battery_wh_for_target, load_profile, pv_profile, simulate_year
+
+FIELDS = ("unmet_wh", "curtailed_wh", "load_wh", "pv_wh", "loss_of_load_hours", "days_of_autonomy", "min_soc")
+
+
+def _designs():
+    pv = pv_profile([800.0, 1500.0, 2500.0, 4000.0], 5.0)
+    load = load_profile([3000.0, 5000.0, 8000.0, 15000.0])
+    battery = np.array([2000.0, 6000.0, 0.0, 20000.0])
+    return pv, load, battery
+
+
+def test_batch_matches_single_design_runs():
+    pv, load, battery = _designs()
+    batch = simulate_year(pv, load, battery, dod_limit=70, return_soc=True)
+    for i in range(len(battery)):
+        single = simulate_year(pv[i], load[i], battery[i], dod_limit=70, return_soc=True)
+        for field in FIELDS:
+            assert batch[field][i] == pytest.approx(single[field][0]), field
+        np.testing.assert_allclose(batch["soc"][i], single["soc"][0])
+
+
+def test_bigger_bank_never_adds_unmet_load():
+    pv, load = pv_profile(2000.0, 5.0), load_profile(6000.0)
+    results = simulate_year(pv, load, np.linspace(0, 30000, 16))
+    assert (np.diff(results["unmet_wh"]) <= 1e-6).all()
+    assert (np.diff(results["days_of_autonomy"]) >= 0).all()
+
+
+def test_soc_stays_in_dod_window():
+    pv, load, battery = _designs()
+    results = simulate_year(pv, load, battery, dod_limit=60, return_soc=True)
+    stored = battery > 0
+    assert (results["soc"][stored] >= 0.4 - 1e-9).all()
+    assert (results["soc"][stored] <= 1 + 1e-9).all()
+
+
+def test_without_a_battery_only_daylight_load_is_served():
+    pv, load = pv_profile(1e6, 5.0), load_profile(5000.0)
+    results = simulate_year(pv, load, 0.0)
+    dark = pv == 0
+    assert results["unmet_wh"][0] == pytest.approx(load[dark].sum())
+
+
+def test_battery_wh_for_target_picks_smallest_feasible():
+    pv, load = pv_profile(2000.0, 5.0), load_profile(5000.0)
+    candidates = [1000.0, 4000.0, 8000.0, 16000.0, 32000.0]
+    best, results = battery_wh_for_target(pv, load, candidates)
+    feasible = results["loss_of_load_fraction"] <= 0.01
+    assert best == candidates[int(np.argmax(feasible))]
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from catalog import get_catalog
+from sizing_engine import DEFAULT_DESIGN, size_batch, size_system
+
+
+def _sites():
+    catalog = get_catalog()
+    batteries, panels = list(catalog.batteries), list(catalog.panels)
+    return pd.DataFrame({
+        "total_wh": [800.0, 5000.0, 12000.0, 40000.0],
+        "total_watt": [300.0, 1500.0, 3200.0, 9000.0],
+        "battery_voltage": [12, 24, 48, 48],
+        "backup_time": [2, 5, 8, 12],
+        "battery_type": [batteries[0], batteries[1], batteries[-1], batteries[1]],
+        "panel_type": [panels[0], panels[-1], panels[1], panels[0]],
+    })
+
+
+def test_size_batch_matches_size_system():
+    sites = _sites()
+    batch = size_batch(sites)
+    for i, site in sites.iterrows():
+        design = site.drop(["total_wh", "total_watt"]).to_dict()
+        single = size_system(site["total_wh"], site["total_watt"], **design)
+        row = batch.iloc[i]
+        for key in ("battery_capacity_ah", "num_batteries", "required_solar", "num_panels", "inverter_size",
+                    "battery_cost", "solar_cost", "total_cost", "annual_savings", "payback_period"):
+            assert row[key] == pytest.approx(float(single[key])), key
+        assert row["selected_inverter"] == single["selected_inverter"]
+        assert row["selected_controller"] == single["selected_controller"]
+        assert row["installed_panels"] == single["controller_info"]["panels"]
+
+
+def test_size_batch_fills_design_defaults():
+    batch = size_batch({"total_wh": [5000.0], "total_watt": [1500.0]}, backup_time=3)
+    assert batch.loc[0, "backup_time"] == 3
+    assert batch.loc[0, "dod_limit"] == DEFAULT_DESIGN["dod_limit"]
+
+
+def test_size_batch_rejects_unknown_sku():
+    with pytest.raises(KeyError, match="battery_type"):
+        size_batch({"total_wh": [5000.0], "total_watt": [1500.0], "battery_type": ["No such battery"]})
+
+
+def test_battery_count_scales_with_backup():
+    short = size_system(5000, 1500, backup_time=2)
+    long = size_system(5000, 1500, backup_time=8)
+    assert long["num_batteries"] == pytest.approx(4 * short["num_batteries"])
+    assert np.ceil(long["num_batteries"]) * long["battery_info"]["price"] == long["battery_cost"]
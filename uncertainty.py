@@ -0,0 +1,125 @@
+# =============================================================================
+# MONTE CARLO UNCERTAINTY
+# =============================================================================
+# The sliders give one value for sun hours, appliance usage, temperature
+# derating and tariff, so sizing and payback come out as single numbers. This
+# samples those inputs from distributions centred on the slider values, runs
+# every sample through the sizing_engine stages in one vectorized pass per
+# chunk, and reports P10/P50/P90 and histograms of the outputs.
+#
+# Appliance hours are sampled as one usage multiplier on the whole load list
+# (households run everything longer or shorter together), which keeps the
+# cost independent of the number of appliances.
+
+import numpy as np
+
+from catalog import get_catalog
+from string_layout import best_layout, design_temperatures
+from sizing_engine import (
+    DEFAULT_DESIGN,
+    battery_bank,
+    solar_array,
+    inverter_rating,
+    select_inverter,
+    system_costs,
+    financial_summary,
+)
+
+DEFAULT_SAMPLES = 1_000_000
+CHUNK_SIZE = 250_000
+PERCENTILES = (10, 50, 90)
+HISTOGRAM_BINS = 60
+
+# Spread of each uncertain input around its slider value
+DEFAULT_SPREADS = {
+    "sun_hours": 0.15,           # relative standard deviation
+    "usage": 0.20,               # relative standard deviation of appliance hours
+    "temperature_factor": 5.0,   # derating points (triangular, skewed to hotter)
+    "elec_rate": 0.20,           # relative standard deviation
+}
+
+OUTPUTS = {
+    "battery_capacity_ah": "Battery Capacity (Ah)",
+    "required_solar": "Solar Array (W)",
+    "total_cost": "Total Cost (₦)",
+    "payback_period": "Payback Period (years)",
+    "roi": "ROI (%)",
+}
+
+
+def sample_inputs(rng, samples, sun_hours, temperature_factor, elec_rate, spreads=None):
+    """Draw `samples` values of each uncertain input; returns a dict of arrays."""
+    spreads = {**DEFAULT_SPREADS, **(spreads or {})}
+    temp_spread = spreads["temperature_factor"]
+    return {
+        "sun_hours": np.clip(rng.normal(sun_hours, sun_hours * spreads["sun_hours"], samples),
+                             0.25 * sun_hours, 2 * sun_hours),
+        "usage": np.clip(rng.normal(1.0, spreads["usage"], samples), 0.25, 2.0),
+        "temperature_factor": rng.triangular(max(temperature_factor - 2 * temp_spread, 1), temperature_factor,
+                                             min(temperature_factor + temp_spread, 100) + 1e-9, samples),
+        "elec_rate": np.clip(rng.normal(elec_rate, elec_rate * spreads["elec_rate"], samples), 0, None),
+    }
+
+
+def _evaluate(inputs, total_wh, inverter_price, params, battery_info, panel_info, temperatures, backup_wh=None):
+    # Same stage chain as sizing_engine.size_system, over arrays of samples
+    load_wh = total_wh * inputs["usage"]
+    battery_capacity_ah, num_batteries = battery_bank(
+        load_wh, params["backup_time"], params["battery_voltage"], params["dod_limit"],
+        inputs["temperature_factor"], battery_info["capacity"],
+        None if backup_wh is None else backup_wh * inputs["usage"])
+    required_solar, num_panels, controller_current = solar_array(
+        load_wh, inputs["sun_hours"], params["system_efficiency"], params["battery_voltage"], panel_info["vmp"])
+    layout = best_layout(num_panels, controller_current, params["battery_voltage"],
+                         *(panel_info[field] for field in ("vmp", "voc", "isc", "price")), None, *temperatures)
+    costs = system_costs(num_batteries, battery_info["price"], layout["panels"], panel_info["price"],
+                         inverter_price, layout["controller_cost"])
+    finance = financial_summary(load_wh, costs["total_cost"], inputs["elec_rate"], params["system_lifespan"])
+    return {
+        "battery_capacity_ah": battery_capacity_ah,
+        "required_solar": required_solar,
+        "total_cost": costs["total_cost"],
+        "payback_period": finance["payback_period"],
+        "roi": finance["roi"],
+    }
+
+
+def monte_carlo(total_wh, total_watt, samples=DEFAULT_SAMPLES, seed=None, spreads=None,
+                bins=HISTOGRAM_BINS, backup_wh=None, location=None, **design):
+    """Sample one design's uncertain inputs and summarise the outputs.
+
+    `design` takes the `DEFAULT_DESIGN` keys; `seed` makes the run
+    reproducible. `backup_wh`, from a usage profile, replaces total_wh x
+    backup_time as the backup energy and scales with the sampled usage.
+    The array's strings are laid out for the `location`'s temperatures.
+    Returns {"samples", "seed", "percentiles": {output: {10: .., 50: ..,
+    90: ..}}, "mean": {output: ..}, "histograms": {output: (counts,
+    edges)}}. Histograms span P1-P99 so a few extreme paybacks do not
+    flatten the chart.
+    """
+    params = {**DEFAULT_DESIGN, **design}
+    catalog = get_catalog()
+    battery_info = catalog.batteries[params["battery_type"]]
+    panel_info = catalog.panels[params["panel_type"]]
+    _, inverter_info = select_inverter(inverter_rating(total_watt), params["battery_voltage"])
+    temperatures = design_temperatures(location)
+
+    rng = np.random.default_rng(seed)
+    samples = int(samples)
+    outputs = {name: np.empty(samples) for name in OUTPUTS}
+    for start in range(0, samples, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, samples)
+        inputs = sample_inputs(rng, stop - start, params["sun_hours"], params["temperature_factor"],
+                               params["elec_rate"], spreads)
+        chunk = _evaluate(inputs, total_wh, inverter_info.get("price", 0), params,
+                          battery_info, panel_info, temperatures, backup_wh)
+        for name in OUTPUTS:
+            outputs[name][start:stop] = chunk[name]
+
+    summary = {"samples": samples, "seed": seed, "percentiles": {}, "mean": {}, "histograms": {}}
+    for name, values in outputs.items():
+        p1, *levels, p99 = np.percentile(values, (1, *PERCENTILES, 99))
+        summary["percentiles"][name] = dict(zip(PERCENTILES, map(float, levels)))
+        summary["mean"][name] = float(values.mean())
+        summary["histograms"][name] = np.histogram(values, bins=bins, range=(p1, p99) if p99 > p1 else None)
+    return summary